@@ -1,21 +1,79 @@
-import sys
-import json
 import os
-import requests
-import subprocess
+import sys
+
+# 自成一体、不转交给常驻实例的入口
+_LOCAL_ONLY_FLAGS = {'--watchdog', '--batch', '--scheduler', '--subscribe', '--history', '--profile-startup'}
+
+if (__name__ == '__main__' and '--standalone' not in sys.argv and not _LOCAL_ONLY_FLAGS & set(sys.argv)
+        and not os.environ.get('CSU_WIFI_REPLAY')):
+    # 单实例：已有常驻实例时把命令（或打开窗口）转交给它，几毫秒内退出；回放录制时总是在本进程内执行
+    import instance
+    exit_code = instance.forward_from_argv(sys.argv[1:])
+    if exit_code is not None:
+        sys.exit(exit_code)
+
+if __name__ == '__main__' and {'--auto-login', '--status', '--logout'} & set(sys.argv):
+    # 定时任务快速路径：不导入 PyQt6，也不创建主窗口
+    import headless
+    sys.exit(headless.main(sys.argv[1:]))
+
+if __name__ == '__main__' and '--watchdog' in sys.argv:
+    # 常驻守护：掉线自动重新登录，同样不导入 PyQt6
+    import watchdog
+    sys.exit(watchdog.main(sys.argv[1:]))
+
+if __name__ == '__main__' and '--batch' in sys.argv:
+    # 多账号批量登录，同样不导入 PyQt6
+    import batch_login
+    sys.exit(batch_login.main(sys.argv[1:]))
+
+if __name__ == '__main__' and '--subscribe' in sys.argv:
+    # 订阅常驻实例广播的认证状态，每次变化输出一行 JSON，同样不导入 PyQt6
+    import status_broadcast
+    sys.exit(status_broadcast.main(sys.argv[1:]))
+
+if __name__ == '__main__' and '--history' in sys.argv:
+    # 查询在线设备与认证状态历史，同样不导入 PyQt6
+    import history
+    sys.exit(history.main(sys.argv[1:]))
+
+if __name__ == '__main__' and '--scheduler' in sys.argv:
+    # 进程内定时登录守护（或导出 systemd/cron），同样不导入 PyQt6
+    import scheduler
+    sys.exit(scheduler.main(sys.argv[1:]))
+
+import startup_profile
+
+if __name__ == '__main__' and '--profile-startup' in sys.argv:
+    # 启动剖析：导入计时钩子必须在导入 PyQt6 等模块之前安装
+    startup_profile.start()
+
 import time
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLabel,
                              QLineEdit, QPushButton, QComboBox, QCheckBox, QMessageBox, QTimeEdit,
-                             QGroupBox, QSpinBox, QTableWidget, QTableWidgetItem, QHeaderView, QStatusBar,
+                             QGroupBox, QSpinBox, QTableView, QHeaderView, QStatusBar,
                              QGridLayout)
 from PyQt6.QtGui import QIcon, QFont, QDesktopServices
-from PyQt6.QtCore import QSettings, QTime, QUrl, QTimer, Qt
+from PyQt6.QtCore import QDate, QSettings, QTime, QUrl, Qt
+import headless
+import history
+import metrics
+import portal_ops
+import scheduler
 import secure_storage
-from network_worker import NetworkWorker
-
-# QSettings organization/application identifiers
-ORG_NAME = "CSU"
-APP_NAME = "WifiAutoLogin"
+import status_broadcast
+from device_model import DeviceTableModel
+from login_sequence import MODE_ENSURE, MODE_FORCE, MODE_REBIND
+from instance import (COMMAND_AUTO_LOGIN, COMMAND_LOGOUT, COMMAND_SHOW, COMMAND_STATUS,
+                      status_reply)
+from network_worker import (InstanceBridge, NetworkMonitorBridge, NetworkWorker, PortalEngineBridge,
+                            SchedulerBridge)
+from protocol import PortalStatus
+from resolver import PORTAL_HOST, parse_addresses
+from settings_store import ORG_NAME, APP_NAME
+from snapshot import SnapshotStore
+from status_cache import STATUS_TTL
+from task_queue import TaskQueue
 
 # Added: resource_path helper to support PyInstaller one-file (_MEIPASS)
 def resource_path(relative: str) -> str:
@@ -37,11 +95,39 @@ class CSUWIFILogin(QMainWindow):
         # 初始化异步网络工作线程
         self.network_worker = NetworkWorker()
         self._connect_network_signals()
-        self._worker_busy = False  # 标记worker是否正在执行任务
+        # 任务队列：worker 忙碌时新任务排队等待，而不是被丢弃
+        self._task_queue = TaskQueue(on_expired=self._on_task_expired)
+        self.network_worker.finished.connect(self._dispatch_next_task)
+        # 异步门户引擎：状态与设备列表并发查询，一次往返完成刷新
+        self.engine_bridge = PortalEngineBridge(parent=self)
+        self.engine_bridge.refresh_finished.connect(self._on_refresh_finished)
+        # 上次的状态与设备列表快照：启动时先用它绘制，再在后台重新查询
+        self.snapshot_store = SnapshotStore()
+        # 网络变化监测：网卡获得地址、链路或路由变化时立即检查状态（必要时登录）
+        self.network_monitor = NetworkMonitorBridge(parent=self)
+        self.network_monitor.changed.connect(self._on_network_changed)
+        # 进程内定时登录：程序运行期间到点直接在本进程中登录，不再拉起新进程
+        self.scheduler = SchedulerBridge(parent=self)
+        self.scheduler.fired.connect(self._on_schedule_fired)
+        # 单实例：之后启动的 --auto-login/--status/--logout 或再次打开窗口，转交给本进程处理
+        self.instance = InstanceBridge(parent=self)
+        self.instance.request_received.connect(self._on_instance_request)
+        self._pending_requests = {'logout': [], 'auto_login': []}
 
         self.init_ui()
         # 在初始化后加载配置；根据 headless 状态决定是否启动自动登录序列
         self.load_config(suppress_auto_sequence=headless)
+        if not headless and self.settings.value('network/monitor', True, bool):
+            self.network_monitor.start()
+        if not headless:
+            self.instance.start()
+            # 认证状态本地广播：有订阅者时定期查询，状态变化推送给所有订阅者
+            publisher = status_broadcast.start()
+            if publisher is not None:
+                client = self.network_worker.client
+                publisher.poll_while_subscribed(lambda: portal_ops.cached_check_status(client))
+            # 每次状态和设备列表查询写入本地历史（--history 查询会话时长与被挤下线次数）
+            history.start()
 
     def init_ui(self):
         self.setWindowTitle('CSU WIFI AutoLogin')
@@ -75,7 +161,7 @@ class CSUWIFILogin(QMainWindow):
 
         # Checkboxes
         self.auto_login_check = QCheckBox('自动登录')
-        self.auto_login_check.setToolTip('程序启动时自动使用保存的配置进行登录')
+        self.auto_login_check.setToolTip('程序启动时以及网络变化后自动使用保存的配置进行登录')
         self.startup_check = QCheckBox('开机自启')
         self.startup_check.setToolTip('设置程序是否在系统启动时自动运行')
         self.startup_check.stateChanged.connect(self.handle_startup)
@@ -131,10 +217,25 @@ class CSUWIFILogin(QMainWindow):
         schedule_group.setChecked(False)
         schedule_group_layout = QVBoxLayout()
 
-        # Help text
-        schedule_help_label = QLabel('启用后，将在指定时间自动执行登录操作。')
-        schedule_help_label.setStyleSheet("color: gray;")
-        schedule_group_layout.addWidget(schedule_help_label)
+        # Help text（随定时方式变化）
+        self.schedule_help_label = QLabel()
+        self.schedule_help_label.setStyleSheet("color: gray;")
+        schedule_group_layout.addWidget(self.schedule_help_label)
+
+        # 定时方式：只有 Windows 上可以选择系统计划任务
+        self.schedule_backend_widget = QWidget()
+        backend_layout = QHBoxLayout(self.schedule_backend_widget)
+        backend_layout.setContentsMargins(0, 0, 0, 0)
+        backend_layout.addWidget(QLabel("定时方式:"))
+        self.schedule_backend_combo = QComboBox()
+        self.schedule_backend_combo.addItem('Windows 计划任务（程序不必运行）', scheduler.BACKEND_SCHTASKS)
+        self.schedule_backend_combo.addItem('程序内定时（程序须保持运行）', scheduler.BACKEND_APP)
+        self.schedule_backend_combo.setToolTip('计划任务到点启动静默登录；程序内定时只在程序运行期间生效')
+        self.schedule_backend_combo.currentIndexChanged.connect(self.update_schedule_options_ui)
+        backend_layout.addWidget(self.schedule_backend_combo)
+        backend_layout.addStretch()
+        self.schedule_backend_widget.setVisible(sys.platform == 'win32')
+        schedule_group_layout.addWidget(self.schedule_backend_widget)
 
         # Top row: Time edit and apply button
         top_schedule_layout = QHBoxLayout()
@@ -144,7 +245,7 @@ class CSUWIFILogin(QMainWindow):
         self.schedule_time_edit.setToolTip('设置任务执行的具体时间')
         top_schedule_layout.addWidget(self.schedule_time_edit)
         self.schedule_apply_btn = QPushButton('应用定时任务')
-        self.schedule_apply_btn.setToolTip('创建或更新Windows计划任务')
+        self.schedule_apply_btn.setToolTip('保存并启用（或关闭）定时登录')
         self.schedule_apply_btn.clicked.connect(self.handle_scheduled_task)
         top_schedule_layout.addWidget(self.schedule_apply_btn)
         schedule_group_layout.addLayout(top_schedule_layout)
@@ -193,11 +294,11 @@ class CSUWIFILogin(QMainWindow):
         self.schedule_group = schedule_group
 
         # Online Devices Table
-        self.online_devices_table = QTableWidget()
-        self.online_devices_table.setColumnCount(4)
-        self.online_devices_table.setHorizontalHeaderLabels(['IP地址', 'MAC地址', '登录时间', '设备类型'])
+        self.device_model = DeviceTableModel(self)
+        self.online_devices_table = QTableView()
+        self.online_devices_table.setModel(self.device_model)
         self.online_devices_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
-        self.online_devices_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.online_devices_table.setEditTriggers(QTableView.EditTrigger.NoEditTriggers)
         self.online_devices_table.setFixedHeight(120)  # Set a fixed height for header + 3 rows
         layout.addWidget(self.online_devices_table)
 
@@ -213,19 +314,18 @@ class CSUWIFILogin(QMainWindow):
 
     def _connect_network_signals(self):
         """连接网络工作线程的所有信号到相应的槽函数。"""
-        self.network_worker.login_finished.connect(self._on_login_finished)
         self.network_worker.logout_finished.connect(self._on_logout_finished)
         self.network_worker.unbind_finished.connect(self._on_unbind_finished)
-        self.network_worker.status_finished.connect(self._on_status_finished)
         self.network_worker.devices_finished.connect(self._on_devices_finished)
+        self.network_worker.sequence_step.connect(self._on_sequence_step)
+        self.network_worker.sequence_finished.connect(self._on_sequence_finished)
 
     def _on_login_finished(self, success: bool, message: str):
-        """处理登录完成信号。"""
-        self._worker_busy = False
+        """处理登录结果（由自动登录序列完成信号调用）。"""
         if success:
             self.status_label.setText(f'状态: {message}')
-            # 登录成功后自动查询状态（设备列表由状态查询完成后自动刷新）
-            self._async_check_status()
+            # 登录成功后同时刷新状态和设备列表
+            self._async_refresh()
             # 检查是否启用自动退出
             if self.auto_exit_check.isChecked():
                 QApplication.processEvents()
@@ -235,84 +335,53 @@ class CSUWIFILogin(QMainWindow):
 
     def _on_logout_finished(self, success: bool, message: str):
         """处理注销完成信号。"""
-        self._worker_busy = False
+        self._reply_pending('logout', success, message)
         self.status_label.setText(f'状态: {message}')
         if success:
-            self.online_devices_table.setRowCount(0)
+            self.device_model.clear()
 
     def _on_unbind_finished(self, success: bool, message: str):
         """处理解绑完成信号。"""
-        self._worker_busy = False
         self.status_label.setText(f'状态: {message}')
 
-    def _on_status_finished(self, is_online: bool, data: dict):
-        """处理状态检查完成信号。"""
-        self._worker_busy = False
-        if is_online:
-            uid = data.get('uid', '')
-            v4ip = data.get('v4ip') or data.get('v46ip') or ''
-            self.current_device_ip = v4ip
-            self.current_device_mac = data.get('olmac')
-            self.status_label.setText(f'状态: 已在线 (账号: {uid} IP: {v4ip})')
-
-            # 如果这是自动登录流程中的状态检查，则执行后续操作
-            if hasattr(self, '_auto_login_check_status_flag') and self._auto_login_check_status_flag:
-                self._auto_login_check_status_flag = False
-                # 已在线：执行 解绑→延时→注销→延时→登录
-                self._async_unbind(self.user_input.text())
-                self._auto_timer1 = QTimer(self)
-                self._auto_timer1.setSingleShot(True)
-                self._auto_timer1.timeout.connect(self._auto_login_do_logout)
-                self._auto_timer1.start(2000)
-            else:
-                # 普通状态查询完成后，延迟查询设备列表（给线程停止时间）
-                timer = QTimer(self)
-                timer.setSingleShot(True)
-                timer.timeout.connect(self._async_get_devices)
-                timer.start(100)
+    def _apply_status(self, status: PortalStatus):
+        """根据状态查询结果更新状态栏和本机 IP/MAC。"""
+        self.snapshot_store.save_status(self.user_input.text().strip(), status)
+        if status.online:
+            self.current_device_ip = status.v4ip
+            self.current_device_mac = status.olmac or None
+            self.status_label.setText(f'状态: 已在线 (账号: {status.uid} IP: {status.v4ip})')
         else:
-            error = data.get('error', '当前未在线')
-            if error == '当前未在线':
-                self.status_label.setText('状态: 当前未在线')
-            else:
-                self.status_label.setText(f'状态: {error}')
+            self.status_label.setText(f'状态: {status.error or "当前未在线"}')
             self.current_device_ip = None
             self.current_device_mac = None
+        self.device_model.set_local_device(self.current_device_ip, self.current_device_mac)
+
+    def _on_refresh_finished(self, status: PortalStatus, devices):
+        """处理异步引擎并发刷新（状态 + 设备列表）完成信号。"""
+        self._apply_status(status)
+        if devices is not None:
+            self._on_devices_finished(*devices)
 
-            # 如果这是自动登录流程中的状态检查，则直接登录
-            if hasattr(self, '_auto_login_check_status_flag') and self._auto_login_check_status_flag:
-                self._auto_login_check_status_flag = False
-                self.login()
+    def _on_sequence_step(self, label: str):
+        """处理自动登录序列步骤切换信号。"""
+        self.status_label.setText(f'状态: {label}')
+
+    def _on_sequence_finished(self, success: bool, message: str, elapsed: float):
+        """处理自动登录序列完成信号。"""
+        if success:
+            message = f'{message}（用时 {elapsed:.1f} 秒）'
+        self._reply_pending('auto_login', success, message)
+        self._on_login_finished(success, message)
 
     def _on_devices_finished(self, success: bool, devices: list, message: str):
         """处理获取设备列表完成信号。"""
-        self._worker_busy = False
         self.status_label.setText(f'状态: {message}')
         if success:
-            self.online_devices_table.setRowCount(len(devices))
-            for i, device in enumerate(devices):
-                device_type = "PC" if device.get("phone_flag") == "0" else "手机"
-                online_ip = device.get('online_ip', '')
-                online_mac = device.get('online_mac', '')
-
-                # 检查是否为本机
-                if online_ip and online_mac and online_ip == self.current_device_ip and online_mac == self.current_device_mac:
-                    device_type += " (本机)"
-
-                # 创建单元格并设置居中对齐
-                ip_item = QTableWidgetItem(online_ip)
-                ip_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-                mac_item = QTableWidgetItem(online_mac)
-                mac_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-                time_item = QTableWidgetItem(device.get('online_time', ''))
-                time_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-                type_item = QTableWidgetItem(device_type)
-                type_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-
-                self.online_devices_table.setItem(i, 0, ip_item)
-                self.online_devices_table.setItem(i, 1, mac_item)
-                self.online_devices_table.setItem(i, 2, time_item)
-                self.online_devices_table.setItem(i, 3, type_item)
+            # 模型只对变化的行和单元格做增量更新
+            self.device_model.apply(devices)
+            self.device_model.set_stale(False)
+            self.snapshot_store.save_devices(self.user_input.text().strip(), devices)
 
     def load_config(self, suppress_auto_sequence: bool = False):
         """加载配置从QSettings。"""
@@ -326,6 +395,13 @@ class CSUWIFILogin(QMainWindow):
         schedule_days_interval = int(self.settings.value('schedule/days_interval', 2))
         schedule_weekdays_raw = self.settings.value('schedule/weekdays', '', str)
         selected_weekdays = [d for d in schedule_weekdays_raw.split(',') if d] if schedule_weekdays_raw else []
+        status_ttl = float(self.settings.value('network/status_ttl', STATUS_TTL))
+        portal_ip = self.settings.value('network/portal_ip', '', str)
+
+        # 状态缓存时间（秒），设为 0 可关闭缓存
+        self.network_worker.client.status_cache.ttl = status_ttl
+        # 固定门户 IP（逗号分隔），认证前跳过 DNS 解析；留空则使用缓存/实时解析
+        self.network_worker.client.resolver.pin(PORTAL_HOST, parse_addresses(portal_ip))
 
         # Populate UI
         self.user_input.setText(username)
@@ -343,67 +419,162 @@ class CSUWIFILogin(QMainWindow):
         self.schedule_days_spinbox.setValue(schedule_days_interval)
         for day_code, checkbox in self.weekday_checkboxes.items():
             checkbox.setChecked(day_code in selected_weekdays)
+        backend_index = self.schedule_backend_combo.findData(
+            self.settings.value('schedule/backend', scheduler.DEFAULT_BACKEND, str))
+        self.schedule_backend_combo.setCurrentIndex(max(0, backend_index))
         self.update_schedule_options_ui()
+        if schedule_enabled and not self.headless and self._schedule_backend() == scheduler.BACKEND_APP:
+            self.scheduler.apply(self._current_schedule())
 
         # 启动时执行状态查询和设备刷新
         if not suppress_auto_sequence and not self.headless:
+            # 先用上次的快照立即绘制，查询结果返回后再替换
+            self._paint_snapshot(username)
             if auto_login:
                 # 勾选了自动登录，执行自动登录序列
                 self._start_auto_login_sequence()
             else:
                 # 未勾选自动登录，只查询状态和刷新设备
-                self._async_check_status()
+                self._async_refresh()
 
-    def _start_auto_login_sequence(self):
-        """异步自动登录流程。"""
-        self._auto_login_check_status_flag = True
-        self._async_check_status()
+    def _on_network_changed(self, kinds) -> None:
+        """网络变化后立即检查状态；勾选了自动登录时，未在线则直接登录。"""
+        self.network_worker.client.network_changed()
+        username = self.user_input.text()
+        password = self.pass_input.text()
+        if not password and username:
+            password = secure_storage.get_password(username) or ''
+        if self.auto_login_check.isChecked() and username and password:
+            self.status_label.setText('状态: 检测到网络变化，正在检查状态...')
+            self._submit_task('auto_login', {
+                'username': username,
+                'password': password,
+                'net_type': self.net_combo.currentText(),
+                'mode': MODE_ENSURE
+            })
+        else:
+            self.status_label.setText('状态: 检测到网络变化，正在查询状态...')
+            self._async_refresh()
 
-    def _auto_login_do_logout(self):
-        """自动登录流程中的注销步骤。"""
-        self._async_logout()
-        # 使用单次定时器连接下一步（登录）
-        self._auto_timer2 = QTimer(self)
-        self._auto_timer2.setSingleShot(True)
-        self._auto_timer2.timeout.connect(self.login)
-        self._auto_timer2.start(2000)
-
-    def _async_login(self, user_account: str, password: str) -> None:
-        """异步执行登录操作（在后台线程中运行）。"""
-        if self._worker_busy:
+    def _paint_snapshot(self, username: str) -> None:
+        """用磁盘快照绘制状态栏和设备列表，并标记为过期。"""
+        snapshot = self.snapshot_store.load(username)
+        if snapshot is None:
+            return
+        saved_at = time.strftime('%m-%d %H:%M', time.localtime(snapshot.saved_at))
+        status = snapshot.status
+        if status is not None and status.online:
+            self.current_device_ip = status.v4ip
+            self.current_device_mac = status.olmac or None
+            text = f'已在线 (账号: {status.uid} IP: {status.v4ip})'
+        elif status is not None:
+            text = '当前未在线'
+        else:
+            text = '上次状态未知'
+        self.status_label.setText(f'状态: {text} · 记录于 {saved_at}，正在刷新...')
+        if snapshot.devices is not None:
+            self.device_model.apply(snapshot.devices)
+            self.device_model.set_stale(True)
+        self.device_model.set_local_device(self.current_device_ip, self.current_device_mac)
+
+    def _start_auto_login_sequence(self, mode: str = MODE_REBIND) -> bool:
+        """异步自动登录流程：默认已在线则 解绑→注销→登录，未在线直接登录。返回是否已提交。
+
+        由 login_sequence 状态机在 NetworkWorker 线程中驱动，与无界面模式共用。
+        """
+        username = self.user_input.text()
+        password = self.pass_input.text()
+        if not password and username:
+            kp = secure_storage.get_password(username)
+            if kp:
+                password = kp
+                self.pass_input.setText(kp)
+
+        if not username or not password:
+            self.status_label.setText('状态: 请填写学号和密码')
+            return False
+
+        self._submit_task('auto_login', {
+            'username': username,
+            'password': password,
+            'net_type': self.net_combo.currentText(),
+            'mode': mode
+        })
+        return True
+
+    def _on_schedule_fired(self, name: str) -> None:
+        """定时登录到点：与 --auto-login 一样执行 解绑→注销→登录。"""
+        self.status_label.setText('状态: 定时登录...')
+        self._start_auto_login_sequence(MODE_FORCE)
+
+    def _on_instance_request(self, request) -> None:
+        """处理其他进程转交来的命令，使用本进程已建立的连接和缓存。"""
+        if request.command == COMMAND_SHOW:
+            self.showNormal()
+            self.raise_()
+            self.activateWindow()
+            request.reply(True, '已切换到运行中的窗口')
+        elif request.command == COMMAND_STATUS:
+            engine = self.engine_bridge.engine
+            future = engine.submit(engine.check_status())
+            future.add_done_callback(lambda f: request.reply(*status_reply(f.result()))
+                                     if f.exception() is None else request.reply(False, str(f.exception())))
+        elif request.command == COMMAND_LOGOUT:
+            self._pending_requests['logout'].append(request)
+            self._async_logout()
+        elif request.command == COMMAND_AUTO_LOGIN:
+            # 与 --auto-login 相同：解绑→注销→登录
+            if not self._start_auto_login_sequence(MODE_FORCE):
+                request.reply(False, '请先在程序中保存学号和密码')
+            elif request.options.get('wait'):
+                self._pending_requests['auto_login'].append(request)
+            else:
+                request.reply(True, '已转交给运行中的实例执行自动登录')
+        else:
+            request.reply(False, f'未知命令: {request.command}')
+
+    def _reply_pending(self, kind: str, success: bool, message: str) -> None:
+        """应答等待 kind 类任务结束的转交命令。"""
+        pending, self._pending_requests[kind] = self._pending_requests[kind], []
+        for request in pending:
+            request.reply(success, message)
+
+    def _submit_task(self, operation: str, params: dict = None) -> None:
+        """将网络任务加入队列，并在 worker 空闲时立即调度。"""
+        self._task_queue.push(operation, params)
+        self._dispatch_next_task()
+
+    def _on_task_expired(self, task) -> None:
+        """控制操作在队列中等待过久被丢弃：按失败处理，并应答等待它的转交命令。"""
+        message = '操作在队列中等待超时，已取消，请重试'
+        if task.operation == 'logout':
+            self._on_logout_finished(False, message)
+        elif task.operation == 'unbind':
+            self._on_unbind_finished(False, message)
+        elif task.operation == 'auto_login':
+            self._on_sequence_finished(False, message, 0.0)
+
+    def _dispatch_next_task(self) -> None:
+        """worker 空闲时从队列中取出下一个任务执行。"""
+        if self.network_worker.isRunning():
+            # 当前任务结束时 finished 信号会再次触发调度
+            return
+        task = self._task_queue.pop()
+        if task is None:
             return
-        self._worker_busy = True
-        self.network_worker.set_login_task(user_account, password)
+        self.network_worker.set_task(task.operation, task.params)
         self.network_worker.start()
 
     def _async_logout(self) -> None:
         """异步执行注销操作（在后台线程中运行）。"""
-        if self._worker_busy:
-            return
-        self._worker_busy = True
-        self.network_worker.set_logout_task()
-        self.network_worker.start()
+        self._submit_task('logout')
 
     def _async_unbind(self, username: str) -> None:
         """异步执行解绑操作（在后台线程中运行）。"""
-        if self._worker_busy:
-            return
-        self._worker_busy = True
-        self.network_worker.set_unbind_task(username)
-        self.network_worker.start()
-
-    def _async_check_status(self) -> None:
-        """异步执行状态检查（在后台线程中运行）。"""
-        if self._worker_busy:
-            return
-        self._worker_busy = True
-        self.network_worker.set_status_check_task()
-        self.network_worker.start()
+        self._submit_task('unbind', {'username': username})
 
     def _async_get_devices(self) -> None:
         """异步获取在线设备列表（在后台线程中运行）。"""
-        if self._worker_busy:
-            return
         username = self.user_input.text()
         password = self.pass_input.text()
         # 如果密码为空，尝试从 keyring 获取
@@ -413,58 +584,25 @@ class CSUWIFILogin(QMainWindow):
                 password = kp
                 self.pass_input.setText(kp)
         if username and password:
-            self._worker_busy = True
-            self.network_worker.set_devices_query_task(username, password)
-            self.network_worker.start()
+            self._submit_task('get_devices', {'username': username, 'password': password})
 
-    def run_headless_auto_login_sequence(self, delay_seconds: int = 2) -> None:
-        """静默模式下执行 解绑→延时→注销→延时→登录（同步方式）。"""
+    def _async_refresh(self) -> None:
+        """通过异步引擎同时查询状态和在线设备列表。"""
         username = self.user_input.text()
         password = self.pass_input.text()
-        net_type = self.net_combo.currentText()
-
-        if not username or not password:
-            print("错误: 请先填写学号和密码")
-            return
-
-        net_types = {
-            '中国电信': 'telecomn',
-            '中国移动': 'cmccn',
-            '中国联通': 'unicomn',
-            '校园网': ''
-        }
-        user_account = f"{username}@{net_types[net_type]}" if net_types[net_type] else username
-
-        # 同步执行：解绑
-        try:
-            url = f'https://portal.csu.edu.cn:802/eportal/portal/mac/unbind?user_account={username}'
-            requests.get(url, timeout=5)
-            print("解绑完成")
-        except Exception as e:
-            print(f"解绑失败: {e}")
-
-        time.sleep(max(0, delay_seconds))
-
-        # 同步执行：注销
-        try:
-            url = 'https://portal.csu.edu.cn:802/eportal/portal/logout'
-            requests.get(url, timeout=5)
-            print("注销完成")
-        except Exception as e:
-            print(f"注销失败: {e}")
-
-        time.sleep(max(0, delay_seconds))
+        if not password and username:
+            kp = secure_storage.get_password(username)
+            if kp:
+                password = kp
+                self.pass_input.setText(kp)
+        self.engine_bridge.refresh(username, password)
 
-        # 同步执行：登录
-        try:
-            url = f'https://portal.csu.edu.cn:802/eportal/portal/login?user_account={user_account}&user_password={password}'
-            response = requests.get(url, timeout=5)
-            if '{"result":1,"msg":"Portal协议认证成功！"}' in response.text:
-                print("登录成功")
-            else:
-                print(f"登录失败: {response.text}")
-        except Exception as e:
-            print(f"登录失败: {e}")
+    def run_headless_auto_login_sequence(self, delay_seconds: int = 2) -> None:
+        """静默模式下执行 解绑→延时→注销→延时→登录（同步方式）。"""
+        headless.run_auto_login_sequence(self.user_input.text(), self.pass_input.text(),
+                                         self.net_combo.currentText(),
+                                         client=self.network_worker.client,
+                                         delay_seconds=delay_seconds)
 
     def save_config(self):
         """保存配置到QSettings。"""
@@ -484,62 +622,24 @@ class CSUWIFILogin(QMainWindow):
         self.settings.setValue('schedule/type', self.schedule_type_combo.currentText())
         self.settings.setValue('schedule/days_interval', self.schedule_days_spinbox.value())
         self.settings.setValue('schedule/weekdays', ','.join(selected_weekdays))
+        self.settings.setValue('schedule/backend', self._schedule_backend())
 
         # 保存或清除密码（总是保存，因为定时登录需要用到）
-        if username and pwd:
-            secure_storage.set_password(username, pwd)
-        elif username and not pwd:
-            secure_storage.delete_password(username)
+        try:
+            if username and pwd:
+                secure_storage.set_password(username, pwd)
+            elif username and not pwd:
+                secure_storage.delete_password(username)
+        except Exception as e:
+            QMessageBox.warning(self, '保存密码失败', f'配置已保存，但密码未能保存：{e}')
+            return
 
         QMessageBox.information(self, '成功', '配置已保存！')
 
     def gui_login(self):
         """GUI登录按钮点击处理。"""
-        username = self.user_input.text()
-        password = self.pass_input.text()
-
-        # 如果密码为空，尝试从keyring获取
-        if not password and username:
-            kp = secure_storage.get_password(username)
-            if kp:
-                password = kp
-                self.pass_input.setText(kp)
-
-        if not username or not password:
-            self.status_label.setText('状态: 请填写学号和密码')
-            return
-
         self._start_auto_login_sequence()
 
-    def login(self):
-        username = self.user_input.text()
-        password = self.pass_input.text()
-        # If password empty, try to fetch from keyring lazily
-        if not password and username:
-            kp = secure_storage.get_password(username)
-            if kp:
-                password = kp
-                self.pass_input.setText(kp)
-        net_type = self.net_combo.currentText()
-
-        if not username or not password:
-            self.status_label.setText('状态: 请填写学号和密码')
-            return
-
-        net_types = {
-            '中国电信': 'telecomn',
-            '中国移动': 'cmccn',
-            '中国联通': 'unicomn',
-            '校园网': ''
-        }
-        user_account = f"{username}@{net_types[net_type]}" if net_types[net_type] else username
-
-        self.status_label.setText(f"状态: 正在使用 {net_type} 账户登录...")
-        QApplication.processEvents()
-
-        # 使用异步方式执行登录
-        self._async_login(user_account, password)
-
     def logout(self):
         self.status_label.setText('状态: 正在注销...')
         QApplication.processEvents()
@@ -580,74 +680,90 @@ class CSUWIFILogin(QMainWindow):
         elif schedule_type == "每周":
             self.days_interval_widget.hide()
             self.weekdays_widget.show()
+        if self._schedule_backend() == scheduler.BACKEND_SCHTASKS:
+            self.schedule_help_label.setText('启用后，Windows 计划任务将在指定时间执行静默登录，程序不必保持运行。')
+        else:
+            self.schedule_help_label.setText('启用后，程序运行期间将在指定时间自动执行登录操作（建议同时开机自启）。')
+
+    def _schedule_backend(self) -> str:
+        """界面上选择的定时方式：schtasks 为 Windows 计划任务（Windows 上的默认值），app 为进程内调度。
+
+        计划任务只在 Windows 上可用，其他平台总是进程内调度。
+        """
+        if sys.platform != 'win32':
+            return scheduler.BACKEND_APP
+        return self.schedule_backend_combo.currentData() or scheduler.DEFAULT_BACKEND
+
+    def _current_schedule(self):
+        """根据界面上的定时设置构造 scheduler.Schedule；每周但未选择日期时返回 None。"""
+        schedule_time = self.schedule_time_edit.time()
+        selected_days = tuple(day_code for day_code, cb in self.weekday_checkboxes.items() if cb.isChecked())
+        start_date = QDate.fromString(self.settings.value('schedule/start_date', '', str), Qt.DateFormat.ISODate)
+        schedule = scheduler.Schedule(self.schedule_type_combo.currentText(),
+                                      schedule_time.hour(), schedule_time.minute(),
+                                      self.schedule_days_spinbox.value(), selected_days,
+                                      start_date.toPyDate() if start_date.isValid() else None)
+        if schedule.kind == scheduler.SCHEDULE_WEEKLY and not schedule.weekdays:
+            return None
+        return schedule
 
     def handle_scheduled_task(self):
-        task_name = "CSUWIFILogin_Scheduled"
+        # 只有修改定时任务时才需要 subprocess，不在启动时导入
+        import subprocess
 
         if not self.schedule_group.isChecked():
-            # Delete task command
-            command = f'schtasks /delete /tn "{task_name}" /f'
-            try:
-                result = subprocess.run(command, shell=True, capture_output=True, text=True)
-                if result.returncode == 0:
-                    QMessageBox.information(self, '成功', '定时任务已删除。')
-                else:
-                    # It's okay if the task didn't exist.
-                    QMessageBox.information(self, '提示', '定时任务已禁用或不存在。')
-            except Exception as e:
-                QMessageBox.critical(self, '错误', f'删除定时任务时出错: {e}')
+            self.scheduler.apply(None)
+            if sys.platform == 'win32':
+                # 同时删除 Windows 计划任务（schtasks 方式或旧版本创建的）
+                try:
+                    result = subprocess.run(scheduler.schtasks_delete_argv(), capture_output=True, text=True)
+                    if result.returncode == 0:
+                        QMessageBox.information(self, '成功', '定时任务已删除。')
+                    else:
+                        # It's okay if the task didn't exist.
+                        QMessageBox.information(self, '提示', '定时任务已禁用或不存在。')
+                except Exception as e:
+                    QMessageBox.critical(self, '错误', f'删除定时任务时出错: {e}')
+            else:
+                QMessageBox.information(self, '成功', '定时登录已关闭。')
             self.save_config()
             return
 
         # --- Create or Update Task ---
-        # 使用统一构造函数生成静默运行命令
-        invoke_cmd = self._build_headless_invoke_cmd()
-
-        schedule_time = self.schedule_time_edit.time().toString("HH:mm")
-        schedule_type = self.schedule_type_combo.currentText()
-
-        base_command = f'schtasks /create /tn "{task_name}" /tr "{invoke_cmd}" /st {schedule_time} /f'
-
-        if schedule_type == "每天":
-            modifier = "/sc DAILY"
-        elif schedule_type == "每隔几天":
-            days = self.schedule_days_spinbox.value()
-            modifier = f"/sc DAILY /mo {days}"
-        elif schedule_type == "每周":
-            selected_days = [day_code for day_code, cb in self.weekday_checkboxes.items() if cb.isChecked()]
-            if not selected_days:
-                QMessageBox.warning(self, '警告', '请至少选择一个星期中的日期。')
-                return
-            days_str = ",".join(selected_days)
-            modifier = f"/sc WEEKLY /d {days_str}"
-        else:
+        if self.schedule_type_combo.currentText() not in (scheduler.SCHEDULE_DAILY, scheduler.SCHEDULE_EVERY_N_DAYS,
+                                                         scheduler.SCHEDULE_WEEKLY):
             QMessageBox.critical(self, '错误', '未知的计划类型。')
             return
+        # “每隔几天”从今天起算（与 schtasks /mo 的行为一致）
+        self.settings.setValue('schedule/start_date', QDate.currentDate().toString(Qt.DateFormat.ISODate))
+        schedule = self._current_schedule()
+        if schedule is None:
+            QMessageBox.warning(self, '警告', '请至少选择一个星期中的日期。')
+            return
 
-        command = f'{base_command} {modifier}'
-
-        try:
-            subprocess.run(command, check=True, shell=True, capture_output=True, text=True)
-            QMessageBox.information(self, '成功', '定时任务已成功应用。')
-        except subprocess.CalledProcessError as e:
-            QMessageBox.critical(self, '错误', f'应用定时任务失败: {e.stderr}')
+        if self._schedule_backend() == scheduler.BACKEND_SCHTASKS:
+            self.scheduler.apply(None)
+            command = scheduler.headless_argv('--auto-login', windowless=True)
+            try:
+                subprocess.run(scheduler.schtasks_create_argv(schedule, command),
+                               check=True, capture_output=True, text=True)
+                QMessageBox.information(self, '成功', '定时任务已成功应用。')
+            except (OSError, subprocess.CalledProcessError) as e:
+                QMessageBox.critical(self, '错误', f'应用定时任务失败: {getattr(e, "stderr", None) or e}')
+        else:
+            if sys.platform == 'win32':
+                # 用户选择了进程内定时：删除计划任务，避免同一时间登录两次
+                try:
+                    subprocess.run(scheduler.schtasks_delete_argv(), capture_output=True, text=True)
+                except OSError:
+                    pass
+            self.scheduler.apply(schedule)
+            next_run = time.strftime('%Y-%m-%d %H:%M', time.localtime(self.scheduler.next_run() or 0))
+            QMessageBox.information(self, '成功', f'定时登录已应用（{schedule.describe()}），下一次: {next_run}。\n'
+                                                 '程序需保持运行，建议同时开机自启。')
 
         self.save_config()
 
-    def _build_headless_invoke_cmd(self) -> str:
-        """构造一次性静默运行命令，返回完整命令字符串，路径已加引号。"""
-        if getattr(sys, 'frozen', False):
-            return f'"{sys.executable}" --auto-login'
-        python_exec = sys.executable
-        py_dir = os.path.dirname(python_exec)
-        pythonw_candidate = os.path.join(py_dir, 'pythonw.exe')
-        if os.path.basename(python_exec).lower() == 'python.exe' and os.path.exists(pythonw_candidate):
-            interpreter = f'"{pythonw_candidate}"'
-        else:
-            interpreter = f'"{python_exec}"'
-        script_path = f'"{os.path.abspath(__file__)}"'
-        return f'{interpreter} {script_path} --auto-login'
-
     def handle_startup(self, state):
         app_name = "CSUWIFILogin"
         app_path = os.path.abspath(sys.argv[0])
@@ -663,34 +779,46 @@ class CSUWIFILogin(QMainWindow):
         else:
             settings.remove(app_name)
 
+    def closeEvent(self, event):
+        """关闭窗口时停止网络变化监测、定时登录、单实例监听、状态广播和历史记录，取消正在运行的自动登录序列并停止异步引擎。"""
+        self._task_queue.clear()
+        self.network_monitor.stop()
+        self.scheduler.stop()
+        self.instance.stop()
+        status_broadcast.stop()
+        history.stop()
+        for kind in self._pending_requests:
+            self._reply_pending(kind, False, '程序已退出')
+        self.network_worker.cancel_sequence()
+        self.engine_bridge.shutdown()
+        super().closeEvent(event)
+
     def check_status(self):
         """异步检查当前网络认证状态。"""
         self.status_label.setText('状态: 正在查询状态...')
         QApplication.processEvents()
-        self._async_check_status()
+        self._async_refresh()
 
 
 
 if __name__ == '__main__':
-    # Handle command line arguments for silent auto-login
-    if '--auto-login' in sys.argv:
-        app = QApplication.instance() # Check if an instance already exists
-        if not app:
-            app = QApplication(sys.argv)
-
-        # headless 模式：以同步方式执行 解绑→延时→注销→延时→登录
-        login_task = CSUWIFILogin(headless=True)
-        login_task.run_headless_auto_login_sequence(delay_seconds=2)
-        # No app.exec() is called, so the script will exit after the attempt.
-        sys.exit(0)
-
-
+    # --auto-login 已在文件开头的快速路径中处理
+    startup_profile.mark('modules imported')
     app = QApplication(sys.argv)
+    startup_profile.mark('QApplication created')
 
     # 设置全局字体为微软雅黑
     font = QFont("Microsoft YaHei", 9)
     app.setFont(font)
 
+    # --metrics [PATH]：退出时导出本次运行的门户请求计时指标
+    metrics_path = metrics.metrics_path_from_argv(sys.argv[1:])
+    if metrics_path is not None:
+        app.aboutToQuit.connect(lambda: metrics.dump(metrics_path))
+
     ex = CSUWIFILogin()
+    startup_profile.mark('window constructed')
     ex.show()
+    # --profile-startup：首次绘制后输出各模块导入耗时与启动里程碑并退出
+    startup_profile.finish_on_first_paint(ex, app, sys.argv[1:])
     sys.exit(app.exec())
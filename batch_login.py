@@ -0,0 +1,275 @@
+"""
+多账号批量登录模块。
+
+从账号列表文件读取 学号,密码,运营商，用有界线程池并发执行登录序列；
+所有请求经过按主机的令牌桶限速，避免瞬间压垮门户。结束后输出
+每个账号的结果与耗时表。全程不导入 Qt。
+
+账号列表为 CSV（可省略表头），每行: 学号,密码,运营商
+  - 运营商使用与 GUI 相同的名称（中国电信/中国移动/中国联通/校园网），也可直接写账号后缀；
+    省略时为 校园网
+  - 密码留空时从系统密钥环读取该学号保存的密码
+  - 空行和以 # 开头的行会被忽略
+
+用法: python CSU_WIFI_Login.py --batch accounts.csv [--workers 8] [--rate 20] [--mode ensure]
+"""
+
+import argparse
+import concurrent.futures
+import csv
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urlsplit
+
+import requests
+
+from login_sequence import (MODE_ENSURE, MODE_FORCE, MODE_REBIND, STATE_LOGIN, STATE_LOGOUT, STEPS,
+                            LoginSequence, SequenceResult, Step)
+from portal_client import PortalClient
+from portal_ops import NET_TYPES
+from retry_policy import CircuitBreakers, RetryPolicy
+
+DEFAULT_WORKERS = 8
+# 每个主机每秒允许的请求数与突发量
+DEFAULT_RATE = 20.0
+DEFAULT_BURST = 5
+
+DEFAULT_NET_TYPE = '校园网'
+MODES = (MODE_ENSURE, MODE_FORCE, MODE_REBIND)
+
+
+def _without_settle(step: Step) -> Step:
+    return Step(step.name, step.label, step.action, step.transitions, ready=None,
+                timeout=step.timeout, settle_on_failure=step.settle_on_failure)
+
+
+# chkstatus 描述的是本机 IP 而不是账号，并发的账号会互相改变它：注销和登录之后不等待状态，
+# 每个账号的结果以门户对该账号请求的回复为准（查询状态步骤仍按 uid 区分本账号与其他账号）
+BATCH_STEPS: Dict[str, Step] = {
+    state: _without_settle(step) if state in (STATE_LOGOUT, STATE_LOGIN) else step
+    for state, step in STEPS.items()
+}
+
+
+class HostRateLimiter:
+    """按主机划分的令牌桶限速器（线程安全）。
+
+    令牌不足时预占令牌并在锁外等待，因此并发请求会按 1/rate 的间隔依次放行。
+    """
+
+    def __init__(self, rate: float, burst: int = DEFAULT_BURST,
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, List[float]] = {}  # host → [tokens, last_refill]
+
+    def acquire(self, host: str) -> float:
+        """取得一个令牌，返回等待的秒数。"""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = self._clock()
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = self._buckets[host] = [float(self.burst), now]
+            tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[0] = tokens - 1
+            bucket[1] = now
+            wait = 0.0 if tokens >= 1 else (1 - tokens) / self.rate
+        if wait > 0:
+            self._sleep(wait)
+        return wait
+
+
+class RateLimitedClient(PortalClient):
+    """每次请求前先向限速器取得令牌的 PortalClient。"""
+
+    def __init__(self, limiter: HostRateLimiter, **kwargs):
+        super().__init__(**kwargs)
+        self.limiter = limiter
+
+    def _get(self, endpoint: str, base: str, path: str) -> requests.Response:
+        self.limiter.acquire(urlsplit(base).netloc)
+        return super()._get(endpoint, base, path)
+
+
+class Account:
+    """批量登录的一个账号。"""
+
+    __slots__ = ('username', 'password', 'net_type')
+
+    def __init__(self, username: str, password: str, net_type: str = DEFAULT_NET_TYPE):
+        self.username = username
+        self.password = password
+        self.net_type = net_type
+
+
+class BatchResult:
+    """单个账号的登录结果。"""
+
+    __slots__ = ('account', 'success', 'message', 'elapsed')
+
+    def __init__(self, account: Account, success: bool, message: str, elapsed: float):
+        self.account = account
+        self.success = success
+        self.message = message
+        self.elapsed = elapsed
+
+
+def normalize_net_type(value: str) -> str:
+    """把运营商名称或账号后缀统一为 NET_TYPES 中的名称；无法识别时抛出 ValueError。"""
+    value = value.strip()
+    if not value:
+        return DEFAULT_NET_TYPE
+    if value in NET_TYPES:
+        return value
+    for name, suffix in NET_TYPES.items():
+        if suffix and value.lower() == suffix:
+            return name
+    raise ValueError(f'未知的运营商: {value}')
+
+
+def read_accounts(lines, password_lookup: Optional[Callable[[str], Optional[str]]] = None) -> List[Account]:
+    """解析账号列表，返回 Account 列表。格式错误时抛出 ValueError（附行号）。"""
+    accounts = []
+    for lineno, row in enumerate(csv.reader(lines), start=1):
+        if not row or not row[0].strip() or row[0].lstrip().startswith('#'):
+            continue
+        username = row[0].strip()
+        if lineno == 1 and username in ('学号', 'username'):
+            continue
+        password = row[1].strip() if len(row) > 1 else ''
+        try:
+            net_type = normalize_net_type(row[2] if len(row) > 2 else '')
+        except ValueError as e:
+            raise ValueError(f'第 {lineno} 行: {e}') from None
+        if not password and password_lookup is not None:
+            password = password_lookup(username) or ''
+        if not password:
+            raise ValueError(f'第 {lineno} 行: 账号 {username} 没有密码')
+        accounts.append(Account(username, password, net_type))
+    return accounts
+
+
+class BatchLogin:
+    """用有界线程池并发执行多个账号的登录序列。
+
+    每个工作线程持有自己的 RateLimitedClient，在多个账号之间复用 keep-alive 连接；
+    所有客户端共用同一个按主机的限速器、同一组熔断器和重试配额。
+    """
+
+    def __init__(self, accounts: List[Account], workers: int = DEFAULT_WORKERS,
+                 rate: float = DEFAULT_RATE, burst: int = DEFAULT_BURST,
+                 mode: str = MODE_ENSURE, client_kwargs: Optional[Dict] = None):
+        self.accounts = accounts
+        self.workers = max(1, min(workers, len(accounts) or 1))
+        self.limiter = HostRateLimiter(rate, burst)
+        self.mode = mode
+        self.client_kwargs = dict(client_kwargs or {})
+        # 所有客户端共用熔断器和重试配额：门户故障时整批账号一起快速失败，而不是各自重试
+        self.client_kwargs.setdefault('breakers', CircuitBreakers())
+        self.client_kwargs.setdefault('retry_policy', RetryPolicy())
+        self._local = threading.local()
+        self._clients: List[PortalClient] = []
+        self._clients_lock = threading.Lock()
+
+    def _client(self) -> PortalClient:
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = RateLimitedClient(self.limiter, **self.client_kwargs)
+            with self._clients_lock:
+                self._clients.append(client)
+        return client
+
+    def _login_one(self, account: Account) -> BatchResult:
+        start = time.perf_counter()
+        sequence = LoginSequence(account.username, account.password, account.net_type,
+                                 client=self._client(), mode=self.mode, steps=BATCH_STEPS)
+        try:
+            result: SequenceResult = sequence.run()
+            success, message = result.success, result.message
+        except Exception as e:
+            success, message = False, f'登录出错 - {e}'
+        return BatchResult(account, success, message, time.perf_counter() - start)
+
+    def run(self, on_result: Optional[Callable[[BatchResult], None]] = None) -> List[BatchResult]:
+        """执行批量登录，按输入顺序返回结果；on_result 在每个账号完成时调用。"""
+        results: List[Optional[BatchResult]] = [None] * len(self.accounts)
+        try:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=self.workers,
+                                                       thread_name_prefix='batch-login') as executor:
+                futures = {executor.submit(self._login_one, account): index
+                           for index, account in enumerate(self.accounts)}
+                for future in concurrent.futures.as_completed(futures):
+                    result = future.result()
+                    results[futures[future]] = result
+                    if on_result is not None:
+                        on_result(result)
+        finally:
+            for client in self._clients:
+                client.close()
+        return results
+
+
+def format_table(results: List[BatchResult], wall_seconds: float) -> str:
+    """生成 账号/运营商/结果/耗时/消息 结果表与汇总行。"""
+    lines = [f"{'学号':<16}{'运营商':<8}{'结果':<6}{'耗时 ms':>10}  消息"]
+    for result in results:
+        status = '成功' if result.success else '失败'
+        lines.append(f'{result.account.username:<16}{result.account.net_type:<8}{status:<6}'
+                     f'{result.elapsed * 1000:>10.0f}  {result.message}')
+    succeeded = sum(1 for result in results if result.success)
+    latencies = sorted(result.elapsed for result in results)
+    if latencies:
+        p50 = latencies[len(latencies) // 2]
+        p95 = latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+        lines.append(f'成功 {succeeded}/{len(results)}，总用时 {wall_seconds:.2f} s，'
+                     f'单账号 p50 {p50 * 1000:.0f} ms / p95 {p95 * 1000:.0f} ms')
+    return '\n'.join(lines)
+
+
+def main(argv=None) -> int:
+    """--batch 入口：全部成功时返回 0。"""
+    parser = argparse.ArgumentParser(prog='CSU_WIFI_Login.py --batch', description='多账号批量登录')
+    parser.add_argument('--batch', dest='accounts_file', required=True, help='账号列表 CSV 文件，- 表示标准输入')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help='并发账号数')
+    parser.add_argument('--rate', type=float, default=DEFAULT_RATE, help='每个主机每秒请求数上限，0 表示不限')
+    parser.add_argument('--burst', type=int, default=DEFAULT_BURST, help='限速的突发请求数')
+    parser.add_argument('--mode', choices=MODES, default=MODE_ENSURE,
+                        help='ensure: 本账号未在线才登录；force: 解绑→注销→登录；rebind: 在线时重新绑定')
+    args, _ = parser.parse_known_args(argv)
+
+    def password_lookup(username: str) -> Optional[str]:
+        import secure_storage
+        return secure_storage.get_password(username)
+
+    try:
+        if args.accounts_file == '-':
+            accounts = read_accounts(sys.stdin, password_lookup)
+        else:
+            with open(args.accounts_file, encoding='utf-8-sig', newline='') as f:
+                accounts = read_accounts(f, password_lookup)
+    except (OSError, ValueError) as e:
+        print(f'错误: {e}', file=sys.stderr)
+        return 2
+    if not accounts:
+        print('错误: 账号列表为空', file=sys.stderr)
+        return 2
+
+    batch = BatchLogin(accounts, workers=args.workers, rate=args.rate, burst=args.burst, mode=args.mode)
+    start = time.perf_counter()
+    results = batch.run(on_result=lambda r: print(f"{r.account.username}: {'成功' if r.success else '失败'}",
+                                                  flush=True))
+    print()
+    print(format_table(results, time.perf_counter() - start))
+    return 0 if all(result.success for result in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
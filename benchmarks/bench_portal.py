@@ -0,0 +1,132 @@
+"""
+门户交互端到端延迟基准测试。
+
+启动本地门户模拟服务器（stub_portal），分别测量 NetworkWorker 的各项操作
+以及完整自动登录序列的延迟（p50/p95）和连接新建/复用次数。
+结果可用 --json 导出，便于在不同提交之间比较。
+
+用法: python benchmarks/bench_portal.py [--iterations 50] [--latency-ms 5] [--json out.json]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from stub_portal import StubConfig, StubPortal  # noqa: E402
+
+from login_sequence import MODE_FORCE, MODE_REBIND, LoginSequence  # noqa: E402
+from network_worker import NetworkWorker  # noqa: E402
+
+WORKER_OPERATIONS = {
+    'check_status': {},
+    'get_devices': {'username': 'bench', 'password': 'bench'},
+    'login': {'user_account': 'bench', 'password': 'bench'},
+    'logout': {},
+    'unbind': {'username': 'bench'},
+}
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    k = (len(ordered) - 1) * pct / 100
+    lower = int(k)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (k - lower)
+
+
+def run_case(stub: StubPortal, name: str, iterations: int, setup: Callable, action: Callable) -> Dict:
+    """对一个场景做 iterations 次计时，返回统计结果。"""
+    client = stub.client(status_ttl=0)
+    context = setup(client)
+    action(context)  # 预热：建立连接
+    client.stats.reset()
+    stub.reset_counters()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        action(context)
+        samples.append((time.perf_counter() - start) * 1000)
+    stats = client.stats.snapshot()
+    client.close()
+    return {
+        'name': name,
+        'iterations': iterations,
+        'p50_ms': percentile(samples, 50),
+        'p95_ms': percentile(samples, 95),
+        'mean_ms': statistics.fmean(samples),
+        'requests': stats['requests'],
+        'connections_opened': stats['opened'],
+        'connections_reused': stats['reused'],
+        'server_connections': stub.connections,
+    }
+
+
+def worker_case(operation: str, params: Dict):
+    def setup(client):
+        return NetworkWorker(client)
+
+    def action(worker):
+        worker.set_task(operation, params)
+        worker.run()  # 在当前线程同步执行，只测网络与解析本身
+
+    return setup, action
+
+
+def sequence_case(stub: StubPortal, mode: str):
+    def setup(client):
+        return client
+
+    def action(client):
+        stub.set_online(True)
+        result = LoginSequence('bench', 'bench', '校园网', client=client, mode=mode).run()
+        if not result.success:
+            raise RuntimeError(f'登录序列失败: {result.message}')
+
+    return setup, action
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='门户交互端到端延迟基准测试')
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--latency-ms', type=float, default=5.0, help='模拟门户每个请求的延迟')
+    parser.add_argument('--settle-ms', type=float, default=50.0, help='模拟登录后状态生效的延迟')
+    parser.add_argument('--json', help='将结果写入 JSON 文件')
+    args = parser.parse_args()
+
+    stub = StubPortal(StubConfig(latency_ms=args.latency_ms, settle_ms=args.settle_ms)).start()
+    results = []
+    try:
+        for operation, params in WORKER_OPERATIONS.items():
+            setup, action = worker_case(operation, params)
+            results.append(run_case(stub, f'worker.{operation}', args.iterations, setup, action))
+        sequence_iterations = max(1, args.iterations // 5)
+        for mode in (MODE_REBIND, MODE_FORCE):
+            setup, action = sequence_case(stub, mode)
+            results.append(run_case(stub, f'sequence.{mode}', sequence_iterations, setup, action))
+    finally:
+        stub.stop()
+
+    print(f'{"case":<22}{"n":>5}{"p50 ms":>10}{"p95 ms":>10}{"requests":>10}{"opened":>8}{"reused":>8}')
+    for r in results:
+        print(f'{r["name"]:<22}{r["iterations"]:>5}{r["p50_ms"]:>10.2f}{r["p95_ms"]:>10.2f}'
+              f'{r["requests"]:>10}{r["connections_opened"]:>8}{r["connections_reused"]:>8}')
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'latency_ms': args.latency_ms, 'settle_ms': args.settle_ms, 'results': results},
+                      f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
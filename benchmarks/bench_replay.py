@@ -0,0 +1,150 @@
+"""
+基于录制的门户回归测试。
+
+读取 CSU_WIFI_RECORD 录制的门户请求（见 portal_recorder），离线完成两项检查：
+1. 解析回归：用 protocol 模块重新解码每个录制的响应体，报告无法解码的响应；
+2. 延迟回归：经由回放传输层把录制按原顺序交给 NetworkWorker 重放（--speed 1 为原速，
+   0 为不等待），对比各接口录制时与回放时的耗时；--sequence 同时回放一次自动登录序列。
+存在无法解码的响应时退出码为 1。
+
+用法: python benchmarks/bench_replay.py capture.jsonl [--speed 1] [--session ID]
+      [--sequence rebind|force|ensure] [--json out.json]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Dict, List
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from bench_portal import percentile  # noqa: E402
+
+import portal_recorder  # noqa: E402
+from login_sequence import MODE_ENSURE, MODE_FORCE, MODE_REBIND, LoginSequence  # noqa: E402
+from network_worker import NetworkWorker  # noqa: E402
+from portal_client import PortalClient  # noqa: E402
+from protocol import DeviceList, PortalReply, PortalStatus, ProtocolError  # noqa: E402
+from resolver import Resolver  # noqa: E402
+from retry_policy import RetryPolicy  # noqa: E402
+
+REDACTED = portal_recorder.REDACTED
+
+# 录制中的接口 → (NetworkWorker 操作, 参数)
+WORKER_OPERATIONS = {
+    'chkstatus': ('check_status', {}),
+    'online_data': ('get_devices', {'username': REDACTED, 'password': REDACTED}),
+    'login': ('login', {'user_account': REDACTED, 'password': REDACTED}),
+    'logout': ('logout', {}),
+    'unbind': ('unbind', {'username': REDACTED}),
+}
+
+
+def decode_error(entry: Dict) -> str:
+    """用当前的 protocol 模块解码录制的响应体，返回错误描述；正常时返回空字符串。"""
+    if 'status' not in entry or int(entry['status']) >= 400:
+        return ''
+    body = entry.get('body', '')
+    endpoint = entry.get('endpoint')
+    try:
+        if endpoint == 'chkstatus':
+            PortalStatus.decode(body)
+        elif endpoint == 'online_data':
+            DeviceList.decode(body)
+        elif endpoint in ('login', 'logout', 'unbind'):
+            if PortalReply.decode(body).result is None:
+                return '回复中没有 result'
+    except ProtocolError as e:
+        return str(e)
+    return ''
+
+
+def replay_client(entries: List[Dict], speed: float) -> PortalClient:
+    # 不重试、不缓存：每个调用恰好消耗一条录制
+    client = PortalClient(status_ttl=0, resolver=Resolver(path=None), retry_policy=RetryPolicy(attempts=1))
+    portal_recorder.install_replay(client, portal_recorder.ReplayAdapter(entries, speed=speed))
+    return client
+
+
+def replay_worker(entries: List[Dict], speed: float) -> Dict[str, List[float]]:
+    """按录制顺序把每个请求交给 NetworkWorker 执行，返回各接口的回放耗时（毫秒）。"""
+    client = replay_client(entries, speed)
+    worker = NetworkWorker(client)
+    samples: Dict[str, List[float]] = {}
+    for entry in entries:
+        operation = WORKER_OPERATIONS.get(entry.get('endpoint'))
+        if operation is None:
+            continue
+        worker.set_task(*operation)
+        start = time.perf_counter()
+        worker.run()  # 在当前线程同步执行
+        samples.setdefault(entry['endpoint'], []).append((time.perf_counter() - start) * 1000)
+    client.close()
+    return samples
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='基于录制的门户解析与延迟回归测试')
+    parser.add_argument('recording', help='CSU_WIFI_RECORD 录制的文件')
+    parser.add_argument('--speed', type=float, default=1.0, help='回放速度系数：1 为原速，0 为不等待')
+    parser.add_argument('--session', help='只回放指定的一次运行')
+    parser.add_argument('--sequence', choices=(MODE_REBIND, MODE_FORCE, MODE_ENSURE),
+                        help='同时回放一次自动登录序列')
+    parser.add_argument('--json', help='将结果写入 JSON 文件')
+    args = parser.parse_args()
+
+    entries = list(portal_recorder.read_recording(args.recording, args.session))
+    if not entries:
+        print('录制中没有可回放的请求', file=sys.stderr)
+        return 1
+
+    failures = []
+    recorded: Dict[str, List[float]] = {}
+    for entry in entries:
+        recorded.setdefault(entry['endpoint'], []).append(entry.get('timing', {}).get('total', 0.0) * 1000)
+        error = decode_error(entry)
+        if error:
+            failures.append({'endpoint': entry['endpoint'], 'url': entry['url'], 'error': error})
+    replayed = replay_worker(entries, args.speed)
+
+    results = []
+    print(f'{"endpoint":<14}{"n":>5}{"recorded p50":>14}{"replayed p50":>14}{"errors":>8}')
+    for endpoint, samples in sorted(recorded.items()):
+        errors = sum(1 for failure in failures if failure['endpoint'] == endpoint)
+        result = {
+            'endpoint': endpoint,
+            'requests': len(samples),
+            'recorded_p50_ms': percentile(samples, 50),
+            'replayed_p50_ms': percentile(replayed.get(endpoint, []), 50),
+            'decode_errors': errors,
+        }
+        results.append(result)
+        print(f'{endpoint:<14}{len(samples):>5}{result["recorded_p50_ms"]:>14.2f}'
+              f'{result["replayed_p50_ms"]:>14.2f}{errors:>8}')
+    for failure in failures:
+        print(f'无法解码 {failure["endpoint"]}: {failure["error"]} ({failure["url"]})')
+
+    sequence = None
+    if args.sequence:
+        client = replay_client(entries, args.speed)
+        outcome = LoginSequence(REDACTED, REDACTED, '校园网', client=client, mode=args.sequence,
+                                fallback_delay=0).run()
+        client.close()
+        sequence = {'mode': args.sequence, 'success': outcome.success, 'message': outcome.message,
+                    'elapsed_ms': outcome.elapsed * 1000}
+        print(f'登录序列（{args.sequence}）: {"成功" if outcome.success else "失败"}，'
+              f'{outcome.message}，用时 {outcome.elapsed * 1000:.1f} ms')
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'recording': args.recording, 'speed': args.speed, 'results': results,
+                       'failures': failures, 'sequence': sequence}, f, ensure_ascii=False, indent=2)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
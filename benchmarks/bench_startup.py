@@ -0,0 +1,165 @@
+"""
+冷启动基准测试。
+
+分别在全新的解释器进程中测量各启动路径的耗时（不访问门户）：
+- headless: --auto-login 的实际路径：先尝试转交给常驻实例（instance.forward_from_argv），
+  没有可转交的实例时读取配置、准备好执行登录序列（headless.load_login_config）
+- qt-window: 创建 QApplication 和完整的 CSUWIFILogin 主窗口
+- first-paint: 以 --profile-startup 启动应用，直到主窗口第一次绘制；启动时的状态和设备查询
+  经由回放传输层（CSU_WIFI_REPLAY）应答，回放的是预先对本地模拟门户录制的响应
+
+每条路径都在临时目录中运行：配置目录、数据目录和运行时目录（macOS 上为 HOME）都指向
+临时目录，只含一个测试账号的配置和新的实例密钥，不读写用户真实的配置、快照和历史记录；
+正在运行的实例会拒绝这个密钥，命令不会被转交。Windows 上的配置保存在注册表中，不会被隔离。
+
+每条路径有启动预算（毫秒，按中位数判断），超出预算时以退出码 1 结束；
+在较慢的机器上可用 --budget-scale 按比例放宽。
+
+用法: python benchmarks/bench_startup.py [--runs N] [--budget-scale 1.5]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from stub_portal import StubPortal  # noqa: E402
+
+import portal_ops  # noqa: E402
+import portal_recorder  # noqa: E402
+from resolver import Resolver  # noqa: E402
+
+SCENARIOS = {
+    'headless': [sys.executable, '-c', (
+        'import instance\n'
+        'if instance.forward_from_argv(["--auto-login"]) is None:\n'
+        '    import headless\n'
+        '    headless.load_login_config()\n'
+    )],
+    'qt-window': [sys.executable, '-c', (
+        'import sys\n'
+        'from PyQt6.QtWidgets import QApplication\n'
+        'import CSU_WIFI_Login\n'
+        'app = QApplication(sys.argv)\n'
+        'CSU_WIFI_Login.CSUWIFILogin(headless=True)\n'
+    )],
+    'first-paint': [sys.executable, 'CSU_WIFI_Login.py', '--profile-startup', '--profile-json', '{profile}'],
+}
+
+# 启动预算（毫秒，进程启动到完成的墙钟时间中位数）
+BUDGETS_MS = {
+    'headless': 350.0,
+    'qt-window': 600.0,
+    'first-paint': 650.0,
+}
+
+
+def record_portal(path: str) -> None:
+    """对本地模拟门户录制一次状态和设备查询，供 first-paint 回放。"""
+    stub = StubPortal().start()
+    try:
+        stub.set_online(True)
+        client = stub.client(status_ttl=0, resolver=Resolver(path=None))
+        client.recorder = portal_recorder.PortalRecorder(path)
+        portal_ops.check_status(client)
+        portal_ops.get_devices(client, 'user', 'password')
+        client.close()
+    finally:
+        stub.stop()
+
+
+def scenario_env(name: str, tmp: str) -> dict:
+    """各启动路径的环境变量：都在临时目录中运行，first-paint 另外回放录制。"""
+    env = dict(os.environ)
+    env.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    env['PYTHONDONTWRITEBYTECODE'] = '1'
+    config_home = os.path.join(tmp, 'config')
+    data_home = os.path.join(tmp, 'data')
+    env['XDG_CONFIG_HOME'] = config_home
+    env['XDG_DATA_HOME'] = env['LOCALAPPDATA'] = data_home
+    env['APPDATA'] = os.path.join(tmp, 'roaming')
+    env['XDG_RUNTIME_DIR'] = runtime = os.path.join(tmp, 'runtime')
+    os.makedirs(runtime, mode=0o700, exist_ok=True)
+    if sys.platform == 'darwin':
+        # macOS 的配置和数据目录固定在 ~/Library 下
+        env['HOME'] = tmp
+        data_home = os.path.join(tmp, 'Library', 'Application Support')
+
+    config_path = os.path.join(config_home, 'CSU', 'WifiAutoLogin.conf')
+    if not os.path.exists(config_path):
+        os.makedirs(os.path.dirname(config_path), exist_ok=True)
+        with open(config_path, 'w', encoding='utf-8') as f:
+            f.write('[login]\nusername=8209000000\n')
+    key_path = os.path.join(data_home, 'CSU', 'WifiAutoLogin', 'instance.key')
+    if not os.path.exists(key_path):
+        os.makedirs(os.path.dirname(key_path), exist_ok=True)
+        with open(key_path, 'wb') as f:
+            f.write(os.urandom(32))
+
+    if name == 'first-paint':
+        recording = os.path.join(tmp, 'portal.jsonl')
+        if not os.path.exists(recording):
+            record_portal(recording)
+        env[portal_recorder.REPLAY_ENV] = recording
+        env[portal_recorder.REPLAY_SPEED_ENV] = '0'
+    return env
+
+
+def measure(name: str, runs: int) -> tuple:
+    """在新进程中执行启动路径 name runs 次，返回 (每次墙钟耗时, 每次进程内首次绘制耗时)，单位毫秒。"""
+    argv = SCENARIOS[name]
+    samples, paints = [], []
+    with tempfile.TemporaryDirectory() as tmp:
+        env = scenario_env(name, tmp)
+        profile_path = os.path.join(tmp, 'profile.json')
+        command = [arg.format(profile=profile_path) for arg in argv]
+        for _ in range(runs):
+            start = time.perf_counter()
+            subprocess.run(command, cwd=REPO_ROOT, env=env, check=True,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            samples.append((time.perf_counter() - start) * 1000)
+            if os.path.exists(profile_path):
+                with open(profile_path, encoding='utf-8') as f:
+                    paints.append(json.load(f)['milestones'].get('first paint', 0.0))
+                os.remove(profile_path)
+    return samples, paints
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget-scale', type=float, default=1.0, help='预算放宽倍数')
+    args = parser.parse_args()
+
+    # 预热一次，排除首次编译字节码和磁盘缓存的影响
+    for name in SCENARIOS:
+        measure(name, 1)
+
+    print(f'{"path":<12}{"min (ms)":>12}{"median (ms)":>14}{"max (ms)":>12}{"budget (ms)":>14}')
+    results = {}
+    over_budget = []
+    for name in SCENARIOS:
+        samples, paints = measure(name, args.runs)
+        results[name] = statistics.median(samples)
+        budget = BUDGETS_MS[name] * args.budget_scale
+        flag = '' if results[name] <= budget else '  超出预算'
+        print(f'{name:<12}{min(samples):>12.1f}{results[name]:>14.1f}{max(samples):>12.1f}{budget:>14.0f}{flag}')
+        if paints:
+            print(f'{"":<12}进程内首次绘制 median {statistics.median(paints):.1f} ms')
+        if flag:
+            over_budget.append(name)
+
+    print(f'speedup (headless vs qt-window): {results["qt-window"] / results["headless"]:.2f}x')
+    return 1 if over_budget else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
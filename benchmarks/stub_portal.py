@@ -0,0 +1,219 @@
+"""
+本地门户模拟服务器。
+
+模拟 portal.csu.edu.cn 的 eportal 接口（login、logout、mac/unbind、
+Custom/online_data JSONP）和 drcom/chkstatus，延迟与响应内容可配置，
+用于在校外离线测试和基准测试客户端。
+
+用法: python benchmarks/stub_portal.py [--port 8802] [--latency-ms 20]
+"""
+
+import argparse
+import json
+import os
+import random
+import ssl
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlsplit
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+# 默认响应
+LOGIN_SUCCESS = '{"result":1,"msg":"Portal协议认证成功！"}'
+LOGIN_FAILURE = '{"result":0,"msg":"账号或密码错误(ldap校验)","ret_code":1}'
+LOGOUT_SUCCESS = '{"result":1,"msg":"success"}'
+UNBIND_SUCCESS = '{"result":1,"msg":"解绑终端MAC成功！"}'
+
+
+class StubConfig:
+    """模拟服务器的行为配置，运行期间可直接修改。"""
+
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0,
+                 endpoint_latency_ms: Optional[Dict[str, float]] = None,
+                 settle_ms: float = 0.0, login_ok: bool = True, device_count: int = 3,
+                 uid: str = '8209000000', v4ip: str = '10.96.0.2', olmac: str = '0a1b2c3d4e5f'):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.endpoint_latency_ms = endpoint_latency_ms or {}
+        self.settle_ms = settle_ms
+        self.login_ok = login_ok
+        self.device_count = device_count
+        self.uid = uid
+        self.v4ip = v4ip
+        self.olmac = olmac
+
+
+class StubPortal:
+    """可在后台线程中运行的门户模拟服务器。"""
+
+    def __init__(self, config: Optional[StubConfig] = None, host: str = '127.0.0.1', port: int = 0,
+                 certfile: Optional[str] = None, keyfile: Optional[str] = None):
+        self.config = config or StubConfig()
+        self._lock = threading.Lock()
+        self._online_at: Optional[float] = None
+        # 当前在线的账号（不含运营商后缀）；None 时 chkstatus 返回 config.uid
+        self._account: Optional[str] = None
+        self.requests: Dict[str, int] = {}
+        self.connections = 0
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self.scheme = 'http'
+        if certfile:
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            context.load_cert_chain(certfile, keyfile)
+            self._server.socket = context.wrap_socket(self._server.socket, server_side=True)
+            self.scheme = 'https'
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def address(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f'{self.scheme}://{host}:{port}'
+
+    @property
+    def eportal_base(self) -> str:
+        return f'{self.address}/eportal/portal'
+
+    @property
+    def status_base(self) -> str:
+        return self.address
+
+    def client(self, **kwargs):
+        """返回指向本服务器的 PortalClient。"""
+        from portal_client import PortalClient
+        return PortalClient(eportal_base=self.eportal_base, status_base=self.status_base, **kwargs)
+
+    def start(self) -> 'StubPortal':
+        self._thread = threading.Thread(target=self._server.serve_forever, name='stub-portal', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def set_online(self, online: bool) -> None:
+        with self._lock:
+            self._online_at = time.monotonic() if online else None
+
+    def is_online(self) -> bool:
+        with self._lock:
+            return self._online_at is not None and time.monotonic() >= self._online_at
+
+    def reset_counters(self) -> None:
+        with self._lock:
+            self.requests = {}
+            self.connections = 0
+
+    # --- 请求处理 ---
+
+    def _delay(self, endpoint: str) -> None:
+        config = self.config
+        latency = config.endpoint_latency_ms.get(endpoint, config.latency_ms)
+        if config.jitter_ms:
+            latency += random.uniform(0, config.jitter_ms)
+        if latency > 0:
+            time.sleep(latency / 1000)
+
+    def _handle(self, path: str, query: Dict[str, list]) -> Optional[str]:
+        config = self.config
+        if path.endswith('/drcom/chkstatus'):
+            callback = (query.get('callback') or [''])[0]
+            if self.is_online():
+                with self._lock:
+                    uid = self._account or config.uid
+                data = {'result': 1, 'uid': uid, 'v4ip': config.v4ip, 'olmac': config.olmac}
+            else:
+                data = {'result': 0, 'v4ip': config.v4ip, 'olmac': config.olmac}
+            return f'{callback}({json.dumps(data, ensure_ascii=False)})'
+        if path.endswith('/eportal/portal/login'):
+            if not config.login_ok:
+                return LOGIN_FAILURE
+            account = (query.get('user_account') or [''])[0].split('@', 1)[0]
+            with self._lock:
+                # 与真实门户一样，chkstatus 报告的是本机 IP 上最后登录的账号
+                self._online_at = time.monotonic() + config.settle_ms / 1000
+                self._account = account or None
+            return LOGIN_SUCCESS
+        if path.endswith('/eportal/portal/logout'):
+            self.set_online(False)
+            return LOGOUT_SUCCESS
+        if path.endswith('/eportal/portal/mac/unbind'):
+            return UNBIND_SUCCESS
+        if path.endswith('/eportal/portal/Custom/online_data'):
+            devices = [{
+                'online_ip': f'10.96.0.{i + 2}',
+                'online_mac': f'0a1b2c3d4e{i:02x}',
+                'online_time': '2026-01-01 08:00:00',
+                'phone_flag': '0' if i % 2 == 0 else '1',
+            } for i in range(config.device_count)]
+            data = {'result': 1, 'msg': '', 'data': devices}
+            return f'jsonpReturn({json.dumps(data, ensure_ascii=False)});'
+        return None
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                with stub._lock:
+                    stub.connections += 1
+
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                endpoint = parts.path.rsplit('/', 1)[-1]
+                with stub._lock:
+                    stub.requests[endpoint] = stub.requests.get(endpoint, 0) + 1
+                stub._delay(endpoint)
+                body = stub._handle(parts.path, parse_qs(parts.query, keep_blank_values=True))
+                status = 200 if body is not None else 404
+                payload = (body or 'not found').encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'text/html;charset=UTF-8')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='本地门户模拟服务器')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8802)
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    parser.add_argument('--jitter-ms', type=float, default=0.0)
+    parser.add_argument('--settle-ms', type=float, default=0.0, help='登录后状态变为在线前的延迟')
+    parser.add_argument('--devices', type=int, default=3)
+    parser.add_argument('--login-fail', action='store_true', help='登录请求总是返回失败')
+    parser.add_argument('--certfile')
+    parser.add_argument('--keyfile')
+    args = parser.parse_args()
+
+    config = StubConfig(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, settle_ms=args.settle_ms,
+                        login_ok=not args.login_fail, device_count=args.devices)
+    stub = StubPortal(config, host=args.host, port=args.port, certfile=args.certfile, keyfile=args.keyfile)
+    print(f'eportal: {stub.eportal_base}')
+    print(f'status:  {stub.status_base}')
+    try:
+        stub._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
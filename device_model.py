@@ -0,0 +1,143 @@
+"""
+在线设备表格模型模块。
+
+以 MAC 地址为键保存在线设备记录，每次刷新只对发生变化的行执行
+插入、删除和单元格更新，UI 线程的工作量与变化量成正比。
+来自启动快照、尚未重新查询的数据可标记为过期，以灰色显示。
+"""
+
+from typing import Dict, List, Optional
+
+from PyQt6.QtCore import QAbstractTableModel, QModelIndex, Qt
+from PyQt6.QtGui import QColor
+
+from protocol import DeviceRecord
+
+HEADERS = ['IP地址', 'MAC地址', '登录时间', '设备类型']
+STALE_COLOR = QColor(Qt.GlobalColor.gray)
+COLUMN_IP = 0
+COLUMN_MAC = 1
+COLUMN_TIME = 2
+COLUMN_TYPE = 3
+
+
+class DeviceTableModel(QAbstractTableModel):
+    """在线设备列表的表格模型。"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._rows: List[DeviceRecord] = []
+        self._local_ip: Optional[str] = None
+        self._local_mac: Optional[str] = None
+        self._stale = False
+
+    # --- QAbstractTableModel 接口 ---
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(HEADERS)
+
+    def data(self, index: QModelIndex, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.ItemDataRole.DisplayRole:
+            return self._cell_text(self._rows[index.row()], index.column())
+        if role == Qt.ItemDataRole.TextAlignmentRole:
+            return Qt.AlignmentFlag.AlignCenter
+        if role == Qt.ItemDataRole.ForegroundRole and self._stale:
+            return STALE_COLOR
+        return None
+
+    def headerData(self, section: int, orientation: Qt.Orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return HEADERS[section]
+        return super().headerData(section, orientation, role)
+
+    # --- 数据更新 ---
+
+    def _is_local(self, record: DeviceRecord) -> bool:
+        return bool(record.ip and record.mac and record.ip == self._local_ip and record.mac == self._local_mac)
+
+    def _cell_text(self, record: DeviceRecord, column: int) -> str:
+        if column == COLUMN_IP:
+            return record.ip
+        if column == COLUMN_MAC:
+            return record.mac
+        if column == COLUMN_TIME:
+            return record.online_time
+        device_type = record.device_type
+        if self._is_local(record):
+            device_type += " (本机)"
+        return device_type
+
+    def set_local_device(self, ip: Optional[str], mac: Optional[str]) -> None:
+        """设置本机 IP/MAC，只刷新"本机"标记发生变化的行。"""
+        if (ip, mac) == (self._local_ip, self._local_mac):
+            return
+        before = [self._is_local(record) for record in self._rows]
+        self._local_ip, self._local_mac = ip, mac
+        for row, record in enumerate(self._rows):
+            if self._is_local(record) != before[row]:
+                index = self.index(row, COLUMN_TYPE)
+                self.dataChanged.emit(index, index, [Qt.ItemDataRole.DisplayRole])
+
+    @property
+    def stale(self) -> bool:
+        return self._stale
+
+    def set_stale(self, stale: bool) -> None:
+        """标记数据是否过期（过期时以灰色显示）。"""
+        if stale == self._stale:
+            return
+        self._stale = stale
+        if self._rows:
+            self.dataChanged.emit(self.index(0, 0), self.index(len(self._rows) - 1, len(HEADERS) - 1),
+                                  [Qt.ItemDataRole.ForegroundRole])
+
+    def apply(self, devices: List[DeviceRecord]) -> None:
+        """应用新的设备列表：删除消失的设备、更新变化的单元格、追加新设备。"""
+        incoming: Dict[str, DeviceRecord] = {}
+        for record in devices:
+            incoming.setdefault(record.key, record)
+
+        # 删除：从后往前按连续区间删除，避免行号错位
+        row = len(self._rows) - 1
+        while row >= 0:
+            if self._rows[row].key in incoming:
+                row -= 1
+                continue
+            last = row
+            while row >= 0 and self._rows[row].key not in incoming:
+                row -= 1
+            self.beginRemoveRows(QModelIndex(), row + 1, last)
+            del self._rows[row + 1:last + 1]
+            self.endRemoveRows()
+
+        # 更新：只对发生变化的列发出 dataChanged
+        for row, old in enumerate(self._rows):
+            new = incoming.pop(old.key)
+            if new == old:
+                continue
+            changed = [column for column in range(len(HEADERS))
+                       if self._cell_text(old, column) != self._cell_text(new, column)]
+            self._rows[row] = new
+            if changed:
+                self.dataChanged.emit(self.index(row, min(changed)), self.index(row, max(changed)),
+                                      [Qt.ItemDataRole.DisplayRole])
+
+        # 插入：剩余的都是新设备
+        if incoming:
+            first = len(self._rows)
+            self.beginInsertRows(QModelIndex(), first, first + len(incoming) - 1)
+            self._rows.extend(incoming.values())
+            self.endInsertRows()
+
+    def clear(self) -> None:
+        """清空设备列表。"""
+        if not self._rows:
+            return
+        self.beginRemoveRows(QModelIndex(), 0, len(self._rows) - 1)
+        self._rows.clear()
+        self.endRemoveRows()
@@ -0,0 +1,81 @@
+"""
+无界面自动登录模块。
+
+供定时任务（--auto-login）使用的快速路径：直接读取保存的配置和
+keyring 中的密码，执行 解绑→注销→登录，全程不导入任何 Qt 模块。
+--status、--logout 同样在这里完成（没有常驻实例可以转交时）。
+"""
+
+import sys
+from typing import Callable, Optional, Tuple
+
+import metrics
+import portal_ops
+import secure_storage
+import settings_store
+from login_sequence import MODE_FORCE, LoginSequence
+from portal_client import PortalClient, get_client
+
+
+def load_login_config() -> Tuple[str, str, str]:
+    """读取保存的 (学号, 密码, 运营商)。"""
+    settings = settings_store.read_settings()
+    username = str(settings.get('login/username', '') or '')
+    net_type = str(settings.get('login/net_type', '校园网') or '校园网')
+    password = (secure_storage.get_password(username) or '') if username else ''
+    return username, password, net_type
+
+
+def run_auto_login_sequence(username: str, password: str, net_type: str,
+                            client: Optional[PortalClient] = None,
+                            delay_seconds: float = 2,
+                            log: Callable[[str], None] = print) -> bool:
+    """同步执行 解绑→注销→登录，返回是否登录成功。
+
+    由 login_sequence.LoginSequence 驱动；每一步之后轮询 chkstatus 等待门户就绪，
+    只有门户无法响应状态查询时才退回到固定等待 delay_seconds 秒。
+    """
+    client = client or get_client()
+
+    def on_step_end(step, outcome, message, timing):
+        log(str(timing))
+        log(message)
+
+    sequence = LoginSequence(username, password, net_type, client=client,
+                             mode=MODE_FORCE, fallback_delay=delay_seconds,
+                             on_step_end=on_step_end)
+    result = sequence.run()
+    if result.success:
+        log(f"登录成功，总耗时 {result.elapsed:.2f} s")
+    else:
+        log(f"登录失败: {result.message}")
+
+    stats = client.stats.snapshot()
+    log(f"连接统计: 请求 {stats['requests']} 次，新建连接 {stats['opened']} 个，复用 {stats['reused']} 次")
+    return result.success
+
+
+def main(argv=None) -> int:
+    """--auto-login / --status / --logout 入口，返回进程退出码。
+
+    附加 --metrics [PATH] 时在结束后导出请求计时指标（.prom/.txt 为 Prometheus 文本，否则为 JSON）。
+    """
+    argv = list(sys.argv[1:] if argv is None else argv)
+    metrics_path = metrics.metrics_path_from_argv(argv)
+    if '--status' in argv:
+        status = portal_ops.check_status(get_client())
+        print(f'已在线 (账号: {status.uid} IP: {status.v4ip})' if status.online else status.error or '当前未在线')
+        success = status.online
+    elif '--logout' in argv:
+        success, message = portal_ops.logout(get_client())
+        print(message)
+    else:
+        username, password, net_type = load_login_config()
+        success = run_auto_login_sequence(username, password, net_type, delay_seconds=2)
+    if metrics_path is not None:
+        metrics.dump(metrics_path)
+    return 0 if success else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,527 @@
+"""
+状态与在线设备历史模块。
+
+常驻实例（主窗口、--watchdog、--scheduler）把每次状态查询和设备列表查询的结果
+写入 data_dir() 下的 SQLite 数据库（history.sqlite3），用于回答“哪台设备总被挤下线”
+“平均每次在线多久”这类问题：
+- status_samples：认证状态的时间线。状态不变时最多每 STATUS_HEARTBEAT 秒记录一次；
+- device_sessions：每台设备（MAC）的在线会话。设备在列表中持续出现且门户给出的
+  上线时间不变，就是同一个会话；设备从列表消失或上线时间改变（被挤下线后重新登录）
+  时结束旧会话。会话在写入时增量维护，查询不需要回放原始记录。
+
+写入先进入内存队列，由后台线程每 FLUSH_INTERVAL 秒（或积累 BATCH_SIZE 条）
+在一个事务中批量提交；超过保留天数（history/retention_days）的记录定期删除。
+查询接口 HistoryStore 逐行读取游标并在 SQLite 中聚合，数周的数据也不会整体载入内存。
+本模块不依赖 Qt；sqlite3 在首次使用时才导入。
+"""
+
+import datetime
+import json
+import os
+import sys
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import settings_store
+
+DB_FILENAME = 'history.sqlite3'
+SCHEMA_VERSION = 1
+
+# 批量写入
+FLUSH_INTERVAL = 2.0  # 秒
+BATCH_SIZE = 100
+
+# 状态不变时两条状态记录的最长间隔（秒）
+STATUS_HEARTBEAT = 60.0
+# 计算在线率时，两条状态记录间隔超过该值视为期间没有观测（程序未运行）
+STATUS_GAP = 600.0
+
+# 默认保留天数；删除过期记录的最短间隔（秒）
+RETENTION_DAYS = 90
+PRUNE_INTERVAL = 3600.0
+
+# 会话结束原因
+END_GONE = 'gone'  # 从设备列表中消失
+END_RELOGIN = 'relogin'  # 上线时间改变：下线后又重新登录
+
+# 门户设备列表中上线时间的格式
+ONLINE_TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS status_samples (
+    ts REAL NOT NULL,
+    reachable INTEGER NOT NULL,
+    online INTEGER NOT NULL,
+    uid TEXT NOT NULL,
+    v4ip TEXT NOT NULL,
+    olmac TEXT NOT NULL,
+    error TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS status_samples_ts ON status_samples (ts);
+
+CREATE TABLE IF NOT EXISTS device_sessions (
+    id INTEGER PRIMARY KEY,
+    account TEXT NOT NULL,
+    mac TEXT NOT NULL,
+    ip TEXT NOT NULL,
+    device_type TEXT NOT NULL,
+    online_time TEXT NOT NULL,
+    started REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    ended REAL,
+    end_reason TEXT
+);
+CREATE INDEX IF NOT EXISTS device_sessions_mac ON device_sessions (mac, started);
+CREATE INDEX IF NOT EXISTS device_sessions_started ON device_sessions (started);
+CREATE INDEX IF NOT EXISTS device_sessions_last_seen ON device_sessions (last_seen);
+CREATE INDEX IF NOT EXISTS device_sessions_open ON device_sessions (account) WHERE ended IS NULL;
+"""
+
+
+def db_path() -> str:
+    return os.path.join(settings_store.data_dir(), DB_FILENAME)
+
+
+def _connect(path: str):
+    import sqlite3
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=5.0)
+    # WAL：写入期间 --history 等读取方不被阻塞
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.executescript(_SCHEMA)
+    conn.execute(f'PRAGMA user_version={SCHEMA_VERSION}')
+    return conn
+
+
+def _parse_online_time(value: str) -> Optional[float]:
+    try:
+        return time.mktime(time.strptime(value, ONLINE_TIME_FORMAT))
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+class HistoryWriter:
+    """批量写入历史记录的后台线程。record_* 可在任意线程中调用，只追加到内存队列。"""
+
+    def __init__(self, path: Optional[str] = None, retention_days: float = RETENTION_DAYS,
+                 flush_interval: float = FLUSH_INTERVAL, batch_size: int = BATCH_SIZE):
+        self.path = path or db_path()
+        self.retention_days = retention_days
+        self.flush_interval = flush_interval
+        self.batch_size = max(1, batch_size)
+        self._cond = threading.Condition()
+        self._pending: List[Tuple] = []
+        self._last_status: Optional[tuple] = None
+        self._last_status_at = 0.0
+        self._stopped = False
+        self._flushed = 0  # 已提交的批次数，供 flush() 等待
+        self._thread: Optional[threading.Thread] = None
+        self.error = ''
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='history-writer', daemon=True)
+            self._thread.start()
+
+    def record_status(self, status, ts: Optional[float] = None) -> None:
+        """记录一次状态查询结果；与上次相同且距上次记录不足 STATUS_HEARTBEAT 秒时忽略。"""
+        ts = time.time() if ts is None else ts
+        key = (status.reachable, status.online, status.uid, status.v4ip, status.olmac)
+        with self._cond:
+            if key == self._last_status and ts - self._last_status_at < STATUS_HEARTBEAT:
+                return
+            self._last_status, self._last_status_at = key, ts
+            self._append(('status', ts, key + (status.error,)))
+
+    def record_devices(self, account: str, devices, ts: Optional[float] = None) -> None:
+        """记录一次成功的设备列表查询（DeviceRecord 列表）。"""
+        ts = time.time() if ts is None else ts
+        items = tuple((device.key, device.ip, device.device_type, device.online_time) for device in devices)
+        with self._cond:
+            self._append(('devices', ts, (account, items)))
+
+    def _append(self, item: Tuple) -> None:
+        if self._stopped:
+            return
+        self._pending.append(item)
+        if len(self._pending) >= self.batch_size:
+            self._cond.notify()
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """立即提交队列中的记录并等待完成。"""
+        with self._cond:
+            if not self._pending or self._thread is None:
+                return True
+            target = self._flushed + 1
+            self._cond.notify_all()
+            return self._cond.wait_for(
+                lambda: (self._flushed >= target and not self._pending) or self._thread is None, timeout)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """提交剩余记录后停止。"""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self) -> None:
+        import sqlite3
+
+        try:
+            conn = _connect(self.path)
+        except (sqlite3.Error, OSError) as e:
+            self.error = str(e)
+            with self._cond:
+                self._stopped = True
+                self._pending.clear()
+                self._thread = None
+                self._cond.notify_all()
+            return
+        last_prune = -PRUNE_INTERVAL
+        try:
+            while True:
+                with self._cond:
+                    if not self._stopped and len(self._pending) < self.batch_size:
+                        self._cond.wait(self.flush_interval)
+                    batch, self._pending = self._pending, []
+                    stopped = self._stopped
+                if batch:
+                    try:
+                        with conn:
+                            for kind, ts, data in batch:
+                                if kind == 'status':
+                                    conn.execute('INSERT INTO status_samples VALUES (?, ?, ?, ?, ?, ?, ?)',
+                                                 (ts,) + data)
+                                else:
+                                    self._apply_devices(conn, ts, *data)
+                    except sqlite3.Error as e:
+                        # 数据库被锁、磁盘已满等：丢弃这一批，不影响程序本身
+                        self.error = str(e)
+                with self._cond:
+                    self._flushed += 1
+                    self._cond.notify_all()
+                if time.monotonic() - last_prune >= PRUNE_INTERVAL:
+                    last_prune = time.monotonic()
+                    try:
+                        prune(conn, self.retention_days)
+                    except sqlite3.Error as e:
+                        self.error = str(e)
+                if stopped:
+                    return
+        finally:
+            conn.close()
+            with self._cond:
+                self._thread = None
+                self._cond.notify_all()
+
+    @staticmethod
+    def _apply_devices(conn, ts: float, account: str, items) -> None:
+        """按一次设备列表更新会话：延续、结束或新开。"""
+        open_sessions = {mac: (session_id, online_time) for session_id, mac, online_time in conn.execute(
+            'SELECT id, mac, online_time FROM device_sessions WHERE account = ? AND ended IS NULL', (account,))}
+        for mac, ip, device_type, online_time in items:
+            current = open_sessions.pop(mac, None)
+            if current is not None and current[1] == online_time:
+                conn.execute('UPDATE device_sessions SET last_seen = ?, ip = ? WHERE id = ?', (ts, ip, current[0]))
+                continue
+            if current is not None:
+                conn.execute('UPDATE device_sessions SET ended = last_seen, end_reason = ? WHERE id = ?',
+                             (END_RELOGIN, current[0]))
+            started = _parse_online_time(online_time)
+            conn.execute('INSERT INTO device_sessions (account, mac, ip, device_type, online_time, started, last_seen)'
+                         ' VALUES (?, ?, ?, ?, ?, ?, ?)',
+                         (account, mac, ip, device_type, online_time,
+                          min(started, ts) if started is not None else ts, ts))
+        # 不再出现在列表中的设备：会话结束于最后一次看到它的时间
+        for session_id, _ in open_sessions.values():
+            conn.execute('UPDATE device_sessions SET ended = last_seen, end_reason = ? WHERE id = ?',
+                         (END_GONE, session_id))
+
+
+def prune(conn, retention_days: float) -> None:
+    """删除超过保留天数的状态记录和已结束的会话。"""
+    if retention_days <= 0:
+        return
+    cutoff = time.time() - retention_days * 86400
+    with conn:
+        conn.execute('DELETE FROM status_samples WHERE ts < ?', (cutoff,))
+        conn.execute('DELETE FROM device_sessions WHERE ended IS NOT NULL AND ended < ?', (cutoff,))
+
+
+class DeviceSession:
+    """一台设备的一次在线会话。"""
+
+    __slots__ = ('account', 'mac', 'ip', 'device_type', 'started', 'last_seen', 'ended', 'end_reason')
+
+    def __init__(self, account: str, mac: str, ip: str, device_type: str, started: float,
+                 last_seen: float, ended: Optional[float], end_reason: Optional[str]):
+        self.account = account
+        self.mac = mac
+        self.ip = ip
+        self.device_type = device_type
+        self.started = started
+        self.last_seen = last_seen
+        self.ended = ended
+        self.end_reason = end_reason
+
+    @property
+    def duration(self) -> float:
+        """会话时长（秒）；尚未结束的会话计到最后一次看到它的时间。"""
+        return max(0.0, (self.ended if self.ended is not None else self.last_seen) - self.started)
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {name: getattr(self, name) for name in self.__slots__}
+        data['duration'] = self.duration
+        return data
+
+
+class DeviceStats:
+    """一台设备在查询时间段内的会话统计。"""
+
+    __slots__ = ('mac', 'ip', 'device_type', 'sessions', 'ended', 'relogins',
+                 'total_seconds', 'average_seconds', 'longest_seconds', 'last_seen')
+
+    def __init__(self, mac: str, ip: str, device_type: str, sessions: int, ended: int, relogins: int,
+                 total_seconds: float, average_seconds: float, longest_seconds: float, last_seen: float):
+        self.mac = mac
+        self.ip = ip
+        self.device_type = device_type
+        self.sessions = sessions
+        self.ended = ended
+        self.relogins = relogins
+        self.total_seconds = total_seconds
+        self.average_seconds = average_seconds
+        self.longest_seconds = longest_seconds
+        self.last_seen = last_seen
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class StatusSummary:
+    """查询时间段内的认证状态统计。"""
+
+    __slots__ = ('samples', 'observed_seconds', 'online_seconds', 'drops', 'unreachable_seconds')
+
+    def __init__(self):
+        self.samples = 0
+        self.observed_seconds = 0.0
+        self.online_seconds = 0.0
+        self.unreachable_seconds = 0.0
+        self.drops = 0
+
+    @property
+    def online_ratio(self) -> float:
+        return self.online_seconds / self.observed_seconds if self.observed_seconds else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {name: getattr(self, name) for name in self.__slots__}
+        data['online_ratio'] = self.online_ratio
+        return data
+
+
+_SESSION_DURATION = 'COALESCE(ended, last_seen) - started'
+
+
+class HistoryStore:
+    """历史数据的只读查询接口。"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or db_path()
+        self._conn = _connect(self.path)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    @staticmethod
+    def _filters(since: Optional[float], until: Optional[float], mac: Optional[str],
+                 account: Optional[str]) -> Tuple[str, List[Any]]:
+        """会话与 [since, until] 有交集的条件。"""
+        clauses, params = [], []
+        if since is not None:
+            clauses.append('last_seen >= ?')
+            params.append(since)
+        if until is not None:
+            clauses.append('started <= ?')
+            params.append(until)
+        if mac:
+            clauses.append('mac = ?')
+            params.append(mac)
+        if account:
+            clauses.append('account = ?')
+            params.append(account)
+        return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+    def sessions(self, since: Optional[float] = None, until: Optional[float] = None,
+                 mac: Optional[str] = None, account: Optional[str] = None) -> Iterator[DeviceSession]:
+        """按开始时间顺序逐个产出会话。"""
+        where, params = self._filters(since, until, mac, account)
+        cursor = self._conn.execute(
+            'SELECT account, mac, ip, device_type, started, last_seen, ended, end_reason'
+            f' FROM device_sessions{where} ORDER BY started', params)
+        for row in cursor:
+            yield DeviceSession(*row)
+
+    def device_stats(self, since: Optional[float] = None, until: Optional[float] = None,
+                     account: Optional[str] = None, limit: int = 50) -> List[DeviceStats]:
+        """每台设备的会话数、被挤下线（重新登录）次数与时长统计，按会话数降序。"""
+        where, params = self._filters(since, until, None, account)
+        rows = self._conn.execute(
+            'SELECT mac, ip, device_type, COUNT(*), COUNT(ended),'
+            f' SUM(end_reason = ?), SUM({_SESSION_DURATION}), AVG({_SESSION_DURATION}),'
+            f' MAX({_SESSION_DURATION}), MAX(last_seen)'
+            f' FROM device_sessions{where} GROUP BY mac ORDER BY COUNT(*) DESC, MAX(last_seen) DESC LIMIT ?',
+            [END_RELOGIN] + params + [limit])
+        return [DeviceStats(mac, ip, device_type, sessions, ended, relogins or 0, total or 0.0,
+                            average or 0.0, longest or 0.0, last_seen)
+                for mac, ip, device_type, sessions, ended, relogins, total, average, longest, last_seen in rows]
+
+    def status_summary(self, since: Optional[float] = None, until: Optional[float] = None) -> StatusSummary:
+        """在线时长、在线率与掉线次数。逐行读取记录，按相邻两条记录之间的时间累计。"""
+        clauses, params = [], []
+        if since is not None:
+            clauses.append('ts >= ?')
+            params.append(since)
+        if until is not None:
+            clauses.append('ts <= ?')
+            params.append(until)
+        where = (' WHERE ' + ' AND '.join(clauses)) if clauses else ''
+        summary = StatusSummary()
+        previous = None
+        for ts, reachable, online in self._conn.execute(
+                f'SELECT ts, reachable, online FROM status_samples{where} ORDER BY ts', params):
+            summary.samples += 1
+            if previous is not None:
+                prev_ts, prev_reachable, prev_online = previous
+                gap = ts - prev_ts
+                if gap <= STATUS_GAP:
+                    summary.observed_seconds += gap
+                    if prev_online:
+                        summary.online_seconds += gap
+                    elif not prev_reachable:
+                        summary.unreachable_seconds += gap
+                if prev_online and not online:
+                    summary.drops += 1
+            previous = (ts, reachable, online)
+        return summary
+
+
+_writer: Optional[HistoryWriter] = None
+_writer_lock = threading.Lock()
+
+
+def start(settings: Optional[Dict[str, Any]] = None) -> Optional[HistoryWriter]:
+    """在本进程中开始记录历史；配置项 history/enabled 为 false 时返回 None。"""
+    global _writer
+    settings = settings if settings is not None else settings_store.read_settings()
+    if not settings_store.to_bool(settings.get('history/enabled'), True):
+        return None
+    try:
+        retention = float(settings.get('history/retention_days', RETENTION_DAYS))
+    except (TypeError, ValueError):
+        retention = RETENTION_DAYS
+    with _writer_lock:
+        if _writer is None:
+            _writer = HistoryWriter(retention_days=retention)
+            _writer.start()
+        return _writer
+
+
+def stop() -> None:
+    global _writer
+    with _writer_lock:
+        writer, _writer = _writer, None
+    if writer is not None:
+        writer.stop()
+
+
+def record_status(status) -> None:
+    """记录一次状态查询结果；本进程未开始记录时什么也不做。"""
+    writer = _writer
+    if writer is not None:
+        writer.record_status(status)
+
+
+def record_devices(account: str, devices) -> None:
+    """记录一次设备列表查询结果；本进程未开始记录时什么也不做。"""
+    writer = _writer
+    if writer is not None:
+        writer.record_devices(account, devices)
+
+
+# --- 命令行 ---
+
+def _format_duration(seconds: float) -> str:
+    seconds = int(seconds)
+    if seconds >= 86400:
+        return f'{seconds // 86400}天{seconds % 86400 // 3600}时'
+    if seconds >= 3600:
+        return f'{seconds // 3600}时{seconds % 3600 // 60}分'
+    return f'{seconds // 60}分{seconds % 60}秒'
+
+
+def _format_time(ts: Optional[float]) -> str:
+    return '-' if ts is None else datetime.datetime.fromtimestamp(ts).strftime('%m-%d %H:%M')
+
+
+def main(argv=None) -> int:
+    """--history 入口：按设备汇总会话、列出会话或统计认证状态。"""
+    import argparse
+
+    parser = argparse.ArgumentParser(prog='CSU_WIFI_Login.py --history', description='在线设备与认证状态历史')
+    parser.add_argument('--history', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('view', nargs='?', choices=('devices', 'sessions', 'status'), default='devices',
+                        help='devices: 按设备汇总（默认）；sessions: 逐个列出会话；status: 在线率与掉线次数')
+    parser.add_argument('--days', type=float, default=7, help='统计最近多少天（默认 7）')
+    parser.add_argument('--mac', help='只看指定 MAC 的会话')
+    parser.add_argument('--limit', type=int, default=50)
+    parser.add_argument('--json', action='store_true', help='输出 JSON')
+    args, _ = parser.parse_known_args(argv)
+
+    if not os.path.exists(db_path()):
+        print('还没有历史记录（主窗口、--watchdog 或 --scheduler 运行时记录）', file=sys.stderr)
+        return 1
+    since = time.time() - args.days * 86400
+    store = HistoryStore()
+    try:
+        if args.view == 'status':
+            summary = store.status_summary(since=since)
+            if args.json:
+                print(json.dumps(summary.to_dict(), ensure_ascii=False))
+            else:
+                print(f'最近 {args.days:g} 天: 记录 {summary.samples} 条，观测 {_format_duration(summary.observed_seconds)}，'
+                      f'在线率 {summary.online_ratio:.1%}，掉线 {summary.drops} 次，'
+                      f'门户无响应 {_format_duration(summary.unreachable_seconds)}')
+        elif args.view == 'sessions':
+            count = 0
+            for session in store.sessions(since=since, mac=args.mac):
+                if args.json:
+                    print(json.dumps(session.to_dict(), ensure_ascii=False))
+                else:
+                    print(f'{session.mac:<14}{session.ip:<16}{session.device_type:<6}'
+                          f'{_format_time(session.started):<13}{_format_time(session.ended):<13}'
+                          f'{_format_duration(session.duration):<10}{session.end_reason or "在线"}')
+                count += 1
+                if count >= args.limit and not args.mac:
+                    break
+        else:
+            stats = store.device_stats(since=since, limit=args.limit)
+            if args.json:
+                print(json.dumps([item.to_dict() for item in stats], ensure_ascii=False))
+            else:
+                print(f'{"MAC":<14}{"IP":<16}{"类型":<5}{"会话":>5}{"重新登录":>7}  {"平均时长":<10}{"最长":<10}最后在线')
+                for item in stats:
+                    print(f'{item.mac:<14}{item.ip:<16}{item.device_type:<6}{item.sessions:>5}{item.relogins:>9}  '
+                          f'{_format_duration(item.average_seconds):<10}{_format_duration(item.longest_seconds):<10}'
+                          f'{_format_time(item.last_seen)}')
+    finally:
+        store.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
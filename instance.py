@@ -0,0 +1,316 @@
+"""
+单实例与命令转发模块。
+
+常驻的实例（主窗口、--watchdog、--scheduler）在本地套接字上注册；之后启动的
+--auto-login、--status、--logout 以及再次打开主窗口，都先尝试把命令转交给它，
+几毫秒内退出，由常驻实例用已经建立好的 keep-alive 连接和缓存完成请求。
+没有常驻实例时照常在本进程内执行。
+
+传输使用 multiprocessing.connection：Windows 上为命名管道，Linux 上为抽象命名空间的
+Unix 套接字，其他平台为 data_dir() 下的 Unix 套接字。连接建立时用 data_dir() 下
+仅当前用户可读的密钥做 HMAC 质询认证；消息为 JSON（不使用 pickle）。本模块不依赖 Qt。
+"""
+
+import json
+import os
+import sys
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import settings_store
+
+# 命令
+COMMAND_SHOW = 'show'  # 再次打开主窗口：显示并激活已有窗口
+COMMAND_AUTO_LOGIN = 'auto-login'
+COMMAND_STATUS = 'status'
+COMMAND_LOGOUT = 'logout'
+
+# 命令行参数 → 命令
+ARGV_COMMANDS = {
+    '--auto-login': COMMAND_AUTO_LOGIN,
+    '--status': COMMAND_STATUS,
+    '--logout': COMMAND_LOGOUT,
+}
+
+KEY_FILENAME = 'instance.key'
+SOCKET_FILENAME = 'instance.sock'
+
+# 客户端等待应答的最长时间（秒）；--auto-login --wait 等待整个登录序列
+REPLY_TIMEOUT = 15.0
+WAIT_TIMEOUT = 120.0
+# 服务端读取请求的最长时间（秒），防止半开连接占住线程
+REQUEST_TIMEOUT = 2.0
+# 同时处理的连接数上限；超出的连接留在监听队列中等待
+MAX_CONNECTIONS = 8
+
+
+class InstanceError(Exception):
+    """与常驻实例通信失败（连接已建立之后）。"""
+
+
+def address() -> str:
+    """当前用户的常驻实例地址。"""
+    if sys.platform == 'win32':
+        user = ''.join(ch for ch in os.environ.get('USERNAME', '') if ch.isalnum()) or 'user'
+        return rf'\\.\pipe\CSU_WIFI_AutoLogin-{user}'
+    if sys.platform.startswith('linux'):
+        # 抽象命名空间：不在文件系统中留下套接字文件，进程退出即释放
+        return f'\0CSU_WIFI_AutoLogin-{os.getuid()}'
+    return os.path.join(settings_store.data_dir(), SOCKET_FILENAME)
+
+
+def _key_path() -> str:
+    return os.path.join(settings_store.data_dir(), KEY_FILENAME)
+
+
+def _read_key() -> Optional[bytes]:
+    try:
+        with open(_key_path(), 'rb') as f:
+            return f.read() or None
+    except OSError:
+        return None
+
+
+def _load_or_create_key() -> bytes:
+    key = _read_key()
+    if key:
+        return key
+    path = _key_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    key = os.urandom(32)
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        # 另一个实例刚刚创建了密钥
+        return _read_key() or key
+    with os.fdopen(fd, 'wb') as f:
+        f.write(key)
+    return key
+
+
+class Request:
+    """一条来自其他进程的命令；handler 调用 reply() 应答（可在任意线程中，只能调用一次）。"""
+
+    __slots__ = ('command', 'options', '_conn', '_lock')
+
+    def __init__(self, command: str, options: Dict[str, Any], conn):
+        self.command = command
+        self.options = options
+        self._conn = conn
+        self._lock = threading.Lock()
+
+    @property
+    def replied(self) -> bool:
+        return self._conn is None
+
+    def reply(self, ok: bool, message: str = '') -> None:
+        with self._lock:
+            conn, self._conn = self._conn, None
+        if conn is None:
+            return
+        try:
+            conn.send_bytes(json.dumps({'ok': ok, 'message': message}, ensure_ascii=False).encode('utf-8'))
+        except OSError:
+            # 客户端已经退出
+            pass
+        finally:
+            conn.close()
+
+
+class InstanceServer:
+    """常驻实例的监听端：每个连接在独立线程中读取请求并交给 handler(request)。
+
+    同时处理的连接不超过 MAX_CONNECTIONS 个；handler 应尽快返回，耗时的命令
+    交给自己的工作线程执行，稍后再 reply()。
+    """
+
+    def __init__(self, handler: Callable[[Request], None]):
+        self.handler = handler
+        self._listener = None
+        self._thread: Optional[threading.Thread] = None
+        self._slots = threading.BoundedSemaphore(MAX_CONNECTIONS)
+
+    def start(self) -> bool:
+        """注册为单实例并开始监听；地址已被其他实例占用时返回 False。"""
+        from multiprocessing.connection import Listener
+
+        addr = address()
+        key = _load_or_create_key()
+        try:
+            self._listener = Listener(addr, authkey=key)
+        except OSError:
+            if addr.startswith('\0') or sys.platform == 'win32' or is_running():
+                return False
+            # 上次异常退出留下的套接字文件
+            try:
+                os.unlink(addr)
+                self._listener = Listener(addr, authkey=key)
+            except OSError:
+                return False
+        self._thread = threading.Thread(target=self._serve, name='instance-server', daemon=True)
+        self._thread.start()
+        return True
+
+    def _serve(self) -> None:
+        from multiprocessing import AuthenticationError
+
+        listener = self._listener
+        while self._listener is listener:
+            try:
+                conn = listener.accept()
+            except AuthenticationError:
+                continue
+            except OSError:
+                # 监听已关闭
+                return
+            self._slots.acquire()
+            threading.Thread(target=self._handle, args=(conn,), name='instance-request', daemon=True).start()
+
+    def _handle(self, conn) -> None:
+        try:
+            self._handle_request(conn)
+        finally:
+            self._slots.release()
+
+    def _handle_request(self, conn) -> None:
+        try:
+            if not conn.poll(REQUEST_TIMEOUT):
+                conn.close()
+                return
+            data = json.loads(conn.recv_bytes(65536).decode('utf-8'))
+            command = str(data.get('command', ''))
+            options = data.get('options') if isinstance(data.get('options'), dict) else {}
+        except (OSError, EOFError, ValueError, AttributeError):
+            conn.close()
+            return
+        request = Request(command, options, conn)
+        try:
+            self.handler(request)
+        except Exception as e:
+            request.reply(False, f'命令执行出错: {e}')
+
+    def stop(self) -> None:
+        listener, self._listener = self._listener, None
+        if listener is not None:
+            listener.close()
+
+
+def send(command: str, options: Optional[Dict[str, Any]] = None,
+         timeout: float = REPLY_TIMEOUT) -> Optional[Dict[str, Any]]:
+    """把命令发给常驻实例并等待应答 {'ok': bool, 'message': str}。
+
+    没有常驻实例（或地址被其他程序占用、认证失败）时返回 None；
+    命令已经发出后通信失败时抛出 InstanceError，调用方不应再自行执行同一命令。
+    """
+    key = _read_key()
+    if key is None:
+        # 从未有实例注册过
+        return None
+    from multiprocessing.connection import Client
+
+    try:
+        conn = Client(address(), authkey=key)
+    except Exception:
+        # 连接被拒绝、认证失败等
+        return None
+    try:
+        conn.send_bytes(json.dumps({'command': command, 'options': options or {}}).encode('utf-8'))
+        if not conn.poll(timeout):
+            raise InstanceError(f'等待运行中的实例应答超时（{timeout:.0f} 秒）')
+        reply = json.loads(conn.recv_bytes(65536).decode('utf-8'))
+    except (OSError, EOFError, ValueError) as e:
+        raise InstanceError(str(e))
+    finally:
+        conn.close()
+    return reply if isinstance(reply, dict) else None
+
+
+def is_running() -> bool:
+    """是否有常驻实例在监听（只尝试连接，不发送命令）。"""
+    key = _read_key()
+    if key is None:
+        return False
+    from multiprocessing.connection import Client
+
+    try:
+        Client(address(), authkey=key).close()
+        return True
+    except Exception:
+        return False
+
+
+def forward_from_argv(argv: List[str]) -> Optional[int]:
+    """按命令行参数把命令转交给常驻实例并输出结果，返回退出码；没有常驻实例时返回 None。"""
+    command = next((ARGV_COMMANDS[arg] for arg in argv if arg in ARGV_COMMANDS), COMMAND_SHOW)
+    wait = '--wait' in argv
+    options = {'wait': wait}
+    try:
+        reply = send(command, options, timeout=WAIT_TIMEOUT if wait else REPLY_TIMEOUT)
+    except InstanceError as e:
+        print(f'转交给运行中的实例失败: {e}', file=sys.stderr)
+        return 1
+    if reply is None:
+        return None
+    if command == COMMAND_SHOW and not reply.get('ok'):
+        # 常驻的是没有界面的守护进程：照常打开主窗口
+        return None
+    if reply.get('message'):
+        print(reply['message'], flush=True)
+    return 0 if reply.get('ok') else 1
+
+
+def status_reply(status) -> Tuple[bool, str]:
+    """把 PortalStatus 转换为 (是否在线, 说明)。"""
+    if status.online:
+        return True, f'已在线 (账号: {status.uid} IP: {status.v4ip})'
+    return False, status.error or '当前未在线'
+
+
+def headless_handler(client=None, log: Callable[[str], None] = print) -> Callable[[Request], None]:
+    """无界面常驻进程（--watchdog、--scheduler）使用的命令处理函数。
+
+    状态查询和注销直接在请求线程中用常驻进程的客户端完成；--auto-login 默认受理后立即应答，
+    登录序列在后台执行，附加 --wait 时等登录结束再应答。同一时间只执行一个登录序列，
+    序列执行期间再收到的 --auto-login 直接应答"忙"。
+    """
+    import headless
+    import portal_ops
+    from portal_client import get_client
+
+    client = client or get_client()
+    sequence_lock = threading.Lock()
+
+    def run_sequence(request: Request) -> None:
+        try:
+            username, password, net_type = headless.load_login_config()
+            success = headless.run_auto_login_sequence(username, password, net_type, client=client, log=log)
+            request.reply(success, '登录成功' if success else '登录失败')
+        except Exception as e:
+            request.reply(False, f'命令执行出错: {e}')
+        finally:
+            sequence_lock.release()
+
+    def handle(request: Request) -> None:
+        if request.command == COMMAND_STATUS:
+            request.reply(*status_reply(portal_ops.cached_check_status(client)))
+        elif request.command == COMMAND_LOGOUT:
+            request.reply(*portal_ops.logout(client))
+        elif request.command == COMMAND_AUTO_LOGIN:
+            log('收到转交的自动登录请求')
+            if not sequence_lock.acquire(blocking=False):
+                request.reply(False, '运行中的实例正在执行自动登录，请稍后再试')
+                return
+            if not request.options.get('wait'):
+                request.reply(True, '已转交给运行中的实例执行自动登录')
+            try:
+                threading.Thread(target=run_sequence, args=(request,), name='instance-auto-login',
+                                 daemon=True).start()
+            except Exception:
+                sequence_lock.release()
+                raise
+        elif request.command == COMMAND_SHOW:
+            request.reply(False, '运行中的实例没有界面')
+        else:
+            request.reply(False, f'未知命令: {request.command}')
+
+    return handle
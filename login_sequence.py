@@ -0,0 +1,311 @@
+"""
+自动登录序列状态机模块。
+
+以声明式的步骤表描述 查询状态→解绑→注销→登录 流程，GUI（在 NetworkWorker
+线程中）和无界面模式共用同一个引擎。每个步骤在请求之后轮询 chkstatus，
+等待门户进入下一步所需的状态；支持单步超时、取消以及计时钩子。本模块不依赖 Qt。
+"""
+
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import portal_ops
+from portal_client import PortalClient, get_client
+from protocol import PortalStatus
+
+# 状态
+STATE_CHECK = 'check'
+STATE_UNBIND = 'unbind'
+STATE_LOGOUT = 'logout'
+STATE_LOGIN = 'login'
+STATE_DONE = 'done'
+STATE_FAILED = 'failed'
+STATE_CANCELLED = 'cancelled'
+
+TERMINAL_STATES = (STATE_DONE, STATE_FAILED, STATE_CANCELLED)
+
+STEP_TITLES = {
+    STATE_CHECK: '查询状态',
+    STATE_UNBIND: '解绑',
+    STATE_LOGOUT: '注销',
+    STATE_LOGIN: '登录',
+}
+
+# 序列模式
+MODE_REBIND = 'rebind'  # 先查询状态：本机已在线（任何账号）则 解绑→注销→登录，未在线直接登录（GUI）
+MODE_FORCE = 'force'  # 总是 解绑→注销→登录（定时任务）
+MODE_ENSURE = 'ensure'  # 先查询状态：本账号已在线则结束，否则直接登录（守护进程）
+
+# 步骤结果
+OUTCOME_OK = 'ok'
+OUTCOME_FAIL = 'fail'
+OUTCOME_ONLINE = 'online'  # 本账号已在线
+OUTCOME_OTHER_ACCOUNT = 'other_account'  # 本机已在线，但登录的是其他账号
+OUTCOME_OFFLINE = 'offline'
+
+# 就绪轮询参数（秒）
+POLL_INITIAL_INTERVAL = 0.1
+POLL_MAX_INTERVAL = 1.0
+POLL_BACKOFF = 1.5
+POLL_MAX_ERRORS = 3
+STEP_TIMEOUT = 10.0
+
+# 就绪等待方式
+SETTLE_READY = 'ready'
+SETTLE_TIMEOUT_EXPIRED = 'timeout'
+SETTLE_FALLBACK = 'fallback'
+SETTLE_SKIPPED = 'skipped'
+SETTLE_CANCELLED = 'cancelled'
+
+
+class StepTiming:
+    """一个步骤的实际耗时：请求本身耗时与等待门户就绪耗时。"""
+
+    __slots__ = ('name', 'request_seconds', 'settle_seconds', 'settle_mode')
+
+    def __init__(self, name: str, request_seconds: float, settle_seconds: float, settle_mode: str):
+        self.name = name
+        self.request_seconds = request_seconds
+        self.settle_seconds = settle_seconds
+        self.settle_mode = settle_mode
+
+    @property
+    def total_seconds(self) -> float:
+        return self.request_seconds + self.settle_seconds
+
+    def __str__(self) -> str:
+        return (f'{STEP_TITLES.get(self.name, self.name)}: 请求 {self.request_seconds * 1000:.0f} ms，'
+                f'等待就绪 {self.settle_seconds * 1000:.0f} ms（{self.settle_mode}）')
+
+
+class SequenceContext:
+    """序列运行所需的账号信息与客户端。"""
+
+    __slots__ = ('client', 'username', 'password', 'net_type', 'user_account')
+
+    def __init__(self, client: PortalClient, username: str, password: str, net_type: str):
+        self.client = client
+        self.username = username
+        self.password = password
+        self.net_type = net_type
+        self.user_account = portal_ops.build_user_account(username, net_type)
+
+
+class Step:
+    """步骤定义：动作、就绪条件、超时与转移表。"""
+
+    __slots__ = ('name', 'label', 'action', 'ready', 'timeout', 'settle_on_failure', 'transitions')
+
+    def __init__(self, name: str, label: str,
+                 action: Callable[[SequenceContext], Tuple[str, str]],
+                 transitions: Dict[str, str],
+                 ready: Optional[Callable[[PortalStatus, SequenceContext], bool]] = None,
+                 timeout: float = STEP_TIMEOUT,
+                 settle_on_failure: bool = True):
+        self.name = name
+        self.label = label
+        self.action = action
+        self.transitions = transitions
+        self.ready = ready
+        self.timeout = timeout
+        self.settle_on_failure = settle_on_failure
+
+
+class SequenceResult:
+    """序列运行结果。"""
+
+    __slots__ = ('success', 'message', 'state', 'timings', 'elapsed')
+
+    def __init__(self, success: bool, message: str, state: str, timings: List[StepTiming], elapsed: float):
+        self.success = success
+        self.message = message
+        self.state = state
+        self.timings = timings
+        self.elapsed = elapsed
+
+
+def _ok_or_fail(result: Tuple[bool, str]) -> Tuple[str, str]:
+    success, message = result
+    return (OUTCOME_OK if success else OUTCOME_FAIL), message
+
+
+def is_own_account(status: PortalStatus, ctx: SequenceContext) -> bool:
+    """chkstatus 描述的是本机 IP 而不是账号：只有在线账号就是 ctx 的学号时才算本账号在线。
+
+    门户没有返回 uid 时无法区分，按本账号处理。
+    """
+    if not status.online:
+        return False
+    uid = status.uid.split('@', 1)[0]
+    return not uid or uid == ctx.username.split('@', 1)[0]
+
+
+def _check(ctx: SequenceContext) -> Tuple[str, str]:
+    status = portal_ops.cached_check_status(ctx.client)
+    if is_own_account(status, ctx):
+        return OUTCOME_ONLINE, f"已在线 (账号: {status.uid})"
+    if status.online:
+        return OUTCOME_OTHER_ACCOUNT, f"本机已登录其他账号 ({status.uid})"
+    return OUTCOME_OFFLINE, status.error or '当前未在线'
+
+
+def _unbind(ctx: SequenceContext) -> Tuple[str, str]:
+    return _ok_or_fail(portal_ops.unbind(ctx.client, ctx.username))
+
+
+def _logout(ctx: SequenceContext) -> Tuple[str, str]:
+    return _ok_or_fail(portal_ops.logout(ctx.client))
+
+
+def _login(ctx: SequenceContext) -> Tuple[str, str]:
+    return _ok_or_fail(portal_ops.login(ctx.client, ctx.user_account, ctx.password))
+
+
+# 步骤表。解绑对 chkstatus 不可见，只等待门户恢复响应；注销等待离线；登录等待本账号在线。
+STEPS: Dict[str, Step] = {
+    STATE_CHECK: Step(STATE_CHECK, '正在查询状态...', _check,
+                      transitions={OUTCOME_ONLINE: STATE_UNBIND, OUTCOME_OTHER_ACCOUNT: STATE_UNBIND,
+                                   OUTCOME_OFFLINE: STATE_LOGIN}),
+    STATE_UNBIND: Step(STATE_UNBIND, '正在解绑设备...', _unbind,
+                       ready=lambda status, ctx: True,
+                       transitions={OUTCOME_OK: STATE_LOGOUT, OUTCOME_FAIL: STATE_LOGOUT}),
+    STATE_LOGOUT: Step(STATE_LOGOUT, '正在注销...', _logout,
+                       ready=lambda status, ctx: not status.online,
+                       transitions={OUTCOME_OK: STATE_LOGIN, OUTCOME_FAIL: STATE_LOGIN}),
+    STATE_LOGIN: Step(STATE_LOGIN, '正在登录...', _login,
+                      ready=is_own_account,
+                      settle_on_failure=False,
+                      transitions={OUTCOME_OK: STATE_DONE, OUTCOME_FAIL: STATE_FAILED}),
+}
+
+ENTRY_STATES = {
+    MODE_REBIND: STATE_CHECK,
+    MODE_FORCE: STATE_UNBIND,
+    MODE_ENSURE: STATE_CHECK,
+}
+
+# 各模式对步骤表转移的覆盖
+MODE_TRANSITIONS: Dict[str, Dict[str, Dict[str, str]]] = {
+    MODE_ENSURE: {
+        # 本机登录的是其他账号时直接登录本账号，不注销别人
+        STATE_CHECK: {OUTCOME_ONLINE: STATE_DONE, OUTCOME_OTHER_ACCOUNT: STATE_LOGIN,
+                      OUTCOME_OFFLINE: STATE_LOGIN},
+    },
+}
+
+
+def wait_for_status(client: PortalClient, predicate: Callable[[PortalStatus], bool],
+                    timeout: float = STEP_TIMEOUT,
+                    fallback_seconds: float = 2,
+                    cancel_event: Optional[threading.Event] = None) -> str:
+    """轮询 chkstatus，直到 predicate(status) 为真或超过总时限。
+
+    轮询间隔从 POLL_INITIAL_INTERVAL 开始按 POLL_BACKOFF 增长到 POLL_MAX_INTERVAL。
+    若连续 POLL_MAX_ERRORS 次状态查询都没有得到门户响应，则退回到固定等待，
+    总等待时间补足 fallback_seconds 秒。
+    """
+    cancel_event = cancel_event or threading.Event()
+    start = time.monotonic()
+    deadline = start + timeout
+    interval = POLL_INITIAL_INTERVAL
+    reachable = False
+    errors = 0
+    while True:
+        # 就绪轮询必须看到最新状态，不经过缓存；自身就在轮询，不再叠加重试
+        status = portal_ops.check_status(client, retry=False)
+        if not status.reachable:
+            errors += 1
+            if not reachable and errors >= POLL_MAX_ERRORS:
+                if cancel_event.wait(max(0, fallback_seconds - (time.monotonic() - start))):
+                    return SETTLE_CANCELLED
+                return SETTLE_FALLBACK
+        else:
+            reachable = True
+            if predicate(status):
+                return SETTLE_READY
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return SETTLE_TIMEOUT_EXPIRED
+        if cancel_event.wait(min(interval, remaining)):
+            return SETTLE_CANCELLED
+        interval = min(interval * POLL_BACKOFF, POLL_MAX_INTERVAL)
+
+
+class LoginSequence:
+    """按步骤表驱动的自动登录状态机。
+
+    钩子：
+    - on_step_start(step): 步骤开始前调用
+    - on_step_end(step, outcome, message, timing): 步骤结束后调用
+    run() 在调用线程中同步执行，可从其他线程调用 cancel() 取消。
+    """
+
+    def __init__(self, username: str, password: str, net_type: str,
+                 client: Optional[PortalClient] = None,
+                 mode: str = MODE_REBIND,
+                 fallback_delay: float = 2,
+                 steps: Optional[Dict[str, Step]] = None,
+                 on_step_start: Optional[Callable[[Step], None]] = None,
+                 on_step_end: Optional[Callable[[Step, str, str, StepTiming], None]] = None):
+        self.context = SequenceContext(client or get_client(), username, password, net_type)
+        self.mode = mode
+        self.fallback_delay = fallback_delay
+        self.steps = steps or STEPS
+        self.on_step_start = on_step_start
+        self.on_step_end = on_step_end
+        self.state = ENTRY_STATES[mode]
+        self._cancel_event = threading.Event()
+
+    def cancel(self) -> None:
+        """请求取消；当前请求结束或等待被打断后停止。"""
+        self._cancel_event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    def _run_step(self, step: Step) -> Tuple[str, str, StepTiming]:
+        start = time.monotonic()
+        outcome, message = step.action(self.context)
+        requested = time.monotonic()
+
+        if step.ready is None or (outcome == OUTCOME_FAIL and not step.settle_on_failure):
+            mode = SETTLE_SKIPPED
+        else:
+            remaining = max(0.0, step.timeout - (requested - start))
+            ready = step.ready
+            mode = wait_for_status(self.context.client, lambda status: ready(status, self.context),
+                                   timeout=remaining,
+                                   fallback_seconds=self.fallback_delay,
+                                   cancel_event=self._cancel_event)
+        timing = StepTiming(step.name, requested - start, time.monotonic() - requested, mode)
+        return outcome, message, timing
+
+    def run(self) -> SequenceResult:
+        """执行状态机直到终止状态。"""
+        start = time.monotonic()
+        timings: List[StepTiming] = []
+        message = ''
+
+        if not self.context.username or not self.context.password:
+            self.state = STATE_FAILED
+            return SequenceResult(False, '请填写学号和密码', self.state, timings, 0.0)
+
+        while self.state not in TERMINAL_STATES:
+            if self.cancelled:
+                self.state = STATE_CANCELLED
+                message = '已取消'
+                break
+            step = self.steps[self.state]
+            if self.on_step_start:
+                self.on_step_start(step)
+            outcome, message, timing = self._run_step(step)
+            timings.append(timing)
+            if self.on_step_end:
+                self.on_step_end(step, outcome, message, timing)
+            transitions = MODE_TRANSITIONS.get(self.mode, {}).get(step.name, step.transitions)
+            self.state = transitions[outcome]
+
+        return SequenceResult(self.state == STATE_DONE, message, self.state, timings,
+                              time.monotonic() - start)
@@ -0,0 +1,194 @@
+"""
+门户请求计时指标模块。
+
+按 (接口, 结果) 分组，为每个请求阶段（DNS、TCP 连接、TLS、首字节、总耗时）
+维护直方图和最近若干次观测值的滚动窗口，可导出为 JSON 或 Prometheus 文本格式。
+本模块不依赖 Qt。
+"""
+
+import json
+import sys
+import threading
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+PHASES = ('dns', 'connect', 'tls', 'ttfb', 'total')
+
+# 直方图桶上界（秒）
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# 滚动窗口大小（用于计算分位数）
+WINDOW_SIZE = 256
+
+
+class RequestTiming:
+    """单个请求各阶段的耗时（秒）。
+
+    复用已有连接时 dns/connect/tls 为 0；ttfb 与 curl 的 time_starttransfer 一致，
+    从请求开始计到收到响应头。
+    """
+
+    __slots__ = ('dns', 'connect', 'tls', 'ttfb', 'total', 'new_connection', 'started')
+
+    def __init__(self):
+        self.started = 0.0
+        self.dns = 0.0
+        self.connect = 0.0
+        self.tls = 0.0
+        self.ttfb = 0.0
+        self.total = 0.0
+        self.new_connection = False
+
+    def as_dict(self) -> Dict[str, float]:
+        return {phase: getattr(self, phase) for phase in PHASES}
+
+
+class Histogram:
+    """累积桶计数的直方图，附带最近 WINDOW_SIZE 次观测值的滚动窗口。"""
+
+    __slots__ = ('bucket_counts', 'count', 'sum', 'window')
+
+    def __init__(self):
+        self.bucket_counts: List[int] = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+        self.window: Deque[float] = deque(maxlen=WINDOW_SIZE)
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        self.window.append(value)
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.bucket_counts[i] += 1
+                break
+
+    def quantile(self, q: float) -> float:
+        """滚动窗口内的分位数。"""
+        if not self.window:
+            return 0.0
+        ordered = sorted(self.window)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def cumulative_buckets(self) -> List[Tuple[float, int]]:
+        result = []
+        running = 0
+        for bound, count in zip(BUCKETS, self.bucket_counts):
+            running += count
+            result.append((bound, running))
+        return result
+
+
+class MetricsRegistry:
+    """线程安全的指标注册表。"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: Dict[Tuple[str, str, str], Histogram] = {}
+        self._requests: Dict[Tuple[str, str], int] = {}
+        self._new_connections: Dict[str, int] = {}
+
+    def observe(self, endpoint: str, outcome: str, timing: RequestTiming) -> None:
+        """记录一次请求的各阶段耗时。"""
+        with self._lock:
+            key = (endpoint, outcome)
+            self._requests[key] = self._requests.get(key, 0) + 1
+            if timing.new_connection:
+                self._new_connections[endpoint] = self._new_connections.get(endpoint, 0) + 1
+            for phase in PHASES:
+                # 复用连接时不存在 DNS/连接/TLS 阶段，不计入这些直方图
+                if phase in ('dns', 'connect', 'tls') and not timing.new_connection:
+                    continue
+                # 没有收到响应时不存在首字节时间
+                if phase == 'ttfb' and not timing.ttfb:
+                    continue
+                hist_key = (endpoint, outcome, phase)
+                histogram = self._histograms.get(hist_key)
+                if histogram is None:
+                    histogram = self._histograms[hist_key] = Histogram()
+                histogram.observe(getattr(timing, phase))
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self._requests.clear()
+            self._new_connections.clear()
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            endpoints: Dict[str, Dict] = {}
+            for (endpoint, outcome), count in sorted(self._requests.items()):
+                entry = endpoints.setdefault(endpoint, {
+                    'new_connections': self._new_connections.get(endpoint, 0),
+                    'outcomes': {},
+                })
+                phases = {}
+                for phase in PHASES:
+                    histogram = self._histograms.get((endpoint, outcome, phase))
+                    if histogram is None:
+                        continue
+                    phases[phase] = {
+                        'count': histogram.count,
+                        'sum': histogram.sum,
+                        'p50': histogram.quantile(0.5),
+                        'p95': histogram.quantile(0.95),
+                        'max': max(histogram.window) if histogram.window else 0.0,
+                    }
+                entry['outcomes'][outcome] = {'requests': count, 'phases': phases}
+            return {'unit': 'seconds', 'endpoints': endpoints}
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), ensure_ascii=False, indent=2)
+
+    def to_prometheus(self) -> str:
+        lines = [
+            '# HELP csu_portal_requests_total Portal requests by endpoint and outcome.',
+            '# TYPE csu_portal_requests_total counter',
+        ]
+        with self._lock:
+            for (endpoint, outcome), count in sorted(self._requests.items()):
+                lines.append(f'csu_portal_requests_total{{endpoint="{endpoint}",outcome="{outcome}"}} {count}')
+            lines += [
+                '# HELP csu_portal_new_connections_total Connections opened per endpoint.',
+                '# TYPE csu_portal_new_connections_total counter',
+            ]
+            for endpoint, count in sorted(self._new_connections.items()):
+                lines.append(f'csu_portal_new_connections_total{{endpoint="{endpoint}"}} {count}')
+            lines += [
+                '# HELP csu_portal_request_phase_seconds Portal request phase durations.',
+                '# TYPE csu_portal_request_phase_seconds histogram',
+            ]
+            for (endpoint, outcome, phase), histogram in sorted(self._histograms.items()):
+                labels = f'endpoint="{endpoint}",outcome="{outcome}",phase="{phase}"'
+                for bound, count in histogram.cumulative_buckets():
+                    lines.append(f'csu_portal_request_phase_seconds_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f'csu_portal_request_phase_seconds_bucket{{{labels},le="+Inf"}} {histogram.count}')
+                lines.append(f'csu_portal_request_phase_seconds_sum{{{labels}}} {histogram.sum}')
+                lines.append(f'csu_portal_request_phase_seconds_count{{{labels}}} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+
+# 进程内共享的指标注册表
+REGISTRY = MetricsRegistry()
+
+
+def metrics_path_from_argv(argv: List[str]) -> Optional[str]:
+    """解析命令行中的 --metrics [PATH] / --metrics=PATH；未指定时返回 None，未给出路径时返回 '-'。"""
+    for index, arg in enumerate(argv):
+        if arg.startswith('--metrics='):
+            return arg.split('=', 1)[1] or '-'
+        if arg == '--metrics':
+            following = argv[index + 1] if index + 1 < len(argv) else ''
+            return following if following and not following.startswith('--') else '-'
+    return None
+
+
+def dump(path: Optional[str], registry: MetricsRegistry = REGISTRY) -> None:
+    """导出指标：path 为 '-' 或空时输出到标准输出；.prom/.txt 后缀输出 Prometheus 文本，否则输出 JSON。"""
+    prometheus = bool(path) and path.endswith(('.prom', '.txt'))
+    text = registry.to_prometheus() if prometheus else registry.to_json() + '\n'
+    if not path or path == '-':
+        sys.stdout.write(text)
+        return
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
@@ -0,0 +1,291 @@
+"""
+网络变化监测模块。
+
+插上网线或连上 CSU-Student 等 SSID 后，网卡一拿到地址就触发 查询状态→登录，
+不必等程序启动、定时任务或手动点击，也不需要高频轮询：
+- Linux: 订阅 rtnetlink 的链路、地址和路由变化通知（NetlinkMonitor），内核主动推送；
+- 其他平台: 每隔几秒比较一次网卡列表和本机出口地址（PollingMonitor）。
+
+事件经过防抖后才回调：获得新地址或默认路由时很快触发，链路抖动、地址删除等
+则要等网络平静一段时间后才触发，一次抖动只回调一次。本模块不依赖 Qt。
+"""
+
+import abc
+import socket
+import struct
+import sys
+import threading
+import time
+from typing import Callable, FrozenSet, List, Optional, Set
+
+# 事件类型
+EVENT_LINK = 'link'  # 网卡上线/下线
+EVENT_ADDRESS = 'address'  # 获得全局地址
+EVENT_ADDRESS_LOST = 'address-lost'  # 全局地址被删除
+EVENT_ROUTE = 'route'  # 其他路由变化
+EVENT_DEFAULT_ROUTE = 'default-route'  # 新增默认路由
+
+# 防抖（秒）：最后一个事件之后需要保持平静的时间
+ADDRESS_SETTLE = 0.05  # 获得地址/默认路由后几乎立即触发
+LINK_SETTLE = 1.0  # 链路抖动、地址删除等等待网络稳定
+MAX_SETTLE = 5.0  # 事件持续不断时，距第一个事件最多等待这么久
+
+# PollingMonitor 的检查间隔（秒）
+POLL_INTERVAL = 3.0
+
+FAST_EVENTS = frozenset((EVENT_ADDRESS, EVENT_DEFAULT_ROUTE))
+
+# rtnetlink 常量（linux/netlink.h、linux/rtnetlink.h）
+NETLINK_ROUTE = 0
+RTMGRP_LINK = 0x1
+RTMGRP_IPV4_IFADDR = 0x10
+RTMGRP_IPV4_ROUTE = 0x40
+RTMGRP_IPV6_IFADDR = 0x100
+RTMGRP_IPV6_ROUTE = 0x400
+RTM_NEWLINK, RTM_DELLINK = 16, 17
+RTM_NEWADDR, RTM_DELADDR = 20, 21
+RTM_NEWROUTE, RTM_DELROUTE = 24, 25
+RT_SCOPE_UNIVERSE = 0
+RT_TABLE_MAIN = 254
+
+_NLMSGHDR = struct.Struct('=IHHII')  # len, type, flags, seq, pid
+_IFINFOMSG = struct.Struct('=BxHiII')  # family, type, index, flags, change
+_IFADDRMSG = struct.Struct('=BBBBI')  # family, prefixlen, flags, scope, index
+_RTMSG = struct.Struct('=BBBBBBBBI')  # family, dst_len, src_len, tos, table, protocol, scope, type, flags
+
+# 用于确定出口地址的文档保留地址（TEST-NET-1），UDP connect 不会发出任何数据包
+_PROBE_ADDRESS = ('192.0.2.1', 9)
+
+
+def parse_rtnetlink(data: bytes, ignored_links: FrozenSet[int] = frozenset()) -> List[str]:
+    """把一次 recv 得到的 rtnetlink 消息解析为事件类型列表。
+
+    忽略 ignored_links 中的网卡（如回环），非全局地址（链路本地等），以及主路由表以外的路由。
+    """
+    events = []
+    offset = 0
+    while offset + _NLMSGHDR.size <= len(data):
+        length, msg_type = _NLMSGHDR.unpack_from(data, offset)[:2]
+        if length < _NLMSGHDR.size:
+            break
+        body = offset + _NLMSGHDR.size
+        end = offset + length
+        if msg_type in (RTM_NEWLINK, RTM_DELLINK) and body + _IFINFOMSG.size <= end:
+            index = _IFINFOMSG.unpack_from(data, body)[2]
+            if index not in ignored_links:
+                events.append(EVENT_LINK)
+        elif msg_type in (RTM_NEWADDR, RTM_DELADDR) and body + _IFADDRMSG.size <= end:
+            _, _, _, scope, index = _IFADDRMSG.unpack_from(data, body)
+            if scope == RT_SCOPE_UNIVERSE and index not in ignored_links:
+                events.append(EVENT_ADDRESS if msg_type == RTM_NEWADDR else EVENT_ADDRESS_LOST)
+        elif msg_type in (RTM_NEWROUTE, RTM_DELROUTE) and body + _RTMSG.size <= end:
+            fields = _RTMSG.unpack_from(data, body)
+            dst_len, table = fields[1], fields[4]
+            if table == RT_TABLE_MAIN:
+                default = msg_type == RTM_NEWROUTE and dst_len == 0
+                events.append(EVENT_DEFAULT_ROUTE if default else EVENT_ROUTE)
+        # 消息按 4 字节对齐
+        offset += (length + 3) & ~3
+    return events
+
+
+class Debouncer:
+    """合并一段时间内的事件，网络平静后在后台线程中回调一次 callback(事件类型集合)。
+
+    每个事件把触发时间推迟到 当前时间 + delay，其中 delay 取本批事件中最短的一个：
+    获得地址后伴随而来的子网路由等慢速事件不会把它推迟。触发时间距第一个事件
+    不超过 max_delay，持续抖动时也不会无限推迟。
+    """
+
+    def __init__(self, callback: Callable[[FrozenSet[str]], None],
+                 max_delay: float = MAX_SETTLE, clock: Callable[[], float] = time.monotonic):
+        self.callback = callback
+        self.max_delay = max_delay
+        self._clock = clock
+        self._cond = threading.Condition()
+        self._pending: Set[str] = set()
+        self._first = 0.0
+        self._delay = 0.0
+        self._deadline = 0.0
+        self._stopped = False
+        self._thread: Optional[threading.Thread] = None
+
+    def trigger(self, kind: str, delay: float) -> None:
+        with self._cond:
+            if self._stopped:
+                return
+            now = self._clock()
+            if not self._pending:
+                self._first, self._delay = now, delay
+            else:
+                self._delay = min(self._delay, delay)
+            self._pending.add(kind)
+            self._deadline = min(now + self._delay, self._first + self.max_delay)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='netmon-debounce', daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def stop(self) -> None:
+        with self._cond:
+            self._stopped = True
+            self._pending.clear()
+            self._cond.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._stopped:
+                    if self._pending:
+                        remaining = self._deadline - self._clock()
+                        if remaining <= 0:
+                            break
+                        self._cond.wait(remaining)
+                    else:
+                        self._cond.wait()
+                if self._stopped:
+                    return
+                kinds = frozenset(self._pending)
+                self._pending.clear()
+            try:
+                self.callback(kinds)
+            except Exception:
+                # 回调出错不影响后续事件
+                pass
+
+
+class NetworkMonitor(abc.ABC):
+    """网络变化监测的公共部分：后台线程 + 防抖。子类实现 _run()，检测到变化时调用 _emit()。"""
+
+    name = 'base'
+
+    def __init__(self, callback: Callable[[FrozenSet[str]], None],
+                 address_settle: float = ADDRESS_SETTLE,
+                 link_settle: float = LINK_SETTLE,
+                 max_settle: float = MAX_SETTLE):
+        self.address_settle = address_settle
+        self.link_settle = link_settle
+        self._debouncer = Debouncer(callback, max_delay=max_settle)
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """在后台线程中开始监测。"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=f'netmon-{self.name}', daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """停止监测；之后不再回调。"""
+        self._stop_event.set()
+        self._debouncer.stop()
+
+    def _emit(self, kind: str) -> None:
+        self._debouncer.trigger(kind, self.address_settle if kind in FAST_EVENTS else self.link_settle)
+
+    @abc.abstractmethod
+    def _run(self) -> None:
+        """监测循环，在后台线程中运行到 _stop_event 被设置为止。"""
+
+
+class NetlinkMonitor(NetworkMonitor):
+    """Linux rtnetlink 监测：订阅链路、IPv4/IPv6 地址和路由的组播通知。"""
+
+    name = 'netlink'
+    GROUPS = RTMGRP_LINK | RTMGRP_IPV4_IFADDR | RTMGRP_IPV6_IFADDR | RTMGRP_IPV4_ROUTE | RTMGRP_IPV6_ROUTE
+
+    def __init__(self, callback: Callable[[FrozenSet[str]], None], **kwargs):
+        super().__init__(callback, **kwargs)
+        # 在构造时打开套接字：不支持 netlink 的环境在这里抛出 OSError，由 create_monitor 退回轮询
+        self._sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_ROUTE)
+        try:
+            self._sock.bind((0, self.GROUPS))
+        except OSError:
+            self._sock.close()
+            raise
+        self._wake_r, self._wake_w = socket.socketpair()
+        try:
+            self._ignored = frozenset((socket.if_nametoindex('lo'),))
+        except OSError:
+            self._ignored = frozenset()
+
+    def stop(self) -> None:
+        super().stop()
+        if self._thread is None:
+            # 未启动过：直接关闭套接字
+            self._close()
+            return
+        try:
+            self._wake_w.send(b'\0')
+        except OSError:
+            pass
+
+    def _close(self) -> None:
+        for sock in (self._sock, self._wake_r, self._wake_w):
+            sock.close()
+
+    def _run(self) -> None:
+        import select
+
+        try:
+            while not self._stop_event.is_set():
+                readable, _, _ = select.select([self._sock, self._wake_r], [], [])
+                if self._sock not in readable:
+                    continue
+                try:
+                    data = self._sock.recv(65536)
+                except OSError:
+                    # ENOBUFS：通知太多被内核丢弃，按链路变化处理
+                    self._emit(EVENT_LINK)
+                    continue
+                for kind in parse_rtnetlink(data, self._ignored):
+                    self._emit(kind)
+        finally:
+            self._close()
+
+
+def _interfaces() -> FrozenSet[str]:
+    try:
+        return frozenset(name for _, name in socket.if_nameindex())
+    except OSError:
+        return frozenset()
+
+
+def _primary_address() -> str:
+    """默认路由的出口地址；没有可用路由时返回空字符串。"""
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            sock.connect(_PROBE_ADDRESS)
+            return sock.getsockname()[0]
+    except OSError:
+        return ''
+
+
+class PollingMonitor(NetworkMonitor):
+    """通用监测：定期比较网卡列表和出口地址（不产生任何网络流量）。"""
+
+    name = 'polling'
+
+    def __init__(self, callback: Callable[[FrozenSet[str]], None], interval: float = POLL_INTERVAL, **kwargs):
+        super().__init__(callback, **kwargs)
+        self.interval = interval
+
+    def _run(self) -> None:
+        interfaces, address = _interfaces(), _primary_address()
+        while not self._stop_event.wait(self.interval):
+            current_interfaces, current_address = _interfaces(), _primary_address()
+            if current_address != address:
+                self._emit(EVENT_ADDRESS if current_address else EVENT_ADDRESS_LOST)
+            elif current_interfaces != interfaces:
+                self._emit(EVENT_LINK)
+            interfaces, address = current_interfaces, current_address
+
+
+def create_monitor(callback: Callable[[FrozenSet[str]], None], **kwargs) -> NetworkMonitor:
+    """返回当前平台可用的监测器（尚未启动）：Linux 上优先使用 rtnetlink，否则轮询。"""
+    if sys.platform.startswith('linux') and hasattr(socket, 'AF_NETLINK'):
+        try:
+            return NetlinkMonitor(callback, **kwargs)
+        except OSError:
+            pass
+    return PollingMonitor(callback, **kwargs)
@@ -2,13 +2,20 @@
 异步网络操作工作线程模块。
 
 提供专用的 QThread worker 类，处理所有网络请求，
-确保 UI 主线程不会被阻塞。
+确保 UI 主线程不会被阻塞；以及异步门户引擎、网络变化监测、定时登录和单实例命令转发的 Qt 适配器。
 """
 
-import json
-import requests
 from typing import Dict, Any, Optional
-from PyQt6.QtCore import QThread, pyqtSignal
+from PyQt6.QtCore import QObject, QThread, pyqtSignal
+
+import instance
+import network_monitor
+import portal_ops
+import scheduler
+from protocol import PortalStatus
+from login_sequence import MODE_REBIND, LoginSequence
+from portal_client import PortalClient, get_client
+from portal_engine import PortalEngine
 
 
 class NetworkWorker(QThread):
@@ -21,44 +28,27 @@ class NetworkWorker(QThread):
     login_finished = pyqtSignal(bool, str)  # (success, message)
     logout_finished = pyqtSignal(bool, str)  # (success, message)
     unbind_finished = pyqtSignal(bool, str)  # (success, message)
-    status_finished = pyqtSignal(bool, dict)  # (is_online, data)
-    devices_finished = pyqtSignal(bool, list, str)  # (success, devices, message)
+    status_finished = pyqtSignal(object)  # PortalStatus
+    devices_finished = pyqtSignal(bool, list, str)  # (success, devices, message)，devices 为 DeviceRecord 列表
+    sequence_step = pyqtSignal(str)  # 自动登录序列当前步骤说明
+    sequence_finished = pyqtSignal(bool, str, float)  # (success, message, elapsed_seconds)
 
-    def __init__(self):
+    def __init__(self, client: Optional[PortalClient] = None):
         super().__init__()
+        self.client = client or get_client()
         self._operation = None
         self._params = {}
+        self._sequence: Optional[LoginSequence] = None
 
-    def set_login_task(self, user_account: str, password: str) -> None:
-        """设置登录任务参数。"""
-        self._operation = 'login'
-        self._params = {
-            'user_account': user_account,
-            'password': password
-        }
-
-    def set_logout_task(self) -> None:
-        """设置注销任务。"""
-        self._operation = 'logout'
-        self._params = {}
-
-    def set_unbind_task(self, username: str) -> None:
-        """设置解绑任务参数。"""
-        self._operation = 'unbind'
-        self._params = {'username': username}
+    def set_task(self, operation: str, params: Optional[Dict[str, Any]] = None) -> None:
+        """按操作名设置任务参数（供任务队列调度使用）。"""
+        self._operation = operation
+        self._params = dict(params or {})
 
-    def set_status_check_task(self) -> None:
-        """设置状态检查任务。"""
-        self._operation = 'check_status'
-        self._params = {}
-
-    def set_devices_query_task(self, username: str, password: str) -> None:
-        """设置查询在线设备任务参数。"""
-        self._operation = 'get_devices'
-        self._params = {
-            'username': username,
-            'password': password
-        }
+    def cancel_sequence(self) -> None:
+        """取消正在运行的自动登录序列（如有）。"""
+        if self._sequence is not None:
+            self._sequence.cancel()
 
     def run(self) -> None:
         """执行设置的网络任务。由 start() 方法调用。"""
@@ -72,125 +62,153 @@ class NetworkWorker(QThread):
             self._do_check_status()
         elif self._operation == 'get_devices':
             self._do_get_devices()
+        elif self._operation == 'auto_login':
+            self._do_auto_login()
 
     def _do_login(self) -> None:
         """执行登录操作。"""
         user_account = self._params.get('user_account', '')
         password = self._params.get('password', '')
-
-        try:
-            url = f'https://portal.csu.edu.cn:802/eportal/portal/login?user_account={user_account}&user_password={password}'
-            response = requests.get(url, timeout=5)
-
-            if '{"result":1,"msg":"Portal协议认证成功！"}' in response.text:
-                self.login_finished.emit(True, '登录成功！')
-            else:
-                self.login_finished.emit(False, f'登录失败 - {response.text}')
-        except requests.exceptions.Timeout:
-            self.login_finished.emit(False, '请求超时，请关闭代理服务器、加速器、VPN等应用（如有）后重试')
-        except requests.exceptions.ConnectionError:
-            self.login_finished.emit(False, '未连接到校园网，请检查网络连接')
-        except requests.RequestException as e:
-            self.login_finished.emit(False, f'登录出错 - {e}')
+        self.login_finished.emit(*portal_ops.login(self.client, user_account, password))
 
     def _do_logout(self) -> None:
         """执行注销操作。"""
-        try:
-            url = 'https://portal.csu.edu.cn:802/eportal/portal/logout'
-            response = requests.get(url, timeout=5)
-
-            if 'success' in response.text:
-                self.logout_finished.emit(True, '注销成功')
-            else:
-                self.logout_finished.emit(False, '注销失败')
-        except requests.exceptions.Timeout:
-            self.logout_finished.emit(False, '请求超时，请关闭代理服务器、加速器、VPN等应用（如有）后重试')
-        except requests.exceptions.ConnectionError:
-            self.logout_finished.emit(False, '未连接到校园网，请检查网络连接')
-        except requests.RequestException as e:
-            self.logout_finished.emit(False, f'注销出错 - {e}')
+        self.logout_finished.emit(*portal_ops.logout(self.client))
 
     def _do_unbind(self) -> None:
         """执行解绑设备操作。"""
         username = self._params.get('username', '')
-
-        try:
-            url = f'https://portal.csu.edu.cn:802/eportal/portal/mac/unbind?user_account={username}'
-            response = requests.get(url, timeout=5)
-
-            if 'success' in response.text or '成功' in response.text:
-                self.unbind_finished.emit(True, '解绑成功')
-            else:
-                self.unbind_finished.emit(False, f'解绑失败 - {response.text}')
-        except requests.exceptions.Timeout:
-            self.unbind_finished.emit(False, '请求超时，请关闭代理服务器、加速器、VPN等应用（如有）后重试')
-        except requests.exceptions.ConnectionError:
-            self.unbind_finished.emit(False, '未连接到校园网，请检查网络连接')
-        except requests.RequestException as e:
-            self.unbind_finished.emit(False, f'解绑出错 - {e}')
+        self.unbind_finished.emit(*portal_ops.unbind(self.client, username))
 
     def _do_check_status(self) -> None:
         """执行状态检查操作。"""
-        try:
-            dr = ''
-            url = f'https://portal.csu.edu.cn/drcom/chkstatus?callback={dr}'
-            response = requests.get(url, timeout=5)
-            response.raise_for_status()
-            raw_text = response.text.strip()
-
-            # 解析响应格式: ( {...} )
-            if not (raw_text.startswith('(') and raw_text.endswith(')')):
-                self.status_finished.emit(False, {'error': '响应格式不正确'})
-                return
-
-            json_str = raw_text[1:-1]
-            try:
-                data = json.loads(json_str)
-            except json.JSONDecodeError:
-                self.status_finished.emit(False, {'error': 'JSON解析错误'})
-                return
-
-            # 判断 result 字段
-            if data.get('result') == 1:
-                self.status_finished.emit(True, data)
-            else:
-                self.status_finished.emit(False, data)
-        except requests.exceptions.Timeout:
-            self.status_finished.emit(False, {'error': '请求超时，请关闭代理服务器、加速器、VPN等应用（如有）后重试'})
-        except requests.exceptions.ConnectionError:
-            self.status_finished.emit(False, {'error': '未连接到校园网，请检查网络连接'})
-        except requests.RequestException as e:
-            self.status_finished.emit(False, {'error': f'状态查询失败 - {e}'})
+        self.status_finished.emit(portal_ops.cached_check_status(self.client))
 
     def _do_get_devices(self) -> None:
         """获取在线设备列表操作。"""
         username = self._params.get('username', '')
         password = self._params.get('password', '')
+        self.devices_finished.emit(*portal_ops.get_devices(self.client, username, password))
+
+    def _do_auto_login(self) -> None:
+        """执行自动登录序列（与无界面模式共用同一个状态机）。"""
+        self._sequence = LoginSequence(self._params.get('username', ''),
+                                       self._params.get('password', ''),
+                                       self._params.get('net_type', '校园网'),
+                                       client=self.client,
+                                       mode=self._params.get('mode', MODE_REBIND),
+                                       on_step_start=lambda step: self.sequence_step.emit(step.label))
+        try:
+            result = self._sequence.run()
+        finally:
+            self._sequence = None
+        self.sequence_finished.emit(result.success, result.message, result.elapsed)
+
+
+class PortalEngineBridge(QObject):
+    """将异步门户引擎的结果转发到 Qt 主线程的适配器。
+
+    引擎在自己的线程中完成请求后发射信号，Qt 以队列连接的方式
+    在接收者所在线程（通常是 UI 主线程）中调用槽函数。
+    """
+
+    # (PortalStatus, devices_result)；devices_result 为 (success, devices, message) 或 None
+    refresh_finished = pyqtSignal(object, object)
+
+    def __init__(self, engine: Optional[PortalEngine] = None, parent: Optional[QObject] = None):
+        super().__init__(parent)
+        self.engine = engine or PortalEngine()
+
+    def refresh(self, username: str = '', password: str = '') -> None:
+        """一次往返内同时刷新状态和设备列表。"""
+        future = self.engine.submit(self.engine.refresh(username, password))
+        future.add_done_callback(self._on_refresh_done)
+
+    def _on_refresh_done(self, future) -> None:
+        try:
+            status, devices = future.result()
+        except Exception as e:
+            status, devices = PortalStatus.failure(f'状态查询失败 - {e}'), None
+        self.refresh_finished.emit(status, devices)
+
+    def shutdown(self) -> None:
+        """停止引擎线程。"""
+        self.engine.stop()
+
+
+class NetworkMonitorBridge(QObject):
+    """将 network_monitor 的回调转发到 Qt 主线程的适配器。
+
+    监测线程在网络变化（经过防抖）后发射 changed 信号，参数为事件类型集合。
+    """
+
+    changed = pyqtSignal(object)
+
+    def __init__(self, parent: Optional[QObject] = None):
+        super().__init__(parent)
+        self.monitor: Optional[network_monitor.NetworkMonitor] = None
+
+    def start(self) -> None:
+        """开始监测（重复调用无副作用）。"""
+        if self.monitor is None:
+            self.monitor = network_monitor.create_monitor(self.changed.emit)
+            self.monitor.start()
+
+    def stop(self) -> None:
+        """停止监测。"""
+        if self.monitor is not None:
+            self.monitor.stop()
+            self.monitor = None
+
+
+class SchedulerBridge(QObject):
+    """在主窗口进程内运行定时登录的适配器。
+
+    调度器线程到点后发射 fired 信号（参数为任务名），由主线程启动登录序列。
+    """
+
+    fired = pyqtSignal(str)
+
+    JOB_NAME = 'login'
+
+    def __init__(self, parent: Optional[QObject] = None):
+        super().__init__(parent)
+        self.scheduler = scheduler.Scheduler()
+
+    def apply(self, schedule: Optional[scheduler.Schedule]) -> None:
+        """替换定时规则；schedule 为 None 时取消定时登录。"""
+        if schedule is None:
+            self.scheduler.remove(self.JOB_NAME)
+            return
+        self.scheduler.add(self.JOB_NAME, schedule, lambda: self.fired.emit(self.JOB_NAME))
+        self.scheduler.start()
+
+    def next_run(self) -> Optional[float]:
+        """下一次定时登录的时间戳。"""
+        return self.scheduler.next_run(self.JOB_NAME)
+
+    def stop(self) -> None:
+        self.scheduler.stop()
+
+
+class InstanceBridge(QObject):
+    """单实例监听端的适配器：把其他进程转交来的命令（instance.Request）转发到 Qt 主线程。
+
+    槽函数处理完后调用 request.reply() 应答，可以延后到任务完成时再应答。
+    """
+
+    request_received = pyqtSignal(object)
+
+    def __init__(self, parent: Optional[QObject] = None):
+        super().__init__(parent)
+        self.server = instance.InstanceServer(self.request_received.emit)
 
+    def start(self) -> bool:
+        """注册为单实例；已有其他实例在运行时返回 False。"""
         try:
-            url = f'https://portal.csu.edu.cn:802/eportal/portal/Custom/online_data?username={username}&password={password}'
-            response = requests.get(url, timeout=5)
-            response.raise_for_status()
-
-            # 处理 JSONP 响应
-            jsonp_text = response.text
-            if jsonp_text.startswith('jsonpReturn(') and jsonp_text.endswith(');'):
-                json_str = jsonp_text[len('jsonpReturn('):-2]
-                data = json.loads(json_str)
-
-                if data.get("result") == 1:
-                    devices = data.get("data", [])
-                    self.devices_finished.emit(True, devices, f'已获取在线设备列表，共 {len(devices)} 台设备。')
-                else:
-                    self.devices_finished.emit(False, [], f'获取设备列表失败 - {data.get("msg")}')
-            else:
-                self.devices_finished.emit(False, [], '获取设备列表失败 - 响应格式不正确')
-        except requests.exceptions.Timeout:
-            self.devices_finished.emit(False, [], '请求超时，请关闭代理服务器、加速器、VPN等应用（如有）后重试')
-        except requests.exceptions.ConnectionError:
-            self.devices_finished.emit(False, [], '未连接到校园网，请检查网络连接')
-        except requests.RequestException as e:
-            self.devices_finished.emit(False, [], f'获取设备列表出错 - {e}')
-        except json.JSONDecodeError:
-            self.devices_finished.emit(False, [], '获取设备列表失败 - 解析响应失败')
+            return self.server.start()
+        except OSError:
+            return False
 
+    def stop(self) -> None:
+        self.server.stop()
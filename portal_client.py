@@ -0,0 +1,576 @@
+"""
+校园网门户 HTTP 客户端模块。
+
+提供共享的 PortalClient，内部持有一个带连接池的 requests.Session，
+所有门户请求（登录、注销、解绑、状态查询、设备查询）复用同一组
+keep-alive 连接，避免每次请求都重新进行 DNS 解析、TCP 连接和 TLS 握手。
+每个请求的 DNS、连接、TLS、首字节和总耗时记录到 metrics 模块的指标注册表中。
+幂等查询按 retry_policy 重试，每个门户地址各有一个熔断器。
+设置 recorder 后每个请求都追加写入录制文件（见 portal_recorder）。
+"""
+
+import concurrent.futures
+import itertools
+import queue
+import socket
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3 import PoolManager
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+from urllib3.util.connection import allowed_gai_family, create_connection
+
+import portal_recorder
+import settings_store
+from metrics import REGISTRY, MetricsRegistry, RequestTiming
+from resolver import SOURCE_CACHE, SOURCE_LIVE, SOURCE_PINNED, SOURCE_STALE, Resolver, get_resolver
+from retry_policy import CircuitBreakers, CircuitOpenError, RetryPolicy
+from status_cache import STATUS_TTL, StatusCache
+
+# 门户地址
+EPORTAL_BASE = 'https://portal.csu.edu.cn:802/eportal/portal'
+STATUS_BASE = 'https://portal.csu.edu.cn'
+
+# 候选地址：幂等查询（状态、设备列表）在候选之间竞速，胜出者用于之后的所有请求
+EPORTAL_CANDIDATES = (EPORTAL_BASE, 'http://portal.csu.edu.cn/eportal/portal')
+STATUS_CANDIDATES = (STATUS_BASE, 'http://portal.csu.edu.cn')
+
+# 竞速时相邻两个候选的启动间隔（秒）
+REQUEST_RACE_DELAY = 0.3
+
+# 超时设置（秒）：连接超时与读取超时分开配置
+CONNECT_TIMEOUT = 3.05
+READ_TIMEOUT = 5.0
+
+# 多个地址时相邻两次连接尝试的间隔（秒），RFC 8305 建议 250ms
+CONNECT_RACE_DELAY = 0.25
+
+# 连接池大小
+POOL_CONNECTIONS = 4
+POOL_MAXSIZE = 4
+
+
+class ConnectionStats:
+    """统计连接的新建与复用次数（线程安全）。"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.opened = 0
+
+    def record_request(self) -> None:
+        with self._lock:
+            self.requests += 1
+
+    def record_open(self) -> None:
+        with self._lock:
+            self.opened += 1
+
+    @property
+    def reused(self) -> int:
+        """复用已有连接完成的请求数。"""
+        with self._lock:
+            return max(0, self.requests - self.opened)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'opened': self.opened,
+                'reused': max(0, self.requests - self.opened),
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self.requests = 0
+            self.opened = 0
+
+
+# 当前线程正在进行的请求计时；连接类在建立连接和接收响应时写入各阶段耗时
+_request_context = threading.local()
+
+
+def _current_timing() -> Optional[RequestTiming]:
+    return getattr(_request_context, 'timing', None)
+
+
+def _interleave_families(addresses: List[str]) -> List[str]:
+    """按 IPv6/IPv4 交替排列地址，首个地址的地址族优先。"""
+    ipv6 = [address for address in addresses if ':' in address]
+    ipv4 = [address for address in addresses if ':' not in address]
+    first, second = (ipv6, ipv4) if addresses and ':' in addresses[0] else (ipv4, ipv6)
+    return [address for pair in itertools.zip_longest(first, second) for address in pair if address]
+
+
+class _TimedConnectionMixin:
+    """记录 DNS、TCP 连接、TLS 握手和首字节耗时的连接类混入。
+
+    主机名经由 resolver.Resolver 解析（固定地址 → 磁盘缓存 → 实时解析），
+    只替换拨号地址，SNI 与 Host 头仍为原主机名。
+    """
+
+    def __init__(self, *args, resolver: Optional[Resolver] = None, **kwargs):
+        self._resolver = resolver
+        super().__init__(*args, **kwargs)
+
+    def _resolve(self, host: str, live: bool = False) -> Tuple[List[str], str]:
+        family = allowed_gai_family()
+        try:
+            if self._resolver is None:
+                return list(dict.fromkeys(info[4][0] for info in
+                                          socket.getaddrinfo(host, self.port, family, socket.SOCK_STREAM))), SOURCE_LIVE
+            if live:
+                return self._resolver.resolve_live(host, self.port, family), SOURCE_LIVE
+            return self._resolver.resolve(host, self.port, family)
+        except OSError:
+            # 解析失败时交给 urllib3 按原有方式报告 NameResolutionError
+            return [], SOURCE_LIVE
+
+    def _dial(self, addresses: List[str]):
+        """连接各地址，返回 (socket, 成功的地址)；全部失败时抛出最后一个错误。
+
+        只有一个地址时直接由 urllib3 建立连接；多个地址时按 Happy Eyeballs 方式竞速。
+        """
+        if len(addresses) > 1:
+            return self._race_dial(addresses)
+        host = self._dns_host
+        self._dns_host = addresses[0]
+        try:
+            return super()._new_conn(), addresses[0]
+        finally:
+            self._dns_host = host
+
+    def _race_dial(self, addresses: List[str]):
+        """Happy Eyeballs（RFC 8305）：IPv6/IPv4 地址交替排列，每隔 CONNECT_RACE_DELAY 秒
+        或上一个尝试失败时启动下一个连接尝试，采用最先建立的连接，其余连接建立后立即关闭。
+        """
+        addresses = _interleave_families(addresses)
+        lock = threading.Lock()
+        winner: List[Tuple[socket.socket, str]] = []
+        results: 'queue.Queue[Optional[OSError]]' = queue.Queue()
+
+        def attempt(address: str) -> None:
+            try:
+                sock = create_connection((address, self.port), self.timeout,
+                                         source_address=self.source_address,
+                                         socket_options=self.socket_options)
+            except OSError as e:
+                results.put(e)
+                return
+            with lock:
+                if winner:
+                    sock.close()
+                    return
+                winner.append((sock, address))
+            results.put(None)
+
+        started = finished = 0
+        last_error: Optional[OSError] = None
+
+        def start_next() -> None:
+            nonlocal started
+            threading.Thread(target=attempt, args=(addresses[started],), daemon=True).start()
+            started += 1
+
+        start_next()
+        while finished < len(addresses):
+            try:
+                error = results.get(timeout=CONNECT_RACE_DELAY if started < len(addresses) else None)
+            except queue.Empty:
+                # 当前尝试迟迟没有结果，提前启动下一个
+                start_next()
+                continue
+            if error is None:
+                with lock:
+                    return winner[0]
+            finished += 1
+            last_error = error
+            if started < len(addresses):
+                start_next()
+        if isinstance(last_error, socket.timeout):
+            raise ConnectTimeoutError(
+                self, f'Connection to {self.host} timed out. (connect timeout={self.timeout})') from last_error
+        raise NewConnectionError(self, f'Failed to establish a new connection: {last_error}') from last_error
+
+    def _new_conn(self):
+        timing = _current_timing()
+        host = self._dns_host
+        start = time.perf_counter()
+        addresses, source = self._resolve(host)
+        dns = time.perf_counter() - start
+
+        try:
+            sock, address = self._dial(addresses or [host])
+        except (NewConnectionError, ConnectTimeoutError):
+            if source not in (SOURCE_CACHE, SOURCE_PINNED, SOURCE_STALE):
+                raise
+            # 固定或缓存的地址全部不可用，退回到实时解析
+            if source != SOURCE_PINNED:
+                self._resolver.forget(host)
+            resolve_start = time.perf_counter()
+            live, source = self._resolve(host, live=True)
+            dns += time.perf_counter() - resolve_start
+            live = [address for address in live if address not in addresses]
+            if not live:
+                raise
+            sock, address = self._dial(live)
+        if self._resolver is not None and source in (SOURCE_CACHE, SOURCE_LIVE, SOURCE_STALE):
+            self._resolver.record_success(host, address)
+
+        if timing is not None:
+            timing.new_connection = True
+            timing.dns = dns
+            timing.connect = time.perf_counter() - start - dns
+        return sock
+
+    def connect(self):
+        timing = _current_timing()
+        start = time.perf_counter()
+        super().connect()
+        if timing is not None and isinstance(self, HTTPSConnection):
+            timing.tls = max(0.0, time.perf_counter() - start - timing.dns - timing.connect)
+
+    def getresponse(self, *args, **kwargs):
+        response = super().getresponse(*args, **kwargs)
+        timing = _current_timing()
+        if timing is not None:
+            timing.ttfb = time.perf_counter() - timing.started
+        return response
+
+
+class _TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class _TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class _PortalPoolManager(PoolManager):
+    """使用计时连接类的 PoolManager，新建的连接池把解析器传给连接。"""
+
+    def __init__(self, *args, resolver: Optional[Resolver] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.resolver = resolver
+        self.pool_classes_by_scheme = {
+            'http': _TimedHTTPConnectionPool,
+            'https': _TimedHTTPSConnectionPool,
+        }
+
+    def _new_pool(self, scheme, host, port, request_context=None):
+        pool = super()._new_pool(scheme, host, port, request_context)
+        # 解析器不能放进 connection_pool_kw（会成为连接池键的一部分），直接写入 conn_kw
+        pool.conn_kw['resolver'] = self.resolver
+        return pool
+
+
+class _PortalAdapter(HTTPAdapter):
+    """使用计时连接池的 HTTPAdapter。"""
+
+    def __init__(self, *args, resolver: Optional[Resolver] = None, **kwargs):
+        self.resolver = resolver
+        super().__init__(*args, **kwargs)
+
+    def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
+        self._pool_connections = connections
+        self._pool_maxsize = maxsize
+        self._pool_block = block
+        self.poolmanager = _PortalPoolManager(
+            num_pools=connections,
+            maxsize=maxsize,
+            block=block,
+            resolver=self.resolver,
+            **pool_kwargs,
+        )
+
+
+class PortalClient:
+    """校园网门户客户端。
+
+    持有一个带连接池的 requests.Session，同一主机的连续请求复用
+    keep-alive 连接（也就复用了已建立的 TLS 会话），并统计连接的新建/复用次数
+    以及每个请求各阶段的耗时。新建连接时经由 resolver 取得门户地址
+    （默认使用进程内共享的带磁盘缓存的解析器）。
+    eportal_base / status_base 可以是单个地址或候选地址列表：状态和设备查询
+    在候选之间错开启动、竞速取最先成功的响应，并记住胜出的地址；
+    登录、注销、解绑不是幂等操作，只发往当前记住的地址。
+    状态和设备查询遇到超时、连接错误或 5xx 时按 retry_policy 重试；
+    每个地址连续失败多次后熔断，熔断期间的请求立即抛出 CircuitOpenError。
+    各方法返回原始 requests.Response，异常（超时、连接错误等）由调用方处理。
+    """
+
+    def __init__(self,
+                 eportal_base: Union[str, Sequence[str]] = EPORTAL_CANDIDATES,
+                 status_base: Union[str, Sequence[str]] = STATUS_CANDIDATES,
+                 connect_timeout: float = CONNECT_TIMEOUT,
+                 read_timeout: float = READ_TIMEOUT,
+                 status_ttl: float = STATUS_TTL,
+                 metrics: Optional[MetricsRegistry] = None,
+                 resolver: Optional[Resolver] = None,
+                 retry_policy: Optional[RetryPolicy] = None,
+                 breakers: Optional[CircuitBreakers] = None):
+        self._candidates_lock = threading.Lock()
+        self._candidates: Dict[str, List[str]] = {}
+        self.set_candidates(eportal_base, status_base)
+        self._race_executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+        self.timeout: Tuple[float, float] = (connect_timeout, read_timeout)
+        self.stats = ConnectionStats()
+        self.metrics = metrics if metrics is not None else REGISTRY
+        # 解析后的状态查询结果缓存，由 portal_ops.cached_check_status 使用；查询出错的结果不缓存
+        self.status_cache = StatusCache(ttl=status_ttl, cacheable=lambda status: status.reachable)
+        self.resolver = resolver if resolver is not None else get_resolver()
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        self.breakers = breakers if breakers is not None else CircuitBreakers()
+        # 录制门户请求（portal_recorder.PortalRecorder），None 表示不录制
+        self.recorder = None
+        self.session = self._build_session()
+
+    # --- 候选地址 ---
+
+    def set_candidates(self, eportal: Union[str, Sequence[str], None] = None,
+                       status: Union[str, Sequence[str], None] = None) -> None:
+        """设置候选地址（单个地址或列表，按优先级排列），None 表示保持不变。"""
+        with self._candidates_lock:
+            for kind, value in (('eportal', eportal), ('status', status)):
+                if value is None:
+                    continue
+                bases = [value] if isinstance(value, str) else list(value)
+                bases = list(dict.fromkeys(base.rstrip('/') for base in bases if base))
+                if bases:
+                    self._candidates[kind] = bases
+
+    def candidates(self, kind: str) -> List[str]:
+        """返回候选地址，当前记住的胜出地址在最前。"""
+        with self._candidates_lock:
+            return list(self._candidates[kind])
+
+    def _remember(self, kind: str, base: str) -> None:
+        with self._candidates_lock:
+            bases = self._candidates[kind]
+            if base in bases and bases[0] != base:
+                bases.remove(base)
+                bases.insert(0, base)
+
+    @property
+    def eportal_base(self) -> str:
+        return self.candidates('eportal')[0]
+
+    @property
+    def status_base(self) -> str:
+        return self.candidates('status')[0]
+
+    def _build_session(self) -> requests.Session:
+        session = requests.Session()
+        adapter = _PortalAdapter(pool_connections=POOL_CONNECTIONS,
+                                 pool_maxsize=POOL_MAXSIZE,
+                                 resolver=self.resolver)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers['Connection'] = 'keep-alive'
+        return session
+
+    def _get(self, endpoint: str, base: str, path: str) -> requests.Response:
+        """向 base + path 发送 GET 请求，按 (endpoint, 结果) 记录各阶段耗时，并更新 base 的熔断器。"""
+        breaker = self.breakers.get(base)
+        try:
+            breaker.check()
+        except CircuitOpenError:
+            self.metrics.observe(endpoint, 'circuit_open', RequestTiming())
+            raise
+        self.stats.record_request()
+        timing = RequestTiming()
+        timing.started = time.perf_counter()
+        _request_context.timing = timing
+        outcome = 'error'
+        failed = False
+        response = None
+        try:
+            response = self.session.get(base + path, timeout=self.timeout)
+            outcome = 'ok' if response.ok else 'http_error'
+            failed = response.status_code >= 500
+            return response
+        except requests.exceptions.Timeout:
+            outcome = 'timeout'
+            failed = True
+            raise
+        except requests.exceptions.ConnectionError:
+            outcome = 'connection_error'
+            failed = True
+            raise
+        finally:
+            _request_context.timing = None
+            timing.total = time.perf_counter() - timing.started
+            # 无论以何种方式结束都先结算熔断器，否则半开状态的试探请求会一直占着名额
+            if failed:
+                breaker.record_failure()
+            elif outcome == 'error':
+                breaker.release()
+            else:
+                breaker.record_success()
+            if timing.new_connection:
+                self.stats.record_open()
+            self.metrics.observe(endpoint, outcome, timing)
+            if self.recorder is not None:
+                self.recorder.record(endpoint, base + path, outcome, response, timing)
+
+    def _retrying_get(self, endpoint: str, kind: str, path: str, secure_only: bool = False,
+                      retry: bool = True) -> requests.Response:
+        """幂等查询：竞速请求，遇到超时、连接错误或 5xx 时按 retry_policy 重试。"""
+        if not retry:
+            return self._race_get(endpoint, kind, path, secure_only)
+        return self.retry_policy.call(lambda: self._race_get(endpoint, kind, path, secure_only),
+                                      retry_result=lambda response: response.status_code >= 500)
+
+    def _race_get(self, endpoint: str, kind: str, path: str, secure_only: bool = False) -> requests.Response:
+        """在候选地址之间竞速发送幂等 GET 请求。
+
+        按候选顺序每隔 REQUEST_RACE_DELAY 秒（或上一个候选失败时立即）启动下一个请求，
+        采用第一个成功（2xx）的响应并记住其地址，取消尚未开始的请求，丢弃其余响应。
+        全部失败时返回最后一个非 2xx 响应，或抛出最后一个异常。
+        secure_only 为 True 时（请求中带有密码）只使用 https 候选，除非没有 https 候选。
+        已熔断的候选不参与竞速；全部熔断时抛出 CircuitOpenError。
+        """
+        bases = self.candidates(kind)
+        if secure_only:
+            bases = [base for base in bases if base.startswith('https://')] or bases
+        available = [base for base in bases if self.breakers.get(base).available()]
+        if not available:
+            return self._get(endpoint, bases[0], path)
+        bases = available
+        if len(bases) == 1:
+            return self._get(endpoint, bases[0], path)
+
+        with self._candidates_lock:
+            if self._race_executor is None:
+                self._race_executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=POOL_MAXSIZE, thread_name_prefix='portal-race')
+            executor = self._race_executor
+        pending: Dict[concurrent.futures.Future, str] = {}
+        remaining = list(bases)
+        last_response: Optional[requests.Response] = None
+        last_error: Optional[requests.RequestException] = None
+        while remaining or pending:
+            if remaining and (not pending or last_error is not None or last_response is not None):
+                base = remaining.pop(0)
+                pending[executor.submit(self._get, endpoint, base, path)] = base
+                last_error = last_response = None
+            done, _ = concurrent.futures.wait(pending, timeout=REQUEST_RACE_DELAY if remaining else None,
+                                              return_when=concurrent.futures.FIRST_COMPLETED)
+            if not done:
+                # 当前候选迟迟没有响应，启动下一个
+                base = remaining.pop(0)
+                pending[executor.submit(self._get, endpoint, base, path)] = base
+                continue
+            for future in done:
+                base = pending.pop(future)
+                try:
+                    response = future.result()
+                except requests.RequestException as e:
+                    last_error = e
+                    continue
+                if response.ok:
+                    self._remember(kind, base)
+                    for other in pending:
+                        if not other.cancel():
+                            other.add_done_callback(_discard_response)
+                    return response
+                last_response = response
+        if last_response is not None:
+            return last_response
+        raise last_error
+
+    def _get_invalidating(self, endpoint: str, path: str) -> requests.Response:
+        """向当前门户地址发送会改变认证状态的请求，请求前后都使状态缓存失效。"""
+        self.status_cache.invalidate()
+        try:
+            return self._get(endpoint, self.eportal_base, path)
+        finally:
+            self.status_cache.invalidate()
+
+    def login(self, user_account: str, password: str) -> requests.Response:
+        """发送登录请求（不重试，由 portal_ops.login 根据失败原因决定）。"""
+        return self._get_invalidating('login', f'/login?user_account={user_account}&user_password={password}')
+
+    def logout(self) -> requests.Response:
+        """发送注销请求。"""
+        return self._get_invalidating('logout', '/logout')
+
+    def unbind(self, username: str) -> requests.Response:
+        """发送解绑设备请求。"""
+        return self._get_invalidating('unbind', f'/mac/unbind?user_account={username}')
+
+    def check_status(self, retry: bool = True) -> requests.Response:
+        """查询当前认证状态；retry 为 False 时只尝试一次（调用方自己在轮询）。"""
+        dr = ''
+        return self._retrying_get('chkstatus', 'status', f'/drcom/chkstatus?callback={dr}', retry=retry)
+
+    def get_devices(self, username: str, password: str) -> requests.Response:
+        """查询在线设备列表。"""
+        return self._retrying_get('online_data', 'eportal',
+                                  f'/Custom/online_data?username={username}&password={password}',
+                                  secure_only=True)
+
+    def network_changed(self) -> None:
+        """网络发生变化后调用：丢弃连接池中的连接（可能绑定在已失效的本机地址上）和状态缓存，
+        并解除所有熔断（换了网络，之前不可达的地址可能已经可达）。"""
+        for adapter in self.session.adapters.values():
+            # 回放传输层没有连接池
+            poolmanager = getattr(adapter, 'poolmanager', None)
+            if poolmanager is not None:
+                poolmanager.clear()
+        self.status_cache.invalidate()
+        self.breakers.reset()
+
+    def close(self) -> None:
+        """关闭会话并释放所有连接。"""
+        if self._race_executor is not None:
+            self._race_executor.shutdown(wait=False, cancel_futures=True)
+        self.session.close()
+        if self.recorder is not None:
+            self.recorder.close()
+
+
+def _discard_response(future: concurrent.futures.Future) -> None:
+    """关闭竞速落败的响应，把连接还给连接池。"""
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
+_default_client: Optional[PortalClient] = None
+_default_client_lock = threading.Lock()
+
+
+def _split_bases(value) -> Optional[List[str]]:
+    """解析配置中以逗号或空白分隔的地址列表；未配置时返回 None。"""
+    if not value:
+        return None
+    items = value if isinstance(value, (list, tuple)) else str(value).replace(',', ' ').split()
+    return [str(item).strip() for item in items if str(item).strip()] or None
+
+
+def get_client() -> PortalClient:
+    """返回进程内共享的 PortalClient 实例。"""
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            settings = settings_store.read_settings()
+            _default_client = PortalClient(retry_policy=RetryPolicy.from_settings(settings),
+                                           breakers=CircuitBreakers.from_settings(settings))
+            _default_client.set_candidates(_split_bases(settings.get('network/eportal_candidates')),
+                                           _split_bases(settings.get('network/status_candidates')))
+            # CSU_WIFI_RECORD / CSU_WIFI_REPLAY：录制或回放门户请求
+            portal_recorder.configure_client(_default_client, settings)
+        return _default_client
@@ -0,0 +1,94 @@
+"""
+基于 asyncio 的门户引擎模块。
+
+在独立线程中运行 asyncio 事件循环，阻塞的门户请求交给线程池执行，
+使相互独立的操作（例如 chkstatus 与 Custom/online_data）可以同时进行。
+本模块不依赖 Qt，Qt 侧的适配器见 network_worker.PortalEngineBridge。
+"""
+
+import asyncio
+import concurrent.futures
+import functools
+import threading
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+
+import portal_ops
+from portal_client import PortalClient, get_client
+from protocol import DeviceRecord, PortalStatus
+
+DevicesResult = Tuple[bool, List[DeviceRecord], str]
+
+
+class PortalEngine:
+    """异步门户引擎。
+
+    通过 submit() 从任意线程提交协程，返回 concurrent.futures.Future。
+    stop() 之后再次 submit() 会以新的线程池重新启动引擎。
+    """
+
+    def __init__(self, client: Optional[PortalClient] = None, max_workers: int = 4):
+        self.client = client or get_client()
+        self.max_workers = max_workers
+        self._executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+
+    def start(self) -> None:
+        """启动事件循环线程（重复调用无副作用）。"""
+        if self._thread is not None:
+            return
+        # 每次启动都新建线程池：stop() 已关闭的线程池不能再接受任务
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers,
+                                                               thread_name_prefix='portal-engine')
+        self._thread = threading.Thread(target=self._run_loop, name='portal-engine-loop', daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def _run_loop(self) -> None:
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._loop.set_default_executor(self._executor)
+        self._ready.set()
+        self._loop.run_forever()
+        self._loop.close()
+
+    def stop(self) -> None:
+        """停止事件循环并关闭线程池。"""
+        if self._loop is not None and self._loop.is_running():
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+        self._executor = None
+        self._thread = None
+        self._loop = None
+        self._ready.clear()
+
+    def submit(self, coro: Awaitable) -> concurrent.futures.Future:
+        """从任意线程提交协程到引擎的事件循环。"""
+        self.start()
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    async def _call(self, func: Callable, *args) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(func, self.client, *args))
+
+    async def check_status(self) -> PortalStatus:
+        """异步查询认证状态（经由状态缓存）。"""
+        return await self._call(portal_ops.cached_check_status)
+
+    async def get_devices(self, username: str, password: str) -> DevicesResult:
+        """异步查询在线设备列表。"""
+        return await self._call(portal_ops.get_devices, username, password)
+
+    async def refresh(self, username: str = '', password: str = '') -> Tuple[PortalStatus, Optional[DevicesResult]]:
+        """同时查询认证状态和在线设备列表。
+
+        未提供账号密码时只查询状态，设备结果为 None。
+        """
+        if not (username and password):
+            return await self.check_status(), None
+        status, devices = await asyncio.gather(self.check_status(), self.get_devices(username, password))
+        return status, devices
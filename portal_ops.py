@@ -0,0 +1,134 @@
+"""
+门户操作模块。
+
+封装各门户操作的请求发送与响应解析，统一返回结果元组或协议对象，
+供 NetworkWorker、异步门户引擎和无界面模式共用。响应解码统一由
+protocol 模块完成。本模块不依赖 Qt。
+"""
+
+from typing import List, Tuple
+
+import requests
+
+import history
+import status_broadcast
+from portal_client import PortalClient
+from protocol import DeviceList, DeviceRecord, PortalReply, PortalStatus, ProtocolError
+from retry_policy import CircuitOpenError, request_not_sent
+
+TIMEOUT_MESSAGE = '请求超时，请关闭代理服务器、加速器、VPN等应用（如有）后重试'
+CONNECTION_ERROR_MESSAGE = '未连接到校园网，请检查网络连接'
+
+# 运营商名称 → 账号后缀
+NET_TYPES = {
+    '中国电信': 'telecomn',
+    '中国移动': 'cmccn',
+    '中国联通': 'unicomn',
+    '校园网': ''
+}
+
+
+def build_user_account(username: str, net_type: str) -> str:
+    """根据运营商拼接登录账号，例如 学号@telecomn。"""
+    suffix = NET_TYPES.get(net_type, '')
+    return f"{username}@{suffix}" if suffix else username
+
+
+def _error_message(error: requests.RequestException, prefix: str) -> str:
+    """把请求异常转换为面向用户的说明；prefix 用于其他异常，例如 '登录出错'。"""
+    if isinstance(error, CircuitOpenError):
+        return str(error)
+    if isinstance(error, requests.exceptions.Timeout):
+        return TIMEOUT_MESSAGE
+    if isinstance(error, requests.exceptions.ConnectionError):
+        return CONNECTION_ERROR_MESSAGE
+    return f'{prefix} - {error}'
+
+
+def login(client: PortalClient, user_account: str, password: str) -> Tuple[bool, str]:
+    """执行登录操作，返回 (success, message)。
+
+    登录不是幂等操作，只在请求确定没有发出（连接未建立）或门户回复暂时性错误时
+    按 client.retry_policy 重试；账号密码错误等立即返回。
+    """
+    try:
+        reply = client.retry_policy.call(lambda: PortalReply.decode(client.login(user_account, password).text),
+                                         retry_error=request_not_sent,
+                                         retry_result=lambda reply: reply.retryable)
+
+        if reply.ok:
+            return True, '登录成功！'
+        return False, f'登录失败 - {reply.error_message}'
+    except requests.RequestException as e:
+        return False, _error_message(e, '登录出错')
+
+
+def logout(client: PortalClient) -> Tuple[bool, str]:
+    """执行注销操作，返回 (success, message)。"""
+    try:
+        reply = PortalReply.decode(client.logout().text)
+
+        if reply.ok:
+            # 让本进程的状态广播尽快推送下线消息
+            status_broadcast.refresh()
+            return True, '注销成功'
+        return False, '注销失败'
+    except requests.RequestException as e:
+        return False, _error_message(e, '注销出错')
+
+
+def unbind(client: PortalClient, username: str) -> Tuple[bool, str]:
+    """执行解绑设备操作，返回 (success, message)。"""
+    try:
+        reply = PortalReply.decode(client.unbind(username).text)
+
+        if reply.ok:
+            return True, '解绑成功'
+        return False, f'解绑失败 - {reply.error_message}'
+    except requests.RequestException as e:
+        return False, _error_message(e, '解绑出错')
+
+
+def check_status(client: PortalClient, retry: bool = True) -> PortalStatus:
+    """执行状态检查操作，返回 PortalStatus（失败时 error 非空）。
+
+    retry 为 False 时不重试（调用方自己在轮询）。每次查询结果都交给 status_broadcast
+    发布并写入 history（本进程未启动发布者或未开始记录时忽略）。
+    """
+    status = _check_status(client, retry)
+    status_broadcast.publish(status)
+    history.record_status(status)
+    return status
+
+
+def _check_status(client: PortalClient, retry: bool) -> PortalStatus:
+    try:
+        response = client.check_status(retry=retry)
+        response.raise_for_status()
+        return PortalStatus.decode(response.text)
+    except ProtocolError as e:
+        return PortalStatus.failure(str(e))
+    except requests.RequestException as e:
+        return PortalStatus.failure(_error_message(e, '状态查询失败'))
+
+
+def cached_check_status(client: PortalClient) -> PortalStatus:
+    """经由状态缓存执行状态检查，短时间内的重复查询直接复用上次结果。"""
+    return client.status_cache.get(lambda: check_status(client))
+
+
+def get_devices(client: PortalClient, username: str, password: str) -> Tuple[bool, List[DeviceRecord], str]:
+    """获取在线设备列表，返回 (success, devices, message)，devices 为 DeviceRecord 列表。"""
+    try:
+        response = client.get_devices(username, password)
+        response.raise_for_status()
+        result = DeviceList.decode(response.text)
+
+        if result.ok:
+            history.record_devices(username, result.devices)
+            return True, result.devices, f'已获取在线设备列表，共 {len(result.devices)} 台设备。'
+        return False, [], f'获取设备列表失败 - {result.msg}'
+    except ProtocolError as e:
+        return False, [], f'获取设备列表失败 - {e}'
+    except requests.RequestException as e:
+        return False, [], _error_message(e, '获取设备列表出错')
@@ -0,0 +1,228 @@
+"""
+门户请求录制与回放模块。
+
+录制：PortalClient 的每个请求（URL、状态码、响应体、各阶段耗时，或超时/连接错误）
+追加为录制文件中的一行 JSON，文件只追加、不改写。学号、密码等凭据在写入前替换为
+REDACTED：URL 中只替换请求参数 user_account、user_password、username、password 的值
+（协议、主机和路径保持原样，回放时据此匹配）；响应体中替换这些完整的值，
+以及账号不带运营商后缀的学号，短于 MIN_SECRET_LENGTH 的值不在响应体中替换。
+
+回放：ReplayAdapter 作为 requests 的传输层挂到 PortalClient 的会话上，按录制顺序
+返回同一接口的响应，按原始耗时乘以 speed 等待（1 为原速，0 为不等待），
+NetworkWorker、无界面模式和登录序列不需要任何改动即可离线重现门户的行为。
+
+通过环境变量启用（对所有入口生效，由 portal_client.get_client() 调用 configure_client()）：
+- CSU_WIFI_RECORD=文件：录制；
+- CSU_WIFI_REPLAY=文件：回放，CSU_WIFI_REPLAY_SPEED 为速度系数（默认 1）。
+本模块不依赖 Qt。
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Iterator, List, Optional
+from urllib.parse import urlsplit, urlunsplit
+
+import requests
+from requests.adapters import BaseAdapter
+
+RECORD_ENV = 'CSU_WIFI_RECORD'
+REPLAY_ENV = 'CSU_WIFI_REPLAY'
+REPLAY_SPEED_ENV = 'CSU_WIFI_REPLAY_SPEED'
+
+FORMAT_VERSION = 1
+REDACTED = 'REDACTED'
+
+# 值为凭据的请求参数；账号参数的值可能带 @运营商 后缀
+ACCOUNT_PARAMS = ('user_account', 'username')
+SECRET_PARAMS = ACCOUNT_PARAMS + ('user_password', 'password')
+
+# 响应体中只替换不短于此长度的凭据，避免短密码把响应体中的普通字符一并替换
+MIN_SECRET_LENGTH = 4
+
+# 录制中的错误结果 → 回放时抛出的异常
+_REPLAY_ERRORS = {
+    'timeout': requests.exceptions.ReadTimeout,
+    'connection_error': requests.exceptions.ConnectionError,
+}
+
+
+class PortalRecorder:
+    """把门户请求追加写入录制文件（线程安全）。"""
+
+    def __init__(self, path: str, accounts: Optional[List[str]] = None):
+        self.path = path
+        self.session = f'{int(time.time())}-{os.getpid()}'
+        self._lock = threading.Lock()
+        self._secrets: List[str] = []
+        self._started = time.monotonic()
+        for account in accounts or ():
+            self.add_secret(account, account=True)
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        # 行缓冲：每条记录写完即落盘，进程异常退出也不会留下半行
+        self._file = open(path, 'a', encoding='utf-8', buffering=1)
+
+    def add_secret(self, value: str, account: bool = False) -> None:
+        """登记需要在响应体中替换的凭据；账号同时登记不带运营商后缀的学号。"""
+        values = [value]
+        if account and '@' in value:
+            values.append(value.split('@', 1)[0])
+        with self._lock:
+            for item in values:
+                if len(item) >= MIN_SECRET_LENGTH and item != REDACTED and item not in self._secrets:
+                    self._secrets.append(item)
+            # 长的先替换，避免学号替换后残留运营商后缀的组合
+            self._secrets.sort(key=len, reverse=True)
+
+    def redact_url(self, url: str) -> str:
+        """替换 URL 中凭据参数的值并登记这些值；协议、主机和路径不变。"""
+        parts = urlsplit(url)
+        if not parts.query:
+            return url
+        pairs = []
+        for pair in parts.query.split('&'):
+            name, sep, value = pair.partition('=')
+            if name in SECRET_PARAMS and value:
+                self.add_secret(value, account=name in ACCOUNT_PARAMS)
+                value = REDACTED
+            pairs.append(name + sep + value)
+        return urlunsplit(parts._replace(query='&'.join(pairs)))
+
+    def redact(self, text: str) -> str:
+        """替换文本（响应体）中登记过的凭据。"""
+        with self._lock:
+            secrets = list(self._secrets)
+        for secret in secrets:
+            text = text.replace(secret, REDACTED)
+        return text
+
+    def record(self, endpoint: str, url: str, outcome: str,
+               response: Optional[requests.Response], timing) -> None:
+        """记录一次请求；response 为 None 表示请求以超时或连接错误结束。"""
+        url = self.redact_url(url)
+        entry: Dict[str, Any] = {
+            'v': FORMAT_VERSION,
+            'session': self.session,
+            'at': round(timing.started - self._started if timing.started else 0.0, 4),
+            'endpoint': endpoint,
+            'url': url,
+            'outcome': outcome,
+            'timing': {phase: round(value, 4) for phase, value in timing.as_dict().items()},
+            'new_connection': timing.new_connection,
+        }
+        if response is not None:
+            entry['status'] = response.status_code
+            entry['body'] = self.redact(response.text)
+        line = json.dumps(entry, ensure_ascii=False, separators=(',', ':'))
+        with self._lock:
+            if not self._file.closed:
+                self._file.write(line + '\n')
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+def read_recording(path: str, session: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """逐条读取录制文件（跳过无法解析的行）；指定 session 时只读取该次运行的记录。"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if not isinstance(entry, dict) or 'url' not in entry:
+                continue
+            if session is not None and entry.get('session') != session:
+                continue
+            yield entry
+
+
+def _route(url: str) -> str:
+    """回放匹配键：协议 + 主机 + 路径（不含查询参数）。"""
+    parts = urlsplit(url)
+    return f'{parts.scheme}://{parts.netloc}{parts.path}'
+
+
+class ReplayAdapter(BaseAdapter):
+    """按录制内容应答请求的 requests 传输层。
+
+    请求按 协议+主机+路径 匹配录制，找不到时只按路径匹配（回放时门户地址可以不同）；
+    同一键的录制按顺序依次返回，用完后重复最后一条，轮询类调用总能得到应答。
+    没有任何匹配的录制时抛出 ConnectionError。
+    """
+
+    def __init__(self, entries: List[Dict[str, Any]], speed: float = 1.0,
+                 sleep=time.sleep):
+        super().__init__()
+        self.speed = max(0.0, speed)
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._by_route: Dict[str, Deque[Dict[str, Any]]] = {}
+        self._by_path: Dict[str, Deque[Dict[str, Any]]] = {}
+        for entry in entries:
+            route = _route(entry['url'])
+            self._by_route.setdefault(route, deque()).append(entry)
+            self._by_path.setdefault(urlsplit(route).path, deque()).append(entry)
+        self.replayed = 0
+
+    @classmethod
+    def from_file(cls, path: str, speed: float = 1.0, session: Optional[str] = None) -> 'ReplayAdapter':
+        return cls(list(read_recording(path, session)), speed=speed)
+
+    def _next(self, url: str) -> Optional[Dict[str, Any]]:
+        route = _route(url)
+        with self._lock:
+            queue = self._by_route.get(route) or self._by_path.get(urlsplit(route).path)
+            if not queue:
+                return None
+            entry = queue.popleft() if len(queue) > 1 else queue[0]
+            self.replayed += 1
+            return entry
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        entry = self._next(request.url)
+        if entry is None:
+            raise requests.exceptions.ConnectionError(f'录制中没有该请求: {_route(request.url)}', request=request)
+        delay = float(entry.get('timing', {}).get('total', 0.0)) * self.speed
+        if delay > 0:
+            self._sleep(delay)
+        if 'status' not in entry:
+            error = _REPLAY_ERRORS.get(entry.get('outcome'), requests.exceptions.ConnectionError)
+            raise error(f'回放录制的错误: {entry.get("outcome")}', request=request)
+        response = requests.Response()
+        response.status_code = int(entry['status'])
+        response._content = str(entry.get('body', '')).encode('utf-8')
+        response.encoding = 'utf-8'
+        response.headers['Content-Type'] = 'text/html;charset=UTF-8'
+        response.url = request.url
+        response.request = request
+        response.reason = 'OK' if response.status_code < 400 else 'Replayed'
+        return response
+
+    def close(self) -> None:
+        pass
+
+
+def install_replay(client, adapter: ReplayAdapter) -> None:
+    """让 client 的所有请求经由回放传输层应答。"""
+    for prefix in ('https://', 'http://'):
+        client.session.mount(prefix, adapter)
+
+
+def configure_client(client, settings: Dict[str, Any]) -> None:
+    """按环境变量为 client 启用录制或回放；都未设置时什么也不做。"""
+    replay_path = os.environ.get(REPLAY_ENV)
+    if replay_path:
+        try:
+            speed = float(os.environ.get(REPLAY_SPEED_ENV, 1.0))
+        except ValueError:
+            speed = 1.0
+        install_replay(client, ReplayAdapter.from_file(replay_path, speed=speed))
+    record_path = os.environ.get(RECORD_ENV)
+    if record_path:
+        username = settings.get('login/username')
+        client.recorder = PortalRecorder(record_path, accounts=[str(username)] if username else None)
@@ -0,0 +1,223 @@
+"""
+门户协议模块。
+
+把各接口的响应解码为带 __slots__ 的紧凑对象：认证状态（PortalStatus）、
+在线设备（DeviceRecord / DeviceList）、登录等操作的回复（PortalReply）。
+所有接口共用同一个宽容的 JSONP 解码器 decode_jsonp()，
+兼容 `callback({...})`、`({...});`、纯 JSON 等写法。本模块不依赖 Qt。
+"""
+
+import json
+from typing import Any, Dict, List, Optional
+
+# 登录回复中 ret_code 的含义（result 为 0 时）
+RET_CODE_MESSAGES = {
+    1: '账号或密码错误',
+    2: '终端已在线',
+    3: '认证系统繁忙',
+    8: '终端绑定数量已达上限',
+}
+
+# 登录失败后值得稍后重试的 ret_code（暂时性错误）；其余已知错误码重试也不会成功
+RETRYABLE_RET_CODES = frozenset((3,))
+
+# 没有已知 ret_code 时按 msg 判断：先排除账号类错误，再识别暂时性错误
+FATAL_MESSAGE_KEYWORDS = ('密码', '账号', '用户', '不存在', '欠费', '停机', '禁用', '上限', '已在线')
+RETRYABLE_MESSAGE_KEYWORDS = ('繁忙', '稍后', '超时', 'busy', 'timeout')
+
+
+class ProtocolError(ValueError):
+    """响应无法按门户协议解码。"""
+
+
+def decode_jsonp(text: str) -> Any:
+    """解码 JSONP / JSON 响应体，返回其中的 JSON 值。
+
+    可以处理的形式：`name({...})`、`name({...});`、`({...})`、`{...}`，
+    以及前后的空白。格式不符时抛出 ProtocolError。
+    """
+    body = text.strip()
+    if body.endswith(';'):
+        body = body[:-1].rstrip()
+    if body[:1] not in ('{', '['):
+        start = body.find('(')
+        if start < 0 or not body.endswith(')'):
+            raise ProtocolError('响应格式不正确')
+        callback = body[:start].strip()
+        if callback and not callback.replace('_', '').replace('$', '').replace('.', '').isalnum():
+            raise ProtocolError('响应格式不正确')
+        body = body[start + 1:-1]
+    try:
+        return json.loads(body)
+    except json.JSONDecodeError as e:
+        raise ProtocolError('JSON解析错误') from e
+
+
+def _decode_object(text: str) -> Dict[str, Any]:
+    payload = decode_jsonp(text)
+    if not isinstance(payload, dict):
+        raise ProtocolError('响应格式不正确')
+    return payload
+
+
+def _as_int(value: Any) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class PortalStatus:
+    """drcom/chkstatus 的认证状态。
+
+    请求失败或响应无法解码时 online 为 False，error 为错误描述；
+    门户正常响应时 error 为空字符串。
+    """
+
+    __slots__ = ('online', 'uid', 'v4ip', 'olmac', 'error')
+
+    def __init__(self, online: bool = False, uid: str = '', v4ip: str = '', olmac: str = '', error: str = ''):
+        self.online = online
+        self.uid = uid
+        self.v4ip = v4ip
+        self.olmac = olmac
+        self.error = error
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'PortalStatus':
+        return cls(online=_as_int(data.get('result')) == 1,
+                   uid=str(data.get('uid') or ''),
+                   v4ip=str(data.get('v4ip') or data.get('v46ip') or ''),
+                   olmac=str(data.get('olmac') or ''))
+
+    @classmethod
+    def decode(cls, text: str) -> 'PortalStatus':
+        return cls.from_dict(_decode_object(text))
+
+    @classmethod
+    def failure(cls, error: str) -> 'PortalStatus':
+        return cls(error=error)
+
+    @property
+    def reachable(self) -> bool:
+        """门户是否正常响应了这次查询。"""
+        return not self.error
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, PortalStatus):
+            return NotImplemented
+        return (self.online, self.uid, self.v4ip, self.olmac, self.error) == \
+            (other.online, other.uid, other.v4ip, other.olmac, other.error)
+
+    def __repr__(self) -> str:
+        return (f'PortalStatus(online={self.online!r}, uid={self.uid!r}, v4ip={self.v4ip!r}, '
+                f'olmac={self.olmac!r}, error={self.error!r})')
+
+
+class PortalReply:
+    """login / logout / mac/unbind 的通用回复：result、msg 与错误码 ret_code。"""
+
+    __slots__ = ('result', 'msg', 'ret_code', 'raw')
+
+    def __init__(self, result: Optional[int], msg: str = '', ret_code: Optional[int] = None, raw: str = ''):
+        self.result = result
+        self.msg = msg
+        self.ret_code = ret_code
+        self.raw = raw
+
+    @classmethod
+    def decode(cls, text: str) -> 'PortalReply':
+        """解码回复；无法解码时 result 为 None，原文保留在 raw 中。"""
+        try:
+            data = _decode_object(text)
+        except ProtocolError:
+            return cls(None, raw=text)
+        return cls(_as_int(data.get('result')), str(data.get('msg') or ''),
+                   _as_int(data.get('ret_code')), text)
+
+    @property
+    def ok(self) -> bool:
+        return self.result == 1
+
+    @property
+    def retryable(self) -> bool:
+        """失败是否为暂时性的（门户繁忙、回复无法解码等），稍后重试可能成功。
+
+        账号或密码错误、绑定数量上限等永远不算可重试；无法识别的失败也不重试。
+        """
+        if self.ok:
+            return False
+        if self.ret_code in RET_CODE_MESSAGES:
+            return self.ret_code in RETRYABLE_RET_CODES
+        if self.result is None:
+            # 不是门户的 JSONP 回复（网关错误页等）
+            return True
+        msg = self.msg.lower()
+        if any(word in msg for word in FATAL_MESSAGE_KEYWORDS):
+            return False
+        return any(word in msg for word in RETRYABLE_MESSAGE_KEYWORDS)
+
+    @property
+    def error_message(self) -> str:
+        """面向用户的失败原因。"""
+        if self.msg:
+            return self.msg
+        if self.ret_code in RET_CODE_MESSAGES:
+            return RET_CODE_MESSAGES[self.ret_code]
+        return self.raw
+
+    def __repr__(self) -> str:
+        return f'PortalReply(result={self.result!r}, msg={self.msg!r}, ret_code={self.ret_code!r})'
+
+
+class DeviceRecord:
+    """在线设备的紧凑记录（以 MAC 地址为键）。"""
+
+    __slots__ = ('ip', 'mac', 'online_time', 'phone_flag')
+
+    def __init__(self, ip: str, mac: str, online_time: str, phone_flag: str):
+        self.ip = ip
+        self.mac = mac
+        self.online_time = online_time
+        self.phone_flag = phone_flag
+
+    @classmethod
+    def from_dict(cls, device: Dict[str, Any]) -> 'DeviceRecord':
+        return cls(device.get('online_ip', '') or '', device.get('online_mac', '') or '',
+                   device.get('online_time', '') or '', str(device.get('phone_flag', '')))
+
+    @property
+    def key(self) -> str:
+        return self.mac or self.ip
+
+    @property
+    def device_type(self) -> str:
+        return "PC" if self.phone_flag == "0" else "手机"
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, DeviceRecord):
+            return NotImplemented
+        return (self.ip, self.mac, self.online_time, self.phone_flag) == \
+            (other.ip, other.mac, other.online_time, other.phone_flag)
+
+    def __repr__(self) -> str:
+        return f'DeviceRecord({self.ip!r}, {self.mac!r}, {self.online_time!r}, {self.phone_flag!r})'
+
+
+class DeviceList:
+    """Custom/online_data 的回复：是否成功、设备列表和门户消息。"""
+
+    __slots__ = ('ok', 'devices', 'msg')
+
+    def __init__(self, ok: bool, devices: List[DeviceRecord], msg: str = ''):
+        self.ok = ok
+        self.devices = devices
+        self.msg = msg
+
+    @classmethod
+    def decode(cls, text: str) -> 'DeviceList':
+        data = _decode_object(text)
+        if _as_int(data.get('result')) != 1:
+            return cls(False, [], str(data.get('msg') or ''))
+        return cls(True, [DeviceRecord.from_dict(device) for device in data.get('data') or []],
+                   str(data.get('msg') or ''))
@@ -0,0 +1,189 @@
+"""
+门户主机名解析模块。
+
+认证前校园网的 DNS 经常很慢甚至被劫持，因此门户地址按以下顺序取得：
+1. 固定 IP：配置项 network/portal_ip（逗号分隔）指定的地址，不做 DNS 查询；
+2. 磁盘缓存：上次解析成功的地址，在 TTL 内直接使用；
+3. 实时解析：getaddrinfo，结果写回磁盘缓存。实时解析失败时退回使用已过期的缓存。
+
+连接只替换实际拨号的地址，TLS 的 SNI、证书校验和 Host 头仍使用原主机名。
+缓存或固定的地址全部连接失败时，由 portal_client 退回到实时解析。本模块不依赖 Qt。
+"""
+
+import ipaddress
+import json
+import os
+import socket
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import settings_store
+
+# 磁盘缓存有效期（秒）；门户地址很少变化
+DNS_CACHE_TTL = 24 * 3600
+CACHE_FILENAME = 'dns_cache.json'
+
+# 地址来源
+SOURCE_LITERAL = 'literal'
+SOURCE_PINNED = 'pinned'
+SOURCE_CACHE = 'cache'
+SOURCE_LIVE = 'live'
+SOURCE_STALE = 'stale'
+
+PORTAL_HOST = 'portal.csu.edu.cn'
+
+
+def _is_ip_literal(host: str) -> bool:
+    try:
+        ipaddress.ip_address(host.strip('[]'))
+        return True
+    except ValueError:
+        return False
+
+
+def _getaddrinfo(host: str, port: int, family: int) -> List[str]:
+    infos = socket.getaddrinfo(host, port, family, socket.SOCK_STREAM)
+    return list(dict.fromkeys(info[4][0] for info in infos))
+
+
+def parse_addresses(value: Any) -> List[str]:
+    """解析配置中的地址列表（逗号或空白分隔），忽略不是 IP 地址的项。"""
+    if not value:
+        return []
+    items = value if isinstance(value, (list, tuple)) else str(value).replace(',', ' ').split()
+    return [item.strip() for item in items if _is_ip_literal(str(item).strip())]
+
+
+class Resolver:
+    """带磁盘缓存和固定地址的主机名解析器（线程安全）。"""
+
+    def __init__(self, path: Optional[str] = None, ttl: float = DNS_CACHE_TTL,
+                 pinned: Optional[Dict[str, List[str]]] = None,
+                 lookup: Callable[[str, int, int], List[str]] = _getaddrinfo,
+                 clock: Callable[[], float] = time.time):
+        self.path = path
+        self.ttl = ttl
+        self._lookup = lookup
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._pinned: Dict[str, List[str]] = {host: list(addresses) for host, addresses in (pinned or {}).items()}
+        self._cache: Optional[Dict[str, Dict[str, Any]]] = None  # host → {'addresses': [...], 'expires': 时间戳}
+
+    # --- 固定地址 ---
+
+    def pin(self, host: str, addresses: List[str]) -> None:
+        """为主机指定固定地址；addresses 为空时取消固定。"""
+        with self._lock:
+            if addresses:
+                self._pinned[host] = list(addresses)
+            else:
+                self._pinned.pop(host, None)
+
+    def pinned(self, host: str) -> List[str]:
+        with self._lock:
+            return list(self._pinned.get(host, ()))
+
+    # --- 磁盘缓存 ---
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if self._cache is None:
+            self._cache = {}
+            if self.path:
+                try:
+                    with open(self.path, encoding='utf-8') as f:
+                        data = json.load(f)
+                    if isinstance(data, dict):
+                        self._cache = {host: entry for host, entry in data.items()
+                                       if isinstance(entry, dict) and parse_addresses(entry.get('addresses'))}
+                except (OSError, ValueError):
+                    pass
+        return self._cache
+
+    def _save(self) -> None:
+        if not self.path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp_path = f'{self.path}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._cache, f)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            pass
+
+    def cached(self, host: str, allow_stale: bool = False) -> List[str]:
+        """返回缓存的地址；过期且不允许使用过期缓存时返回空列表。"""
+        with self._lock:
+            entry = self._load().get(host)
+            if entry is None or (not allow_stale and entry.get('expires', 0) <= self._clock()):
+                return []
+            return list(entry['addresses'])
+
+    def _store(self, host: str, addresses: List[str]) -> None:
+        with self._lock:
+            self._load()[host] = {'addresses': list(addresses), 'expires': self._clock() + self.ttl}
+            self._save()
+
+    def forget(self, host: str) -> None:
+        """删除主机的缓存地址（例如缓存的地址全部连接失败时）。"""
+        with self._lock:
+            if self._load().pop(host, None) is not None:
+                self._save()
+
+    def record_success(self, host: str, address: str) -> None:
+        """把连接成功的缓存地址移到最前面，下次优先尝试。"""
+        with self._lock:
+            entry = self._load().get(host)
+            if entry is None or address not in entry['addresses'] or entry['addresses'][0] == address:
+                return
+            entry['addresses'].remove(address)
+            entry['addresses'].insert(0, address)
+            self._save()
+
+    # --- 解析 ---
+
+    def resolve_live(self, host: str, port: int, family: int = socket.AF_UNSPEC) -> List[str]:
+        """实时解析并刷新缓存；解析失败时抛出 OSError。"""
+        addresses = self._lookup(host, port, family)
+        if addresses:
+            self._store(host, addresses)
+        return addresses
+
+    def resolve(self, host: str, port: int, family: int = socket.AF_UNSPEC) -> Tuple[List[str], str]:
+        """返回 (地址列表, 来源)。没有任何可用地址时抛出 OSError。"""
+        if _is_ip_literal(host):
+            return [host], SOURCE_LITERAL
+        pinned = self.pinned(host)
+        if pinned:
+            return pinned, SOURCE_PINNED
+        cached = self.cached(host)
+        if cached:
+            return cached, SOURCE_CACHE
+        try:
+            return self.resolve_live(host, port, family), SOURCE_LIVE
+        except OSError:
+            stale = self.cached(host, allow_stale=True)
+            if stale:
+                return stale, SOURCE_STALE
+            raise
+
+
+_default_resolver: Optional[Resolver] = None
+_default_resolver_lock = threading.Lock()
+
+
+def get_resolver() -> Resolver:
+    """返回进程内共享的解析器：缓存文件位于 settings_store.data_dir()，固定地址读取自 network/portal_ip。"""
+    global _default_resolver
+    with _default_resolver_lock:
+        if _default_resolver is None:
+            settings = settings_store.read_settings()
+            try:
+                ttl = float(settings.get('network/dns_cache_ttl', DNS_CACHE_TTL))
+            except (TypeError, ValueError):
+                ttl = DNS_CACHE_TTL
+            pinned = parse_addresses(settings.get('network/portal_ip'))
+            _default_resolver = Resolver(path=os.path.join(settings_store.data_dir(), CACHE_FILENAME),
+                                         ttl=ttl, pinned={PORTAL_HOST: pinned} if pinned else None)
+        return _default_resolver
@@ -0,0 +1,266 @@
+"""
+门户请求重试与熔断模块。
+
+- RetryPolicy：失败后按带抖动的指数退避重试，单次调用（含所有重试和等待）的总耗时
+  不超过 budget 秒；进程内共享的 RetryBudget 限制重试占请求总数的比例，
+  门户整体故障时重试不会把请求量放大数倍。
+- CircuitBreaker：每个门户地址一个。连续 threshold 次请求失败（超时、连接错误、5xx）
+  后熔断，cooldown 秒内发往该地址的请求立即失败，而不是逐个等待连接/读取超时；
+  冷却结束后只放行一个试探请求，成功则恢复，失败则重新计时。
+
+哪些调用可以重试由调用方决定：状态和设备查询是幂等的，任何暂时性失败都重试；
+登录只在请求确定没有发出（request_not_sent）或门户回复暂时性错误
+（protocol.PortalReply.retryable）时重试，账号密码错误永远不重试。本模块不依赖 Qt。
+"""
+
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+import requests
+from urllib3.exceptions import NewConnectionError
+
+# 重试默认值
+RETRY_ATTEMPTS = 3  # 含首次请求在内的最多尝试次数
+RETRY_BASE_DELAY = 0.25  # 第一次重试前的最长等待（秒），之后每次翻倍
+RETRY_MAX_DELAY = 2.0  # 单次等待上限（秒）
+RETRY_BUDGET = 8.0  # 单次调用含重试的总时限（秒）
+
+# 进程内重试配额：每个首次请求存入 BUDGET_RATIO 个令牌，每次重试取出一个，最多积攒 BUDGET_RESERVE 个
+BUDGET_RATIO = 0.2
+BUDGET_RESERVE = 10.0
+
+# 熔断默认值
+BREAKER_THRESHOLD = 3  # 连续失败多少次后熔断
+BREAKER_COOLDOWN = 15.0  # 熔断持续时间（秒）
+
+# 熔断器状态
+STATE_CLOSED = 'closed'
+STATE_OPEN = 'open'
+STATE_HALF_OPEN = 'half-open'
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """目标地址已熔断，请求没有发出。"""
+
+    def __init__(self, name: str, retry_after: float):
+        self.name = name
+        self.retry_after = retry_after
+        super().__init__(f'门户连续多次无响应，已暂停请求，约 {max(1, round(retry_after))} 秒后自动恢复')
+
+
+def request_not_sent(error: BaseException) -> bool:
+    """请求是否确定没有到达门户（连接未建立），此时重试非幂等请求也是安全的。"""
+    if isinstance(error, CircuitOpenError):
+        return False
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    if isinstance(error, requests.exceptions.ConnectionError) and error.args:
+        # requests 把 urllib3 的 MaxRetryError 放在 args[0]，真正的原因在其 reason 中
+        return isinstance(getattr(error.args[0], 'reason', None), NewConnectionError)
+    return False
+
+
+def transient_error(error: BaseException) -> bool:
+    """幂等请求遇到的错误是否值得重试：超时和连接错误（已熔断的除外）。"""
+    if isinstance(error, CircuitOpenError):
+        return False
+    return isinstance(error, (requests.exceptions.Timeout, requests.exceptions.ConnectionError))
+
+
+def _setting(settings: Dict[str, Any], key: str, default, cast=float):
+    try:
+        return cast(settings.get(key, default))
+    except (TypeError, ValueError):
+        return default
+
+
+class RetryBudget:
+    """进程内的重试配额（令牌桶），线程安全。"""
+
+    def __init__(self, ratio: float = BUDGET_RATIO, reserve: float = BUDGET_RESERVE):
+        self.ratio = ratio
+        self.reserve = reserve
+        self._lock = threading.Lock()
+        self._tokens = reserve
+
+    def deposit(self) -> None:
+        """记录一次首次请求。"""
+        with self._lock:
+            self._tokens = min(self.reserve, self._tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        """为一次重试取出令牌；配额用尽时返回 False。"""
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+class RetryPolicy:
+    """带抖动指数退避的重试策略。
+
+    第 n 次重试前等待 [0, min(max_delay, base_delay * 2**n)] 之间的随机时间（full jitter），
+    多个进程同时遇到故障时不会在同一时刻一齐重试。
+    """
+
+    def __init__(self, attempts: int = RETRY_ATTEMPTS,
+                 base_delay: float = RETRY_BASE_DELAY,
+                 max_delay: float = RETRY_MAX_DELAY,
+                 budget: float = RETRY_BUDGET,
+                 retry_budget: Optional[RetryBudget] = None,
+                 rng: Callable[[], float] = random.random,
+                 sleep: Callable[[float], None] = time.sleep,
+                 clock: Callable[[], float] = time.monotonic):
+        self.attempts = max(1, attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget
+        self.retry_budget = retry_budget if retry_budget is not None else RetryBudget()
+        self._rng = rng
+        self._sleep = sleep
+        self._clock = clock
+
+    @classmethod
+    def from_settings(cls, settings: Dict[str, Any]) -> 'RetryPolicy':
+        """读取配置项 network/retry_attempts（设为 1 关闭重试）和 network/retry_budget（秒）。"""
+        return cls(attempts=_setting(settings, 'network/retry_attempts', RETRY_ATTEMPTS, int),
+                   budget=_setting(settings, 'network/retry_budget', RETRY_BUDGET))
+
+    def backoff(self, retry: int) -> float:
+        """第 retry 次重试（从 0 开始）前的等待时间。"""
+        return self._rng() * min(self.max_delay, self.base_delay * (2 ** retry))
+
+    def call(self, fn: Callable[[], Any],
+             retry_error: Callable[[BaseException], bool] = transient_error,
+             retry_result: Callable[[Any], bool] = lambda result: False) -> Any:
+        """调用 fn()，抛出 retry_error 认可的异常或返回 retry_result 认可的结果时重试。
+
+        次数、总时限或进程内配额用尽时，抛出最后一个异常或返回最后一个结果。
+        """
+        start = self._clock()
+        self.retry_budget.deposit()
+        retry = 0
+        while True:
+            try:
+                result = fn()
+            except Exception as e:
+                if not retry_error(e) or not self._wait(retry, start):
+                    raise
+            else:
+                if not retry_result(result) or not self._wait(retry, start):
+                    return result
+            retry += 1
+
+    def _wait(self, retry: int, start: float) -> bool:
+        """允许再试一次时等待退避时间并返回 True。"""
+        if retry + 1 >= self.attempts:
+            return False
+        delay = self.backoff(retry)
+        if self._clock() - start + delay >= self.budget:
+            return False
+        if not self.retry_budget.withdraw():
+            return False
+        self._sleep(delay)
+        return True
+
+
+class CircuitBreaker:
+    """单个门户地址的熔断器，线程安全。"""
+
+    def __init__(self, name: str, threshold: int = BREAKER_THRESHOLD, cooldown: float = BREAKER_COOLDOWN,
+                 clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.threshold = max(1, threshold)
+        self.cooldown = cooldown
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.state = STATE_CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._trial = False
+
+    def available(self) -> bool:
+        """现在发出请求是否可能被放行（不改变状态）。"""
+        with self._lock:
+            if self.state == STATE_OPEN:
+                return self._clock() - self._opened_at >= self.cooldown
+            return not (self.state == STATE_HALF_OPEN and self._trial)
+
+    def check(self) -> None:
+        """请求前调用：熔断中抛出 CircuitOpenError；冷却结束后放行一个试探请求。
+
+        每次通过检查的请求结束后必须调用 record_success、record_failure 或 release 之一。
+        """
+        with self._lock:
+            if self.state == STATE_OPEN:
+                remaining = self._opened_at + self.cooldown - self._clock()
+                if remaining > 0:
+                    raise CircuitOpenError(self.name, remaining)
+                self.state = STATE_HALF_OPEN
+                self._trial = False
+            if self.state == STATE_HALF_OPEN:
+                if self._trial:
+                    # 试探请求尚未结束
+                    raise CircuitOpenError(self.name, 1.0)
+                self._trial = True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = STATE_CLOSED
+            self.failures = 0
+            self._trial = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._trial = False
+            if self.state == STATE_HALF_OPEN or self.failures >= self.threshold:
+                self.state = STATE_OPEN
+                self._opened_at = self._clock()
+
+    def release(self) -> None:
+        """请求以与门户无关的错误结束（既不算成功也不算失败）：放行下一个试探请求。"""
+        with self._lock:
+            self._trial = False
+
+    def reset(self) -> None:
+        self.record_success()
+
+
+class CircuitBreakers:
+    """按门户地址分组的熔断器集合。"""
+
+    def __init__(self, threshold: int = BREAKER_THRESHOLD, cooldown: float = BREAKER_COOLDOWN,
+                 clock: Callable[[], float] = time.monotonic):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    @classmethod
+    def from_settings(cls, settings: Dict[str, Any]) -> 'CircuitBreakers':
+        """读取配置项 network/breaker_threshold 和 network/breaker_cooldown（秒）。"""
+        return cls(threshold=_setting(settings, 'network/breaker_threshold', BREAKER_THRESHOLD, int),
+                   cooldown=_setting(settings, 'network/breaker_cooldown', BREAKER_COOLDOWN))
+
+    def get(self, name: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(name)
+            if breaker is None:
+                breaker = self._breakers[name] = CircuitBreaker(name, self.threshold, self.cooldown, self._clock)
+            return breaker
+
+    def reset(self) -> None:
+        """网络变化后调用：所有地址重新获得机会。"""
+        with self._lock:
+            breakers = list(self._breakers.values())
+        for breaker in breakers:
+            breaker.reset()
+
+    def snapshot(self) -> Dict[str, str]:
+        with self._lock:
+            return {name: breaker.state for name, breaker in self._breakers.items()}
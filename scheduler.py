@@ -0,0 +1,518 @@
+"""
+进程内定时登录模块。
+
+按保存的定时设置（每天 / 每隔几天 / 每周，指定时间）在常驻进程内执行自动登录，
+不必每次由系统计划任务拉起一个新的解释器：
+- GUI 常驻时由主窗口托管（network_worker.SchedulerBridge）；
+- 无界面时 python CSU_WIFI_Login.py --scheduler 作为守护进程运行；
+- Linux 上也可以导出为 systemd 用户定时器或 cron 条目（--export systemd|cron [--install]）。
+
+调度器用堆保存各任务的下一次触发时间（单调时钟），每次最多睡眠 MAX_SLEEP 秒后
+核对墙上时钟：发现休眠唤醒或系统时间调整时按墙上时间重新计算触发点；
+错过的运行只补跑一次，不会堆积。本模块不依赖 Qt。
+"""
+
+import datetime
+import heapq
+import itertools
+import os
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import settings_store
+
+# 重复方式（与界面上的选项一致）
+SCHEDULE_DAILY = '每天'
+SCHEDULE_EVERY_N_DAYS = '每隔几天'
+SCHEDULE_WEEKLY = '每周'
+
+# 星期代码，下标与 datetime.date.weekday() 一致
+WEEKDAY_CODES = ('MON', 'TUE', 'WED', 'THU', 'FRI', 'SAT', 'SUN')
+
+# 调度循环每次最多睡眠（秒）：定期核对墙上时钟，及时发现休眠唤醒和时钟调整
+MAX_SLEEP = 30.0
+# 墙上时钟相对单调时钟的偏移变化超过该值（秒）时，按墙上时间重新计算所有触发点
+DRIFT_TOLERANCE = 2.0
+# 错过的运行在多长时间（秒）以内仍补跑一次，更早的直接跳过
+CATCH_UP_WINDOW = 6 * 3600
+
+# 定时方式（配置项 schedule/backend）
+BACKEND_APP = 'app'  # 进程内调度，程序须保持运行（非 Windows 平台的默认值）
+BACKEND_SCHTASKS = 'schtasks'  # Windows 计划任务，程序不必运行（Windows 上的默认值）
+DEFAULT_BACKEND = BACKEND_SCHTASKS if sys.platform == 'win32' else BACKEND_APP
+
+TASK_NAME = 'CSUWIFILogin_Scheduled'
+UNIT_NAME = 'csu-wifi-autologin'
+CRON_MARKER = '# CSU_WIFI_AutoLogin'
+
+# 每隔几天的起算日期缺省值，保证各进程对“哪天执行”的判断一致
+_DEFAULT_ANCHOR = datetime.date(1970, 1, 1)
+
+
+class Schedule:
+    """一条定时规则：在 runs_on() 为真的日期的 hour:minute 触发。"""
+
+    __slots__ = ('kind', 'hour', 'minute', 'days_interval', 'weekdays', 'anchor')
+
+    def __init__(self, kind: str = SCHEDULE_DAILY, hour: int = 8, minute: int = 0,
+                 days_interval: int = 2, weekdays: Tuple[str, ...] = (),
+                 anchor: Optional[datetime.date] = None):
+        if kind not in (SCHEDULE_DAILY, SCHEDULE_EVERY_N_DAYS, SCHEDULE_WEEKLY):
+            raise ValueError(f'未知的计划类型: {kind}')
+        self.kind = kind
+        self.hour = hour
+        self.minute = minute
+        self.days_interval = max(1, int(days_interval))
+        self.weekdays = tuple(code for code in WEEKDAY_CODES if code in weekdays)
+        self.anchor = anchor or _DEFAULT_ANCHOR
+
+    @classmethod
+    def from_settings(cls, settings: Dict[str, Any]) -> Optional['Schedule']:
+        """从 settings_store.read_settings() 的结果构造；未启用或设置无效时返回 None。"""
+        if not settings_store.to_bool(settings.get('schedule/enabled')):
+            return None
+        try:
+            hour, minute = (int(part) for part in str(settings.get('schedule/time') or '08:00').split(':'))
+            anchor_text = settings.get('schedule/start_date')
+            anchor = datetime.date.fromisoformat(str(anchor_text)) if anchor_text else None
+            schedule = cls(str(settings.get('schedule/type') or SCHEDULE_DAILY), hour, minute,
+                           int(settings.get('schedule/days_interval') or 2),
+                           tuple(str(settings.get('schedule/weekdays') or '').split(',')), anchor)
+        except ValueError:
+            return None
+        if schedule.kind == SCHEDULE_WEEKLY and not schedule.weekdays:
+            return None
+        return schedule
+
+    def runs_on(self, day: datetime.date) -> bool:
+        """该日期是否执行。"""
+        if self.kind == SCHEDULE_WEEKLY:
+            return WEEKDAY_CODES[day.weekday()] in self.weekdays
+        if self.kind == SCHEDULE_EVERY_N_DAYS:
+            return (day - self.anchor).days % self.days_interval == 0
+        return True
+
+    def next_after(self, moment: datetime.datetime) -> Optional[datetime.datetime]:
+        """moment（本地时间）之后的第一次触发时间；没有任何执行日期时返回 None。"""
+        day = moment.date()
+        for _ in range(366 + self.days_interval):
+            candidate = datetime.datetime.combine(day, datetime.time(self.hour, self.minute))
+            if candidate > moment and self.runs_on(day):
+                return candidate
+            day += datetime.timedelta(days=1)
+        return None
+
+    def describe(self) -> str:
+        at = f'{self.hour:02d}:{self.minute:02d}'
+        if self.kind == SCHEDULE_WEEKLY:
+            return f'每周 {",".join(self.weekdays)} {at}'
+        if self.kind == SCHEDULE_EVERY_N_DAYS:
+            return f'每隔 {self.days_interval} 天 {at}'
+        return f'每天 {at}'
+
+    def __repr__(self) -> str:
+        return f'Schedule({self.describe()!r})'
+
+
+class Job:
+    """调度器中的一个任务。"""
+
+    __slots__ = ('name', 'schedule', 'callback', 'due_wall', 'due_mono', 'runs', 'skipped', 'version')
+
+    def __init__(self, name: str, schedule: Schedule, callback: Callable[[], Any]):
+        self.name = name
+        self.schedule = schedule
+        self.callback = callback
+        self.due_wall = 0.0  # 下一次触发的墙上时间戳
+        self.due_mono = 0.0  # 对应的单调时钟时间
+        self.runs = 0
+        self.skipped = 0  # 错过而没有执行的触发次数（补跑只算一次运行）
+        self.version = 0  # 重新排期时递增，使堆中的旧条目失效
+
+
+class Scheduler:
+    """基于堆和单调时钟的定时调度器（线程安全）。
+
+    start() 后在后台线程中运行；也可以手动调用 run_pending()。任务回调在调度线程中
+    依次执行，下一次触发时间在回调结束后从当前时间起算：回调执行期间或休眠期间
+    错过的多次触发只补跑一次。
+    """
+
+    def __init__(self, monotonic: Callable[[], float] = time.monotonic,
+                 wall: Callable[[], float] = time.time,
+                 catch_up_window: float = CATCH_UP_WINDOW,
+                 max_sleep: float = MAX_SLEEP,
+                 log: Callable[[str], None] = print):
+        self._monotonic = monotonic
+        self._wall = wall
+        self.catch_up_window = catch_up_window
+        self.max_sleep = max_sleep
+        self.log = log
+        self._cond = threading.Condition()
+        self._jobs: Dict[str, Job] = {}
+        self._heap: List[Tuple[float, int, int, Job]] = []
+        self._counter = itertools.count()
+        self._offset = wall() - monotonic()  # 墙上时钟 - 单调时钟
+        self._stopped = False
+        self._thread: Optional[threading.Thread] = None
+
+    # --- 任务管理 ---
+
+    def add(self, name: str, schedule: Schedule, callback: Callable[[], Any]) -> Job:
+        """添加任务；同名任务会被替换。"""
+        job = Job(name, schedule, callback)
+        with self._cond:
+            old = self._jobs.pop(name, None)
+            if old is not None:
+                old.version += 1
+            self._jobs[name] = job
+            self._plan(job, self._wall())
+            self._cond.notify()
+        return job
+
+    def remove(self, name: str) -> None:
+        with self._cond:
+            job = self._jobs.pop(name, None)
+            if job is not None:
+                job.version += 1
+
+    def clear(self) -> None:
+        with self._cond:
+            for job in self._jobs.values():
+                job.version += 1
+            self._jobs.clear()
+            self._heap.clear()
+
+    def next_run(self, name: str) -> Optional[float]:
+        """任务下一次触发的墙上时间戳；任务不存在或不会再触发时返回 None。"""
+        with self._cond:
+            job = self._jobs.get(name)
+            return job.due_wall if job is not None and job.due_wall else None
+
+    # --- 排期 ---
+
+    def _push(self, job: Job) -> None:
+        heapq.heappush(self._heap, (job.due_mono, next(self._counter), job.version, job))
+
+    def _plan(self, job: Job, after_wall: float) -> None:
+        job.version += 1
+        nxt = job.schedule.next_after(datetime.datetime.fromtimestamp(after_wall))
+        if nxt is None:
+            job.due_wall = job.due_mono = 0.0
+            return
+        job.due_wall = nxt.timestamp()
+        job.due_mono = job.due_wall - self._offset
+        self._push(job)
+
+    def _correct_drift(self) -> None:
+        """墙上时钟相对单调时钟发生跳变（休眠唤醒、手动或 NTP 调整）时，按墙上时间重新排期。"""
+        offset = self._wall() - self._monotonic()
+        if abs(offset - self._offset) <= DRIFT_TOLERANCE:
+            return
+        self._offset = offset
+        self._heap.clear()
+        for job in self._jobs.values():
+            if job.due_wall:
+                job.version += 1
+                job.due_mono = job.due_wall - offset
+                self._push(job)
+
+    def _pop_due(self) -> Tuple[List[Job], float]:
+        """取出所有到期任务，返回 (到期任务, 距下一个任务的秒数)。"""
+        self._correct_drift()
+        now = self._monotonic()
+        due = []
+        while self._heap:
+            due_mono, _, version, job = self._heap[0]
+            if version != job.version or self._jobs.get(job.name) is not job:
+                heapq.heappop(self._heap)
+                continue
+            if due_mono > now:
+                break
+            heapq.heappop(self._heap)
+            if job.due_wall > self._wall() + 0.5:
+                # 单调时钟走得比墙上时钟快：按墙上时间补足剩余的等待
+                job.version += 1
+                job.due_mono = now + job.due_wall - self._wall()
+                self._push(job)
+                continue
+            due.append(job)
+        delay = self._heap[0][0] - now if self._heap else self.max_sleep
+        return due, max(0.0, min(delay, self.max_sleep))
+
+    @staticmethod
+    def _latest_due(job: Job, now: float) -> Tuple[float, int]:
+        """返回 (不晚于 now 的最近一次触发时间, 其间错过的触发次数)。"""
+        latest, missed = job.due_wall, 0
+        while True:
+            nxt = job.schedule.next_after(datetime.datetime.fromtimestamp(latest))
+            if nxt is None or nxt.timestamp() > now:
+                return latest, missed
+            latest, missed = nxt.timestamp(), missed + 1
+
+    def run_pending(self) -> float:
+        """执行所有到期任务，返回建议的下一次检查前的睡眠秒数。"""
+        with self._cond:
+            due, delay = self._pop_due()
+        for job in due:
+            latest, missed = self._latest_due(job, self._wall())
+            late = self._wall() - latest
+            if late > self.catch_up_window:
+                job.skipped += missed + 1
+                self.log(f'定时任务 {job.name} 已错过 {late / 60:.0f} 分钟，超出补跑窗口，跳过')
+            else:
+                if missed or late > self.max_sleep:
+                    self.log(f'定时任务 {job.name} 错过了 {missed + 1} 次（最近一次 {late / 60:.0f} 分钟前），现在补跑一次')
+                    job.skipped += missed
+                job.runs += 1
+                try:
+                    job.callback()
+                except Exception as e:
+                    self.log(f'定时任务 {job.name} 出错: {e}')
+            with self._cond:
+                if self._jobs.get(job.name) is job:
+                    # 从现在起算下一次：错过的多次触发不会堆积
+                    self._plan(job, max(self._wall(), latest))
+                delay = 0.0
+        return delay
+
+    # --- 后台线程 ---
+
+    def start(self) -> None:
+        """在后台线程中运行调度循环（重复调用无副作用）。"""
+        if self._thread is None:
+            self._stopped = False
+            self._thread = threading.Thread(target=self.run, name='scheduler', daemon=True)
+            self._thread.start()
+
+    def run(self) -> None:
+        """在当前线程中运行调度循环，直到 stop() 被调用。"""
+        while True:
+            delay = self.run_pending()
+            with self._cond:
+                if self._stopped:
+                    return
+                if delay > 0:
+                    self._cond.wait(delay)
+                if self._stopped:
+                    return
+
+    def stop(self) -> None:
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        self._thread = None
+
+
+# --- 系统计划任务与导出 ---
+
+def headless_argv(*extra: str, windowless: bool = False) -> List[str]:
+    """以当前解释器（或打包后的可执行文件）运行本程序的参数列表。
+
+    windowless=True 时在 Windows 上优先使用 pythonw.exe，避免弹出控制台窗口。
+    """
+    if getattr(sys, 'frozen', False):
+        return [sys.executable, *extra]
+    interpreter = sys.executable
+    if windowless and os.path.basename(interpreter).lower() == 'python.exe':
+        candidate = os.path.join(os.path.dirname(interpreter), 'pythonw.exe')
+        if os.path.exists(candidate):
+            interpreter = candidate
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'CSU_WIFI_Login.py')
+    return [interpreter, script, *extra]
+
+
+def schtasks_create_argv(schedule: Schedule, command: List[str], task_name: str = TASK_NAME) -> List[str]:
+    """创建/更新 Windows 计划任务的 schtasks 参数列表（不经过 shell）。"""
+    # 主窗口启动时会导入本模块，subprocess 等只在用到时导入
+    import subprocess
+
+    argv = ['schtasks', '/create', '/tn', task_name, '/tr', subprocess.list2cmdline(command),
+            '/st', f'{schedule.hour:02d}:{schedule.minute:02d}', '/f']
+    if schedule.kind == SCHEDULE_WEEKLY:
+        argv += ['/sc', 'WEEKLY', '/d', ','.join(schedule.weekdays)]
+    elif schedule.kind == SCHEDULE_EVERY_N_DAYS:
+        argv += ['/sc', 'DAILY', '/mo', str(schedule.days_interval)]
+    else:
+        argv += ['/sc', 'DAILY']
+    return argv
+
+
+def schtasks_delete_argv(task_name: str = TASK_NAME) -> List[str]:
+    return ['schtasks', '/delete', '/tn', task_name, '/f']
+
+
+def _export_command(schedule: Schedule) -> List[str]:
+    # 每隔几天无法用 OnCalendar/cron 表达：每天触发，由 --run-if-due 判断当天是否执行
+    if schedule.kind == SCHEDULE_EVERY_N_DAYS:
+        return headless_argv('--scheduler', '--run-if-due')
+    return headless_argv('--auto-login')
+
+
+def _systemd_quote(arg: str) -> str:
+    arg = arg.replace('%', '%%')
+    if arg and not any(ch in arg for ch in ' \t"\'\\;'):
+        return arg
+    return '"' + arg.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def systemd_units(schedule: Schedule) -> Dict[str, str]:
+    """返回 {文件名: 内容}：一个 oneshot 服务和一个触发它的定时器（错过的运行开机后补跑）。"""
+    days = ''
+    if schedule.kind == SCHEDULE_WEEKLY:
+        days = ','.join(code.capitalize() for code in schedule.weekdays) + ' '
+    service = (
+        '[Unit]\n'
+        'Description=CSU WIFI AutoLogin scheduled login\n'
+        'Wants=network-online.target\n'
+        'After=network-online.target\n'
+        '\n'
+        '[Service]\n'
+        'Type=oneshot\n'
+        f'ExecStart={" ".join(_systemd_quote(arg) for arg in _export_command(schedule))}\n'
+    )
+    timer = (
+        '[Unit]\n'
+        f'Description=CSU WIFI AutoLogin ({schedule.describe()})\n'
+        '\n'
+        '[Timer]\n'
+        f'OnCalendar={days}*-*-* {schedule.hour:02d}:{schedule.minute:02d}:00\n'
+        'Persistent=true\n'
+        '\n'
+        '[Install]\n'
+        'WantedBy=timers.target\n'
+    )
+    return {f'{UNIT_NAME}.service': service, f'{UNIT_NAME}.timer': timer}
+
+
+def cron_line(schedule: Schedule) -> str:
+    """返回一行 crontab 条目（以 CRON_MARKER 结尾，便于替换）。"""
+    import shlex
+
+    days = '*'
+    if schedule.kind == SCHEDULE_WEEKLY:
+        # cron 中 0 为星期日
+        days = ','.join(str((WEEKDAY_CODES.index(code) + 1) % 7) for code in schedule.weekdays)
+    command = shlex.join(_export_command(schedule)).replace('%', '\\%')
+    return f'{schedule.minute} {schedule.hour} * * {days} {command} {CRON_MARKER}'
+
+
+def install_systemd(schedule: Schedule) -> str:
+    """写入 systemd 用户单元并启用定时器，返回单元所在目录。"""
+    import subprocess
+
+    config_home = os.environ.get('XDG_CONFIG_HOME') or os.path.expanduser('~/.config')
+    unit_dir = os.path.join(config_home, 'systemd', 'user')
+    os.makedirs(unit_dir, exist_ok=True)
+    for filename, content in systemd_units(schedule).items():
+        with open(os.path.join(unit_dir, filename), 'w', encoding='utf-8') as f:
+            f.write(content)
+    subprocess.run(['systemctl', '--user', 'daemon-reload'], check=True)
+    subprocess.run(['systemctl', '--user', 'enable', '--now', f'{UNIT_NAME}.timer'], check=True)
+    return unit_dir
+
+
+def install_cron(schedule: Schedule) -> None:
+    """替换当前用户 crontab 中本程序的条目。"""
+    import subprocess
+
+    current = subprocess.run(['crontab', '-l'], capture_output=True, text=True)
+    lines = [line for line in (current.stdout.splitlines() if current.returncode == 0 else [])
+             if not line.endswith(CRON_MARKER)]
+    lines.append(cron_line(schedule))
+    subprocess.run(['crontab', '-'], input='\n'.join(lines) + '\n', text=True, check=True)
+
+
+# --- 命令行入口 ---
+
+def _timestamped(message: str) -> None:
+    print(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] {message}", flush=True)
+
+
+def _scheduled_login() -> bool:
+    import headless
+
+    # 每次执行时重新读取账号和密码，常驻期间修改过的配置也能生效
+    username, password, net_type = headless.load_login_config()
+    return headless.run_auto_login_sequence(username, password, net_type, log=_timestamped)
+
+
+def main(argv=None) -> int:
+    """--scheduler 入口。"""
+    import argparse
+    import signal
+
+    parser = argparse.ArgumentParser(prog='CSU_WIFI_Login.py --scheduler', description='进程内定时登录')
+    parser.add_argument('--run-if-due', action='store_true', help='今天在计划内则立即登录一次，否则直接退出')
+    parser.add_argument('--export', choices=('systemd', 'cron'), help='输出 systemd 用户定时器或 crontab 条目')
+    parser.add_argument('--install', action='store_true', help='与 --export 一起使用：直接安装')
+    args, _ = parser.parse_known_args(argv)
+
+    settings = settings_store.read_settings()
+    schedule = Schedule.from_settings(settings)
+    if schedule is None:
+        _timestamped('未启用定时登录（请先在程序中设置并应用定时任务）')
+        return 1
+
+    if args.run_if_due:
+        if not schedule.runs_on(datetime.date.today()):
+            return 0
+        return 0 if _scheduled_login() else 1
+
+    if args.export == 'systemd':
+        if args.install:
+            print(f'已安装并启用 {UNIT_NAME}.timer（{install_systemd(schedule)}）')
+        else:
+            for filename, content in systemd_units(schedule).items():
+                print(f'# {filename}\n{content}')
+        return 0
+    if args.export == 'cron':
+        if args.install:
+            install_cron(schedule)
+            print('已更新 crontab')
+        else:
+            print(cron_line(schedule))
+        return 0
+
+    if sys.platform == 'win32' and settings.get('schedule/backend', DEFAULT_BACKEND) == BACKEND_SCHTASKS:
+        # 计划任务会在同一时间登录，再在进程内调度就会登录两次
+        _timestamped('定时登录由 Windows 计划任务执行，无需 --scheduler（可在程序中改为程序内定时）')
+        return 1
+
+    import history
+    import instance
+    import portal_ops
+    import status_broadcast
+    from portal_client import get_client
+
+    scheduler = Scheduler(log=_timestamped)
+    scheduler.add('login', schedule, _scheduled_login)
+    # 注册为常驻实例：之后的 --auto-login/--status/--logout 转交给本进程处理
+    server = instance.InstanceServer(instance.headless_handler(log=_timestamped))
+    if not server.start():
+        _timestamped('已有其他实例在运行，命令转交不可用')
+    # 有订阅者时定期查询状态并推送
+    publisher = status_broadcast.start()
+    if publisher is None:
+        _timestamped('已有其他实例在发布认证状态')
+    else:
+        publisher.poll_while_subscribed(lambda: portal_ops.cached_check_status(get_client()))
+    history.start()
+    next_run = datetime.datetime.fromtimestamp(scheduler.next_run('login') or 0)
+    _timestamped(f'定时登录已启动（{schedule.describe()}），下一次: {next_run:%Y-%m-%d %H:%M}')
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: scheduler.stop())
+    try:
+        scheduler.run()
+    finally:
+        history.stop()
+        status_broadcast.stop()
+        server.stop()
+    _timestamped('定时登录已停止')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
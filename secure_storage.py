@@ -5,6 +5,23 @@ Simple API:
 - set_password(username: str, password: str) -> None
 - get_password(username: str) -> str | None
 - delete_password(username: str) -> None
+- invalidate_cache(username: str | None = None) -> None
+
+Lookups are cached in process memory; set_password/delete_password update the cache,
+and invalidate_cache() forces the next lookup to hit the backend again. Keyring lookups
+run with a timeout (KEYRING_TIMEOUT seconds) so a missing or hung Secret Service on Linux
+cannot stall startup; a timed-out or failed lookup returns None and is not cached. While a
+timed-out lookup is still hung, further lookups fail immediately instead of waiting again.
+
+Backends (setting security/credential_backend, or env CSU_WIFI_CREDENTIAL_BACKEND):
+- "keyring" (default): the system credential store.
+- "file": a Fernet-encrypted file (credentials.bin under settings_store.data_dir()) for
+  headless/daemon runs without a usable keyring. Requires the optional `cryptography`
+  package. The key comes from env CSU_WIFI_CREDENTIAL_KEY (a Fernet key or any passphrase),
+  otherwise from credentials.key next to the data file, created with 0600 permissions.
+  Without `cryptography` the keyring backend is used instead. If the file cannot be decrypted
+  (key lost or changed), reads fail and writes raise CredentialFileError instead of
+  replacing the file, so the other stored credentials are not destroyed.
 
 Notes for PyInstaller packaging (no code changes required):
 - PyInstaller usually detects keyring backends, but if you see runtime backend import errors,
@@ -14,40 +31,270 @@ Notes for PyInstaller packaging (no code changes required):
 """
 from __future__ import annotations
 
-from typing import Optional
-import keyring  # type: ignore
-from keyring.errors import PasswordDeleteError
+import base64
+import hashlib
+import json
+import os
+import threading
+from typing import Dict, List, Optional
+
+import settings_store
 
 SERVICE_NAME = "CSU_WIFI_AutoLogin"
 
+# Give up on a keyring lookup after this many seconds
+KEYRING_TIMEOUT = 2.0
+
+BACKEND_KEYRING = "keyring"
+BACKEND_FILE = "file"
+BACKEND_ENV = "CSU_WIFI_CREDENTIAL_BACKEND"
+KEY_ENV = "CSU_WIFI_CREDENTIAL_KEY"
+DATA_FILENAME = "credentials.bin"
+KEY_FILENAME = "credentials.key"
+
+
+class CredentialFileError(Exception):
+    """The encrypted credential file exists but cannot be decrypted with the current key."""
+
+
+class KeyringBackend:
+    """System credential store, with a bounded wait on reads."""
+
+    name = BACKEND_KEYRING
+
+    def __init__(self, timeout: float = KEYRING_TIMEOUT):
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        # A lookup that timed out and is still running; while set the keyring counts as unusable
+        self._hung: Optional[threading.Thread] = None
+
+    def get(self, username: str) -> Optional[str]:
+        """Return the password, None if not found.
+
+        Raise TimeoutError if the keyring hangs, or the backend's own error if the lookup
+        fails, so that get_password() does not cache a transient failure as "not found".
+        After a timeout, lookups raise TimeoutError at once until the hung one finishes, so
+        callers neither block again nor pile up lookup threads.
+        """
+        with self._lock:
+            if self._hung is not None and self._hung.is_alive():
+                raise TimeoutError("keyring is not responding")
+            self._hung = None
+        result: Dict[str, Optional[str]] = {}
+        errors: List[Exception] = []
+
+        def lookup() -> None:
+            try:
+                # keyring and its backends take tens of ms to import; load on first lookup
+                import keyring  # type: ignore
+                result['password'] = keyring.get_password(SERVICE_NAME, username)
+            except Exception as e:
+                errors.append(e)
+
+        # Daemon thread: a hung backend must not keep the process alive at exit
+        worker = threading.Thread(target=lookup, name='keyring-lookup', daemon=True)
+        worker.start()
+        worker.join(self.timeout)
+        if errors:
+            raise errors[0]
+        if 'password' not in result:
+            with self._lock:
+                self._hung = worker
+            raise TimeoutError(f"keyring lookup timed out after {self.timeout}s")
+        return result['password']
+
+    def set(self, username: str, password: str) -> None:
+        import keyring  # type: ignore
+        keyring.set_password(SERVICE_NAME, username, password)
+
+    def delete(self, username: str) -> None:
+        import keyring  # type: ignore
+        from keyring.errors import PasswordDeleteError
+
+        try:
+            keyring.delete_password(SERVICE_NAME, username)
+        except PasswordDeleteError:
+            # Not found; safely ignore
+            return
+        except Exception:
+            # Ignore other backend-specific issues silently
+            return
+
+
+class EncryptedFileBackend:
+    """All credentials in one Fernet-encrypted JSON file."""
+
+    name = BACKEND_FILE
+
+    def __init__(self, path: str, key: Optional[bytes] = None):
+        from cryptography.fernet import Fernet  # optional dependency
+
+        self.path = path
+        self._fernet = Fernet(key or self._load_key())
+        self._lock = threading.Lock()
+
+    def _load_key(self) -> bytes:
+        secret = os.environ.get(KEY_ENV)
+        if secret:
+            raw = secret.encode('utf-8')
+            try:
+                if len(base64.urlsafe_b64decode(raw)) == 32:
+                    return raw
+            except ValueError:
+                pass
+            # Any other value is treated as a passphrase
+            salt = SERVICE_NAME.encode('utf-8')
+            return base64.urlsafe_b64encode(hashlib.pbkdf2_hmac('sha256', raw, salt, 200_000))
+
+        key_path = os.path.join(os.path.dirname(self.path), KEY_FILENAME)
+        try:
+            with open(key_path, 'rb') as f:
+                return f.read().strip()
+        except FileNotFoundError:
+            pass
+        from cryptography.fernet import Fernet
+
+        key = Fernet.generate_key()
+        os.makedirs(os.path.dirname(key_path) or '.', exist_ok=True)
+        fd = os.open(key_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(key)
+        return key
+
+    def _read(self) -> Dict[str, str]:
+        try:
+            with open(self.path, 'rb') as f:
+                token = f.read()
+        except FileNotFoundError:
+            return {}
+        from cryptography.fernet import InvalidToken
+
+        try:
+            data = json.loads(self._fernet.decrypt(token))
+        except (InvalidToken, ValueError):
+            raise CredentialFileError(f"cannot decrypt {self.path}; was the key changed?") from None
+        if not isinstance(data, dict):
+            raise CredentialFileError(f"unexpected content in {self.path}")
+        return data
+
+    def _write(self, data: Dict[str, str]) -> None:
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(self._fernet.encrypt(json.dumps(data).encode('utf-8')))
+        os.replace(tmp_path, self.path)
+
+    def get(self, username: str) -> Optional[str]:
+        with self._lock:
+            return self._read().get(username)
+
+    def set(self, username: str, password: str) -> None:
+        # _read() raises CredentialFileError for an undecryptable file, which is then left untouched
+        with self._lock:
+            data = self._read()
+            data[username] = password
+            self._write(data)
+
+    def delete(self, username: str) -> None:
+        with self._lock:
+            data = self._read()
+            if data.pop(username, None) is not None:
+                self._write(data)
+
+
+_backend = None
+_cache: Dict[str, Optional[str]] = {}
+_generation = 0  # bumped on every write so an in-flight lookup cannot cache a stale value
+_lock = threading.Lock()
+
+
+def _create_backend():
+    choice = os.environ.get(BACKEND_ENV)
+    if not choice:
+        choice = str(settings_store.read_settings().get('security/credential_backend', '') or '')
+    if choice.strip().lower() == BACKEND_FILE:
+        try:
+            return EncryptedFileBackend(os.path.join(settings_store.data_dir(), DATA_FILENAME))
+        except (ImportError, OSError, ValueError):
+            # cryptography missing or the key is unusable: fall back to keyring
+            pass
+    return KeyringBackend()
+
+
+def get_backend():
+    """Return the active backend, chosen once per process."""
+    global _backend
+    with _lock:
+        if _backend is None:
+            _backend = _create_backend()
+        return _backend
+
+
+def set_backend(backend) -> None:
+    """Replace the active backend (and drop the cache)."""
+    global _backend, _generation
+    with _lock:
+        _backend = backend
+        _cache.clear()
+        _generation += 1
+
+
+def invalidate_cache(username: Optional[str] = None) -> None:
+    """Forget cached passwords (one user, or all when username is None)."""
+    global _generation
+    with _lock:
+        _generation += 1
+        if username is None:
+            _cache.clear()
+        else:
+            _cache.pop(username, None)
+
 
 def set_password(username: str, password: str) -> None:
     """Store password for the given username in the system credential store."""
     if not username:
         raise ValueError("username must not be empty")
-    keyring.set_password(SERVICE_NAME, username, password)
+    global _generation
+    get_backend().set(username, password)
+    with _lock:
+        _cache[username] = password
+        _generation += 1
 
 
 def get_password(username: str) -> Optional[str]:
     """Retrieve stored password for username, or None if not found."""
     if not username:
         return None
+    with _lock:
+        if username in _cache:
+            return _cache[username]
+        generation = _generation
     try:
-        return keyring.get_password(SERVICE_NAME, username)
+        password = get_backend().get(username)
     except Exception:
+        # Timed out or backend error: report "not found" but allow a retry later
         return None
+    with _lock:
+        if generation == _generation:
+            _cache[username] = password
+    return password
 
 
 def delete_password(username: str) -> None:
     """Delete stored password for username. No-op if not found."""
+    global _generation
     if not username:
         return
     try:
-        keyring.delete_password(SERVICE_NAME, username)
-    except PasswordDeleteError:
-        # Not found; safely ignore
-        return
+        get_backend().delete(username)
+        deleted = True
     except Exception:
-        # Ignore other backend-specific issues silently
-        return
-
+        # Ignore backend-specific issues silently
+        deleted = False
+    with _lock:
+        if deleted:
+            _cache[username] = None
+        else:
+            _cache.pop(username, None)
+        _generation += 1
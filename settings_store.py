@@ -0,0 +1,151 @@
+"""
+不依赖 Qt 的配置读取模块。
+
+直接读取 QSettings(ORG_NAME, APP_NAME) 在各平台上的原生存储位置，
+供无界面模式等不需要加载 PyQt6 的场景使用：
+- Windows: 注册表 HKEY_CURRENT_USER\\Software\\CSU\\WifiAutoLogin
+- macOS: ~/Library/Preferences/com.csu.WifiAutoLogin.plist
+- 其他平台: ~/.config/CSU/WifiAutoLogin.conf（INI 格式）
+"""
+
+import configparser
+import os
+import sys
+from typing import Any, Dict
+
+# QSettings organization/application identifiers
+ORG_NAME = "CSU"
+APP_NAME = "WifiAutoLogin"
+
+
+def _read_windows_registry() -> Dict[str, Any]:
+    import winreg
+
+    values: Dict[str, Any] = {}
+    root_path = f'Software\\{ORG_NAME}\\{APP_NAME}'
+
+    def walk(path: str, prefix: str) -> None:
+        try:
+            key = winreg.OpenKey(winreg.HKEY_CURRENT_USER, path)
+        except OSError:
+            return
+        with key:
+            index = 0
+            while True:
+                try:
+                    name, value, _ = winreg.EnumValue(key, index)
+                except OSError:
+                    break
+                values[prefix + name] = value
+                index += 1
+            index = 0
+            subkeys = []
+            while True:
+                try:
+                    subkeys.append(winreg.EnumKey(key, index))
+                except OSError:
+                    break
+                index += 1
+        for subkey in subkeys:
+            walk(f'{path}\\{subkey}', f'{prefix}{subkey}/')
+
+    walk(root_path, '')
+    return values
+
+
+def _read_macos_plist() -> Dict[str, Any]:
+    import plistlib
+
+    domain = f'com.{ORG_NAME.lower()}.{APP_NAME}'
+    path = os.path.expanduser(f'~/Library/Preferences/{domain}.plist')
+    try:
+        with open(path, 'rb') as f:
+            data = plistlib.load(f)
+    except (OSError, plistlib.InvalidFileException):
+        return {}
+    # QSettings 在 plist 中以 "group.key" 形式保存
+    return {key.replace('.', '/'): value for key, value in data.items()}
+
+
+_INI_ESCAPES = {'a': '\a', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t', 'v': '\v',
+                '0': '\0', '"': '"', "'": "'", '\\': '\\', '?': '?', ';': ';', ',': ',', '=': '='}
+
+
+def _unescape_ini_value(value: str) -> str:
+    """还原 QSettings 在 INI 文件中对字符串值所做的引号与反斜杠转义。"""
+    result = []
+    i = 0
+    value = value.strip()
+    while i < len(value):
+        ch = value[i]
+        if ch == '"':
+            i += 1
+            continue
+        if ch == '\\' and i + 1 < len(value):
+            nxt = value[i + 1]
+            if nxt == 'x':
+                j = i + 2
+                while j < len(value) and j < i + 6 and value[j] in '0123456789abcdefABCDEF':
+                    j += 1
+                if j > i + 2:
+                    result.append(chr(int(value[i + 2:j], 16)))
+                    i = j
+                    continue
+            result.append(_INI_ESCAPES.get(nxt, nxt))
+            i += 2
+            continue
+        result.append(ch)
+        i += 1
+    return ''.join(result)
+
+
+def _read_ini() -> Dict[str, Any]:
+    config_home = os.environ.get('XDG_CONFIG_HOME') or os.path.expanduser('~/.config')
+    path = os.path.join(config_home, ORG_NAME, f'{APP_NAME}.conf')
+    parser = configparser.RawConfigParser(interpolation=None)
+    parser.optionxform = str  # 保留键名大小写
+    try:
+        parser.read(path, encoding='utf-8')
+    except (configparser.Error, UnicodeDecodeError):
+        return {}
+    values: Dict[str, Any] = {}
+    for section in parser.sections():
+        prefix = '' if section == 'General' else f'{section}/'
+        for key, value in parser.items(section):
+            values[prefix + key] = _unescape_ini_value(value)
+    return values
+
+
+def read_settings() -> Dict[str, Any]:
+    """读取全部配置，返回以 "group/key" 为键的字典；读取失败时返回空字典。"""
+    try:
+        if sys.platform == 'win32':
+            return _read_windows_registry()
+        if sys.platform == 'darwin':
+            return _read_macos_plist()
+        return _read_ini()
+    except Exception:
+        return {}
+
+
+def data_dir() -> str:
+    """返回本应用存放缓存等数据文件的目录（不保证已存在）。"""
+    if sys.platform == 'win32':
+        base = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~\\AppData\\Local')
+    elif sys.platform == 'darwin':
+        base = os.path.expanduser('~/Library/Application Support')
+    else:
+        base = os.environ.get('XDG_DATA_HOME') or os.path.expanduser('~/.local/share')
+    return os.path.join(base, ORG_NAME, APP_NAME)
+
+
+def to_bool(value: Any, default: bool = False) -> bool:
+    """将 QSettings 保存的布尔值（"true"/"false"、1/0 等）转换为 bool。"""
+    if value is None:
+        return default
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, int):
+        return value != 0
+    return str(value).strip().lower() in ('true', '1', 'yes')
+
@@ -0,0 +1,148 @@
+"""
+状态快照模块。
+
+每次状态查询或设备查询成功后，把最近一次的认证状态（uid、IP、MAC）和在线设备列表
+保存到一个很小的 JSON 文件（settings_store.data_dir()/snapshot.json）。
+下次启动时窗口先用快照立即绘制（标记为过期），再在后台重新查询。本模块不依赖 Qt。
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import settings_store
+from protocol import DeviceRecord, PortalStatus
+
+SNAPSHOT_FILENAME = 'snapshot.json'
+SNAPSHOT_VERSION = 1
+
+# 内容不变时刷新快照时间戳的最短间隔（秒）
+REWRITE_INTERVAL = 300
+
+
+class Snapshot:
+    """上次保存的状态与设备列表。"""
+
+    __slots__ = ('username', 'status', 'status_at', 'devices', 'devices_at')
+
+    def __init__(self, username: str = '', status: Optional[PortalStatus] = None, status_at: float = 0.0,
+                 devices: Optional[List[DeviceRecord]] = None, devices_at: float = 0.0):
+        self.username = username
+        self.status = status
+        self.status_at = status_at
+        self.devices = devices
+        self.devices_at = devices_at
+
+    @property
+    def saved_at(self) -> float:
+        """最近一次保存的时间戳（秒）。"""
+        return max(self.status_at, self.devices_at)
+
+    def content_key(self) -> tuple:
+        """不含时间戳的内容，用于判断是否需要写盘。"""
+        status = self.status
+        return (self.username,
+                None if status is None else (status.online, status.uid, status.v4ip, status.olmac),
+                None if self.devices is None else tuple(
+                    (device.ip, device.mac, device.online_time, device.phone_flag) for device in self.devices))
+
+    def to_dict(self) -> Dict[str, Any]:
+        data: Dict[str, Any] = {'version': SNAPSHOT_VERSION, 'username': self.username}
+        if self.status is not None:
+            data['status'] = {'online': self.status.online, 'uid': self.status.uid,
+                              'v4ip': self.status.v4ip, 'olmac': self.status.olmac, 'at': self.status_at}
+        if self.devices is not None:
+            data['devices'] = {'at': self.devices_at, 'items': [
+                [device.ip, device.mac, device.online_time, device.phone_flag] for device in self.devices]}
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Snapshot':
+        snapshot = cls(str(data.get('username') or ''))
+        status = data.get('status')
+        if isinstance(status, dict):
+            snapshot.status = PortalStatus(bool(status.get('online')), str(status.get('uid') or ''),
+                                           str(status.get('v4ip') or ''), str(status.get('olmac') or ''))
+            snapshot.status_at = float(status.get('at') or 0)
+        devices = data.get('devices')
+        if isinstance(devices, dict):
+            snapshot.devices = [DeviceRecord(*(str(field) for field in item))
+                                for item in devices.get('items') or [] if len(item) == 4]
+            snapshot.devices_at = float(devices.get('at') or 0)
+        return snapshot
+
+
+class SnapshotStore:
+    """快照文件的读写（线程安全）。
+
+    内容没有变化时不写盘，只在距上次写入超过 REWRITE_INTERVAL 秒时刷新时间戳。
+    """
+
+    def __init__(self, path: Optional[str] = None, clock=time.time):
+        self.path = path or os.path.join(settings_store.data_dir(), SNAPSHOT_FILENAME)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._snapshot: Optional[Snapshot] = None
+        self._written_key: Optional[tuple] = None
+        self._written_at = 0.0
+
+    def _load_locked(self) -> Optional[Snapshot]:
+        if self._snapshot is None:
+            try:
+                with open(self.path, encoding='utf-8') as f:
+                    data = json.load(f)
+                if not isinstance(data, dict) or data.get('version') != SNAPSHOT_VERSION:
+                    return None
+                self._snapshot = Snapshot.from_dict(data)
+            except (OSError, ValueError, TypeError):
+                return None
+            self._written_key = self._snapshot.content_key()
+            self._written_at = self._snapshot.saved_at
+        return self._snapshot
+
+    def load(self, username: str = '') -> Optional[Snapshot]:
+        """读取快照；文件不存在、损坏或不属于 username 时返回 None。"""
+        with self._lock:
+            snapshot = self._load_locked()
+        if snapshot is None or (username and snapshot.username and snapshot.username != username):
+            return None
+        return snapshot
+
+    def _update(self, username: str) -> Snapshot:
+        snapshot = self._load_locked()
+        if snapshot is None or snapshot.username != username:
+            snapshot = self._snapshot = Snapshot(username)
+        return snapshot
+
+    def save_status(self, username: str, status: PortalStatus) -> None:
+        """保存一次成功的状态查询结果（门户不可达的结果不保存）。"""
+        if not status.reachable:
+            return
+        with self._lock:
+            snapshot = self._update(username)
+            snapshot.status, snapshot.status_at = status, self._clock()
+            self._write(snapshot)
+
+    def save_devices(self, username: str, devices: List[DeviceRecord]) -> None:
+        """保存一次成功的设备查询结果。"""
+        with self._lock:
+            snapshot = self._update(username)
+            snapshot.devices, snapshot.devices_at = list(devices), self._clock()
+            self._write(snapshot)
+
+    def _write(self, snapshot: Snapshot) -> None:
+        key = snapshot.content_key()
+        now = self._clock()
+        if key == self._written_key and now - self._written_at < REWRITE_INTERVAL:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp_path = f'{self.path}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(snapshot.to_dict(), f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+            self._written_key, self._written_at = key, now
+        except OSError:
+            pass
@@ -0,0 +1,199 @@
+"""
+启动性能剖析模块。
+
+python CSU_WIFI_Login.py --profile-startup [--profile-json PATH]
+
+在导入任何其他模块之前安装一个 meta path 钩子，记录每个模块的导入耗时
+（含子模块的累计耗时和扣除子模块后的自身耗时，与 python -X importtime 的口径一致），
+并记录启动过程中的里程碑（QApplication 创建、主窗口构造完成、首次绘制）。
+主窗口第一次绘制后输出报告并退出。本模块只依赖标准库，Qt 相关部分在调用时才导入。
+"""
+
+import importlib.abc
+import json
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+# 报告中列出的最慢模块数
+TOP_MODULES = 25
+
+
+class _TimedLoader(importlib.abc.Loader):
+    """包装原加载器，计时 create_module + exec_module。"""
+
+    def __init__(self, profiler: 'StartupProfiler', loader):
+        self._profiler = profiler
+        self._loader = loader
+
+    def create_module(self, spec):
+        # 扩展模块（如 PyQt6.QtWidgets）的加载和初始化发生在 create_module 中，从这里开始计时
+        self._profiler._enter()
+        try:
+            return self._loader.create_module(spec)
+        except BaseException:
+            self._profiler._exit(spec.name)
+            raise
+
+    def exec_module(self, module):
+        try:
+            self._loader.exec_module(module)
+        finally:
+            self._profiler._exit(module.__name__)
+
+    def __getattr__(self, name):
+        # get_resource_reader、get_source 等接口直接转发给原加载器
+        return getattr(self._loader, name)
+
+
+class _TimingFinder(importlib.abc.MetaPathFinder):
+    """位于 sys.meta_path 最前面的查找器：交给其余查找器查找，再包装找到的加载器。"""
+
+    def __init__(self, profiler: 'StartupProfiler'):
+        self._profiler = profiler
+        self._busy = False
+
+    def find_spec(self, fullname, path, target=None):
+        if self._busy:
+            return None
+        self._busy = True
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, 'find_spec'):
+                    continue
+                spec = finder.find_spec(fullname, path, target)
+                if spec is not None:
+                    break
+            else:
+                return None
+        finally:
+            self._busy = False
+        if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+            spec.loader = _TimedLoader(self._profiler, spec.loader)
+        return spec
+
+
+class StartupProfiler:
+    """记录模块导入耗时和启动里程碑。"""
+
+    def __init__(self, clock=time.perf_counter):
+        self._clock = clock
+        self.started = clock()
+        self.imports: Dict[str, Tuple[float, float]] = {}  # 模块 → (累计耗时, 自身耗时)
+        self.milestones: List[Tuple[str, float]] = []
+        # 每个线程各自的导入栈，元素为 [开始时间, 子模块耗时]
+        self._local = threading.local()
+        self._finder = _TimingFinder(self)
+
+    def install(self) -> None:
+        sys.meta_path.insert(0, self._finder)
+
+    def uninstall(self) -> None:
+        if self._finder in sys.meta_path:
+            sys.meta_path.remove(self._finder)
+
+    def _stack(self) -> List[List[float]]:
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _enter(self) -> None:
+        self._stack().append([self._clock(), 0.0])
+
+    def _exit(self, name: str) -> None:
+        stack = self._stack()
+        start, children = stack.pop()
+        cumulative = self._clock() - start
+        self.imports[name] = (cumulative, cumulative - children)
+        if stack:
+            stack[-1][1] += cumulative
+
+    def mark(self, label: str) -> float:
+        """记录一个里程碑，返回距剖析开始的秒数。"""
+        elapsed = self._clock() - self.started
+        self.milestones.append((label, elapsed))
+        return elapsed
+
+    def to_dict(self) -> Dict:
+        return {
+            'unit': 'ms',
+            'milestones': {label: elapsed * 1000 for label, elapsed in self.milestones},
+            'imports': {name: {'cumulative': cumulative * 1000, 'self': own * 1000}
+                        for name, (cumulative, own) in self.imports.items()},
+        }
+
+    def report(self, top: int = TOP_MODULES) -> str:
+        lines = ['里程碑（距启动，ms）']
+        for label, elapsed in self.milestones:
+            lines.append(f'  {label:<24}{elapsed * 1000:>10.1f}')
+        total_self = sum(own for _, own in self.imports.values())
+        lines.append(f'导入模块 {len(self.imports)} 个，自身耗时合计 {total_self * 1000:.1f} ms；'
+                     f'自身耗时最长的 {min(top, len(self.imports))} 个:')
+        lines.append(f'  {"self (ms)":>10}{"cumulative (ms)":>17}  module')
+        ranked = sorted(self.imports.items(), key=lambda item: item[1][1], reverse=True)[:top]
+        for name, (cumulative, own) in ranked:
+            lines.append(f'  {own * 1000:>10.1f}{cumulative * 1000:>17.1f}  {name}')
+        return '\n'.join(lines)
+
+
+_profiler: Optional[StartupProfiler] = None
+
+
+def start() -> StartupProfiler:
+    """开始剖析（应在导入其他模块之前调用）。"""
+    global _profiler
+    _profiler = StartupProfiler()
+    _profiler.install()
+    return _profiler
+
+
+def active() -> Optional[StartupProfiler]:
+    return _profiler
+
+
+def mark(label: str) -> None:
+    """剖析开启时记录里程碑，否则什么都不做。"""
+    if _profiler is not None:
+        _profiler.mark(label)
+
+
+def json_path_from_argv(argv: List[str]) -> Optional[str]:
+    """解析 --profile-json PATH / --profile-json=PATH。"""
+    for index, arg in enumerate(argv):
+        if arg.startswith('--profile-json='):
+            return arg.split('=', 1)[1] or None
+        if arg == '--profile-json' and index + 1 < len(argv):
+            return argv[index + 1]
+    return None
+
+
+def finish_on_first_paint(window, app, argv: List[str]) -> None:
+    """主窗口第一次绘制后记录里程碑、输出报告并退出事件循环。"""
+    from PyQt6.QtCore import QEvent, QObject, QTimer
+
+    profiler = _profiler
+    if profiler is None:
+        return
+
+    class _PaintWatcher(QObject):
+        def eventFilter(self, obj, event):
+            if event.type() == QEvent.Type.Paint and not self.property('done'):
+                self.setProperty('done', True)
+                profiler.mark('first paint')
+                # 绘制事件处理完之后再退出
+                QTimer.singleShot(0, self._finish)
+            return False
+
+        def _finish(self):
+            profiler.uninstall()
+            print(profiler.report(), flush=True)
+            path = json_path_from_argv(argv)
+            if path:
+                with open(path, 'w', encoding='utf-8') as f:
+                    json.dump(profiler.to_dict(), f, ensure_ascii=False, indent=2)
+            app.quit()
+
+    watcher = _PaintWatcher(window)
+    window.installEventFilter(watcher)
@@ -0,0 +1,467 @@
+"""
+认证状态本地广播模块。
+
+常驻实例（主窗口、--watchdog、--scheduler）每次查询到的认证状态发生变化时，
+都带着递增的序号推送给所有本地订阅者。其他需要知道校园网是否在线的程序
+只要订阅，就不必各自轮询 drcom/chkstatus：无论有多少订阅者，门户只被查询一次。
+
+传输为按行分隔的 JSON（NDJSON），每行一条消息：
+    {"seq": 3, "epoch": 1760000000, "time": 1760000123.4, "reachable": true,
+     "online": true, "uid": "...", "v4ip": "...", "olmac": "...", "error": ""}
+- seq 从 1 开始随每次状态变化递增；epoch 为发布者启动时间，发布者重启后 seq 重新计数；
+- 订阅者连接后立即收到当前状态（若已有），之后只在状态变化时收到消息。
+
+常驻实例自身不定期查询状态时（主窗口、--scheduler），用 poll_while_subscribed()
+在有订阅者期间每隔 POLL_INTERVAL 秒查询一次；--watchdog 本身就在持续探测，不需要。
+
+POSIX 上监听仅当前用户可访问的 Unix 套接字；Windows 上监听 127.0.0.1 的临时端口，
+订阅者须先发送一行令牌。地址（和令牌）写在 data_dir() 下的 status_endpoint.json 中，
+由发布者启动时写入、退出时删除。本模块不依赖 Qt。
+"""
+
+import json
+import os
+import socket
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import settings_store
+
+ENDPOINT_FILENAME = 'status_endpoint.json'
+SOCKET_FILENAME = 'csu-wifi-status.sock'
+
+# Windows 上等待订阅者发送令牌的最长时间（秒）；等待在后台线程的 select 中进行
+TOKEN_TIMEOUT = 2.0
+# 最多同时连接的订阅者
+MAX_SUBSCRIBERS = 64
+# 有订阅者时主动查询状态的间隔（秒）；没有订阅者时不查询
+POLL_INTERVAL = 30.0
+
+
+def _endpoint_path() -> str:
+    return os.path.join(settings_store.data_dir(), ENDPOINT_FILENAME)
+
+
+def _socket_path() -> str:
+    # Unix 套接字路径长度有限（约 100 字节），优先放在 XDG_RUNTIME_DIR
+    runtime = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime and os.path.isdir(runtime):
+        return os.path.join(runtime, SOCKET_FILENAME)
+    return os.path.join(settings_store.data_dir(), SOCKET_FILENAME)
+
+
+def read_endpoint() -> Optional[Dict[str, Any]]:
+    """读取发布者的地址信息；没有发布者在运行时返回 None。"""
+    try:
+        with open(_endpoint_path(), 'r', encoding='utf-8') as f:
+            endpoint = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return endpoint if isinstance(endpoint, dict) else None
+
+
+def _write_endpoint(endpoint: Dict[str, Any]) -> None:
+    path = _endpoint_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(endpoint, f)
+    os.replace(tmp_path, path)
+
+
+def _connect(endpoint: Dict[str, Any], timeout: Optional[float] = None) -> socket.socket:
+    """按地址信息连接发布者（Windows 上同时发送令牌），失败时抛出 OSError。"""
+    if endpoint.get('transport') == 'unix':
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        address = endpoint.get('path', '')
+    else:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        address = ('127.0.0.1', int(endpoint.get('port', 0)))
+    sock.settimeout(timeout)
+    try:
+        sock.connect(address)
+        if endpoint.get('token'):
+            sock.sendall(f"{endpoint['token']}\n".encode('ascii'))
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+def status_message(status) -> Dict[str, Any]:
+    """把 PortalStatus 转换为广播消息的状态字段（不含 seq/epoch/time）。"""
+    return {
+        'reachable': status.reachable,
+        'online': status.online,
+        'uid': status.uid,
+        'v4ip': status.v4ip,
+        'olmac': status.olmac,
+        'error': status.error,
+    }
+
+
+class StatusPublisher:
+    """状态发布端：一个后台线程接受订阅者、校验令牌并检测断开，publish() 在调用方线程中推送。
+
+    订阅者套接字为非阻塞：发送缓冲区已满（长时间不读取）的订阅者直接断开，
+    publish() 从不等待任何订阅者。
+    只有 reachable/online/uid/v4ip/olmac 变化时才推送，重复的查询结果不产生消息；
+    error 的措辞变化（超时→连接失败）不算状态变化。
+    """
+
+    def __init__(self):
+        self.epoch = int(time.time())
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._key: Optional[tuple] = None
+        self._message: Optional[bytes] = None
+        self._subscribers: List[socket.socket] = []
+        # 已连接、尚未发送完令牌的连接 → (截止时间, 已收到的数据)；只由后台线程访问
+        self._pending: Dict[socket.socket, Tuple[float, bytes]] = {}
+        self._listener: Optional[socket.socket] = None
+        self._socket_path = ''
+        self._token = ''
+        self._wake_r: Optional[socket.socket] = None
+        self._wake_w: Optional[socket.socket] = None
+        self._thread: Optional[threading.Thread] = None
+        self._fetch: Optional[Callable[[], Any]] = None
+        self._poll_event = threading.Event()
+        self._stopped = False
+
+    @property
+    def seq(self) -> int:
+        return self._seq
+
+    @property
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+    def start(self) -> bool:
+        """开始监听；已有其他发布者在运行时返回 False。"""
+        endpoint = read_endpoint()
+        if endpoint is not None:
+            try:
+                _connect(endpoint, timeout=1.0).close()
+                return False
+            except (OSError, ValueError):
+                # 上次异常退出留下的地址文件
+                pass
+        try:
+            if hasattr(socket, 'AF_UNIX') and sys.platform != 'win32':
+                endpoint = self._listen_unix()
+            else:
+                endpoint = self._listen_tcp()
+            _write_endpoint(endpoint)
+        except OSError:
+            self._close_listener()
+            return False
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._thread = threading.Thread(target=self._serve, name='status-broadcast', daemon=True)
+        self._thread.start()
+        return True
+
+    def poll_while_subscribed(self, fetch: Callable[[], Any], interval: float = POLL_INTERVAL) -> None:
+        """有订阅者期间每隔 interval 秒在后台线程中调用一次 fetch()（其结果经 publish() 推送）。
+
+        新订阅者连接而尚无状态可发、或调用 refresh() 时立即查询一次。
+        """
+        if self._fetch is not None:
+            return
+        self._fetch = fetch
+        threading.Thread(target=self._poll, args=(interval,), name='status-poll', daemon=True).start()
+
+    def refresh(self) -> None:
+        """状态可能已经改变（如刚注销）：有订阅者时尽快重新查询。"""
+        self._poll_event.set()
+
+    def _poll(self, interval: float) -> None:
+        while True:
+            self._poll_event.wait(interval)
+            self._poll_event.clear()
+            if self._stopped:
+                return
+            if self.subscriber_count:
+                try:
+                    self._fetch()
+                except Exception:
+                    # 查询出错不影响下一次
+                    pass
+
+    def _listen_unix(self) -> Dict[str, Any]:
+        path = _socket_path()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._listener = listener
+        # 先收紧 umask 再 bind，套接字文件从创建起就只有当前用户可以连接
+        old_umask = os.umask(0o177)
+        try:
+            listener.bind(path)
+        finally:
+            os.umask(old_umask)
+        listener.listen(16)
+        self._socket_path = path
+        return {'transport': 'unix', 'path': path, 'pid': os.getpid(), 'epoch': self.epoch}
+
+    def _listen_tcp(self) -> Dict[str, Any]:
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._listener = listener
+        listener.bind(('127.0.0.1', 0))
+        listener.listen(16)
+        self._token = os.urandom(16).hex()
+        return {'transport': 'tcp', 'port': listener.getsockname()[1], 'token': self._token,
+                'pid': os.getpid(), 'epoch': self.epoch}
+
+    def _serve(self) -> None:
+        import select
+
+        listener = self._listener
+        while self._listener is listener:
+            with self._lock:
+                watched = [listener, self._wake_r] + self._subscribers
+            watched += list(self._pending)
+            timeout = None
+            if self._pending:
+                timeout = max(0.0, min(deadline for deadline, _ in self._pending.values()) - time.monotonic())
+            try:
+                readable, _, _ = select.select(watched, [], [], timeout)
+            except (OSError, ValueError):
+                # 某个订阅者刚被 publish() 断开，重新取一次列表
+                continue
+            if self._listener is not listener:
+                break
+            for sock in readable:
+                if sock is listener:
+                    self._accept(listener)
+                elif sock is self._wake_r:
+                    try:
+                        sock.recv(64)
+                    except OSError:
+                        pass
+                elif sock in self._pending:
+                    self._read_token(sock)
+                else:
+                    # 订阅者不发送数据：可读即表示已断开
+                    try:
+                        data = sock.recv(1024)
+                    except BlockingIOError:
+                        continue
+                    except OSError:
+                        data = b''
+                    if not data:
+                        self._drop(sock)
+            now = time.monotonic()
+            for sock in [sock for sock, (deadline, _) in self._pending.items() if deadline <= now]:
+                # 迟迟不发送令牌
+                del self._pending[sock]
+                sock.close()
+
+    def _accept(self, listener: socket.socket) -> None:
+        try:
+            conn, _ = listener.accept()
+        except OSError:
+            return
+        conn.setblocking(False)
+        if not self._token:
+            self._admit(conn)
+        elif len(self._pending) >= MAX_SUBSCRIBERS:
+            conn.close()
+        else:
+            # 令牌在后续的 select 循环中读取，不阻塞其他连接
+            self._pending[conn] = (time.monotonic() + TOKEN_TIMEOUT, b'')
+
+    def _read_token(self, conn: socket.socket) -> None:
+        deadline, data = self._pending[conn]
+        try:
+            chunk = conn.recv(256)
+        except BlockingIOError:
+            return
+        except OSError:
+            chunk = b''
+        data += chunk
+        if chunk and b'\n' not in data and len(data) < 256:
+            self._pending[conn] = (deadline, data)
+            return
+        del self._pending[conn]
+        if data.split(b'\n', 1)[0].strip().decode('ascii', 'replace') != self._token:
+            conn.close()
+            return
+        self._admit(conn)
+
+    def _admit(self, conn: socket.socket) -> None:
+        """把（非阻塞的）连接加入订阅者，并立即发送当前状态。"""
+        with self._lock:
+            if len(self._subscribers) >= MAX_SUBSCRIBERS:
+                conn.close()
+                return
+            if self._message is not None:
+                if not self._send(conn, self._message):
+                    conn.close()
+                    return
+            elif self._fetch is not None:
+                self._poll_event.set()
+            self._subscribers.append(conn)
+
+    @staticmethod
+    def _send(sock: socket.socket, message: bytes) -> bool:
+        """非阻塞地发送一整条消息；发送缓冲区放不下（订阅者长时间不读取）或已断开时返回 False。"""
+        try:
+            return sock.send(message) == len(message)
+        except OSError:
+            return False
+
+    def _drop(self, sock: socket.socket) -> None:
+        with self._lock:
+            if sock in self._subscribers:
+                self._subscribers.remove(sock)
+        sock.close()
+
+    def publish(self, status) -> bool:
+        """状态与上次发布的不同时推送给所有订阅者；返回是否推送了新消息。"""
+        fields = status_message(status)
+        key = (fields['reachable'], fields['online'], fields['uid'], fields['v4ip'], fields['olmac'])
+        with self._lock:
+            if key == self._key:
+                return False
+            self._key = key
+            self._seq += 1
+            message = {'seq': self._seq, 'epoch': self.epoch, 'time': round(time.time(), 3)}
+            message.update(fields)
+            self._message = (json.dumps(message, ensure_ascii=False) + '\n').encode('utf-8')
+            # 断开或长时间不读取的订阅者直接断开（只写出半条消息的也一样），不等待
+            dropped = [sock for sock in self._subscribers if not self._send(sock, self._message)]
+            for sock in dropped:
+                self._subscribers.remove(sock)
+                sock.close()
+        if dropped:
+            self._wake()
+        return True
+
+    def _wake(self) -> None:
+        if self._wake_w is not None:
+            try:
+                self._wake_w.send(b'\0')
+            except OSError:
+                pass
+
+    def _close_listener(self) -> None:
+        listener, self._listener = self._listener, None
+        if listener is not None:
+            listener.close()
+        if self._socket_path:
+            try:
+                os.unlink(self._socket_path)
+            except OSError:
+                pass
+
+    def stop(self) -> None:
+        """停止监听，断开所有订阅者并删除地址文件。"""
+        if self._listener is None:
+            return
+        self._stopped = True
+        self._poll_event.set()
+        endpoint = read_endpoint()
+        if endpoint is not None and endpoint.get('pid') == os.getpid():
+            try:
+                os.unlink(_endpoint_path())
+            except OSError:
+                pass
+        self._close_listener()
+        self._wake()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+        with self._lock:
+            subscribers, self._subscribers = self._subscribers, []
+        pending, self._pending = list(self._pending), {}
+        for sock in subscribers + pending + [self._wake_r, self._wake_w]:
+            if sock is not None:
+                sock.close()
+
+
+_publisher: Optional[StatusPublisher] = None
+_publisher_lock = threading.Lock()
+
+
+def start() -> Optional[StatusPublisher]:
+    """在本进程中启动发布者；已有其他进程在发布时返回 None。"""
+    global _publisher
+    with _publisher_lock:
+        if _publisher is None:
+            publisher = StatusPublisher()
+            if not publisher.start():
+                return None
+            _publisher = publisher
+        return _publisher
+
+
+def stop() -> None:
+    global _publisher
+    with _publisher_lock:
+        publisher, _publisher = _publisher, None
+    if publisher is not None:
+        publisher.stop()
+
+
+def publish(status) -> None:
+    """发布一次状态查询结果；本进程未启动发布者时什么也不做。"""
+    publisher = _publisher
+    if publisher is not None:
+        publisher.publish(status)
+
+
+def refresh() -> None:
+    """请求本进程的发布者尽快重新查询状态；未启动发布者时什么也不做。"""
+    publisher = _publisher
+    if publisher is not None:
+        publisher.refresh()
+
+
+def subscriber_count() -> int:
+    """当前连接的订阅者数量；本进程未启动发布者时为 0。"""
+    publisher = _publisher
+    return publisher.subscriber_count if publisher is not None else 0
+
+
+def subscribe(timeout: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+    """连接发布者并逐条产出状态消息；没有发布者时抛出 OSError，发布者退出时迭代结束。"""
+    endpoint = read_endpoint()
+    if endpoint is None:
+        raise FileNotFoundError('没有正在运行的实例发布认证状态')
+    sock = _connect(endpoint, timeout=timeout)
+    try:
+        sock.settimeout(None)
+        with sock.makefile('rb') as stream:
+            for line in stream:
+                try:
+                    message = json.loads(line.decode('utf-8'))
+                except ValueError:
+                    continue
+                if isinstance(message, dict):
+                    yield message
+    finally:
+        sock.close()
+
+
+def main(argv=None) -> int:
+    """--subscribe 入口：把收到的每条状态消息输出为一行 JSON，直到发布者退出。"""
+    try:
+        for message in subscribe(timeout=2.0):
+            print(json.dumps(message, ensure_ascii=False), flush=True)
+    except KeyboardInterrupt:
+        return 0
+    except OSError as e:
+        print(f'无法订阅认证状态: {e}', file=sys.stderr)
+        return 1
+    print('发布认证状态的实例已退出', file=sys.stderr)
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,98 @@
+"""
+认证状态缓存模块。
+
+为 chkstatus 查询提供带 TTL 的缓存，采用 stale-while-revalidate 策略：
+- 缓存年龄小于 revalidate_after：直接返回缓存值；
+- 介于 revalidate_after 与 ttl 之间：返回缓存值，同时在后台刷新；
+- 超过 ttl 或没有缓存：同步查询（并发的同步查询合并为一次）。
+登录、注销、解绑会使缓存失效。本模块不依赖 Qt。
+"""
+
+import threading
+import time
+from typing import Any, Callable, Optional
+
+# 默认缓存时间（秒）
+STATUS_TTL = 3.0
+
+
+class StatusCache:
+    """线程安全的单值 TTL 缓存。"""
+
+    def __init__(self, ttl: float = STATUS_TTL, revalidate_after: Optional[float] = None,
+                 cacheable: Callable[[Any], bool] = lambda value: True,
+                 clock=time.monotonic):
+        self.ttl = ttl
+        self._revalidate_after = revalidate_after
+        self._cacheable = cacheable
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._fetch_lock = threading.Lock()
+        self._value: Any = None
+        self._stored_at: Optional[float] = None
+        self._generation = 0
+        self._refreshing = False
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def revalidate_after(self) -> float:
+        if self._revalidate_after is None:
+            return self.ttl / 2
+        return min(self._revalidate_after, self.ttl)
+
+    def get(self, fetch: Callable[[], Any]) -> Any:
+        """返回缓存值，必要时调用 fetch() 获取新值。"""
+        with self._lock:
+            age = None if self._stored_at is None else self._clock() - self._stored_at
+            hit = age is not None and age < self.ttl
+            refresh = hit and age >= self.revalidate_after and not self._refreshing
+            if hit:
+                self.hits += 1
+                value = self._value
+            if refresh:
+                self._refreshing = True
+                generation = self._generation
+        if not hit:
+            return self._fetch(fetch)
+        if refresh:
+            threading.Thread(target=self._background_refresh, args=(fetch, generation),
+                             name='status-cache-refresh', daemon=True).start()
+        return value
+
+    def _fetch(self, fetch: Callable[[], Any]) -> Any:
+        with self._fetch_lock:
+            # 等待期间其他线程可能已经取得新值
+            with self._lock:
+                if self._stored_at is not None and self._clock() - self._stored_at < self.ttl:
+                    self.hits += 1
+                    return self._value
+                self.misses += 1
+                generation = self._generation
+            value = fetch()
+            self._store(value, generation)
+            return value
+
+    def _background_refresh(self, fetch: Callable[[], Any], generation: int) -> None:
+        try:
+            self._store(fetch(), generation)
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def _store(self, value: Any, generation: int) -> None:
+        if not self._cacheable(value):
+            return
+        with self._lock:
+            # 查询期间缓存被置为失效，则丢弃这个可能过时的结果
+            if generation != self._generation:
+                return
+            self._value = value
+            self._stored_at = self._clock()
+
+    def invalidate(self) -> None:
+        """使缓存失效。"""
+        with self._lock:
+            self._generation += 1
+            self._value = None
+            self._stored_at = None
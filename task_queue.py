@@ -0,0 +1,124 @@
+"""
+网络任务队列模块。
+
+在 NetworkWorker 前面排队待执行的网络任务：
+- 登录、注销、解绑等控制操作优先于状态查询和设备查询；
+- 队列中相同的查询任务会被合并为一个；
+- 每个任务带有截止时间，过期未执行的任务被丢弃并交给 on_expired 回调，
+  调用方据此把控制操作报告为失败，而不是让它悄无声息地消失。
+"""
+
+import heapq
+import itertools
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# 任务优先级：数值越小越先执行
+PRIORITY_CONTROL = 0
+PRIORITY_QUERY = 1
+
+TASK_PRIORITIES = {
+    'login': PRIORITY_CONTROL,
+    'logout': PRIORITY_CONTROL,
+    'unbind': PRIORITY_CONTROL,
+    'auto_login': PRIORITY_CONTROL,
+    'check_status': PRIORITY_QUERY,
+    'get_devices': PRIORITY_QUERY,
+}
+
+# 默认截止时间（秒），指任务在队列中等待开始执行的最长时间
+CONTROL_TASK_TIMEOUT = 30.0
+QUERY_TASK_TIMEOUT = 10.0
+
+
+class Task:
+    """队列中的一个网络任务。"""
+
+    __slots__ = ('operation', 'params', 'priority', 'deadline', 'seq', 'cancelled')
+
+    def __init__(self, operation: str, params: Dict[str, Any], priority: int, deadline: float, seq: int):
+        self.operation = operation
+        self.params = params
+        self.priority = priority
+        self.deadline = deadline
+        self.seq = seq
+        self.cancelled = False
+
+    @property
+    def key(self) -> Tuple:
+        """用于合并相同查询的键。"""
+        return (self.operation, tuple(sorted(self.params.items())))
+
+    def __lt__(self, other: 'Task') -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+    def __repr__(self) -> str:
+        return f'Task({self.operation!r}, priority={self.priority}, seq={self.seq})'
+
+
+class TaskQueue:
+    """带优先级、查询合并和截止时间的任务队列。
+
+    同一优先级内按提交顺序执行，因此 解绑→注销→登录 等控制操作的相对顺序保持不变。
+    """
+
+    def __init__(self, clock=time.monotonic, on_expired: Optional[Callable[[Task], None]] = None):
+        self._clock = clock
+        self.on_expired = on_expired
+        self._heap: List[Task] = []
+        self._pending_queries: Dict[Tuple, Task] = {}
+        self._counter = itertools.count()
+        self.coalesced = 0
+        self.expired = 0
+
+    def push(self, operation: str, params: Optional[Dict[str, Any]] = None,
+             timeout: Optional[float] = None) -> bool:
+        """提交任务。若与队列中已有的相同查询合并则返回 False。"""
+        params = dict(params or {})
+        priority = TASK_PRIORITIES.get(operation, PRIORITY_QUERY)
+        if timeout is None:
+            timeout = CONTROL_TASK_TIMEOUT if priority == PRIORITY_CONTROL else QUERY_TASK_TIMEOUT
+        deadline = self._clock() + timeout
+
+        task = Task(operation, params, priority, deadline, next(self._counter))
+        if priority == PRIORITY_QUERY:
+            existing = self._pending_queries.get(task.key)
+            if existing is not None:
+                # 合并：保留原位置，延长截止时间
+                existing.deadline = max(existing.deadline, deadline)
+                self.coalesced += 1
+                return False
+            self._pending_queries[task.key] = task
+
+        heapq.heappush(self._heap, task)
+        return True
+
+    def pop(self) -> Optional[Task]:
+        """取出下一个未过期的任务；队列为空时返回 None。
+
+        途中遇到的过期任务逐个交给 on_expired（在调用 pop() 的线程中）。
+        """
+        now = self._clock()
+        while self._heap:
+            task = heapq.heappop(self._heap)
+            if task.priority == PRIORITY_QUERY:
+                self._pending_queries.pop(task.key, None)
+            if task.cancelled:
+                continue
+            if task.deadline < now:
+                self.expired += 1
+                if self.on_expired is not None:
+                    self.on_expired(task)
+                continue
+            return task
+        return None
+
+    def clear(self) -> None:
+        """清空队列。"""
+        for task in self._heap:
+            task.cancelled = True
+        self._heap.clear()
+        self._pending_queries.clear()
+
+    def __len__(self) -> int:
+        return sum(1 for task in self._heap if not task.cancelled)
@@ -0,0 +1,71 @@
+"""
+多账号批量登录测试：对本地门户模拟服务器（benchmarks/stub_portal）并发登录多个账号。
+
+chkstatus 描述的是本机 IP 而不是账号，每个账号都必须真正发出自己的登录请求，
+不能因为本机已经有其他账号在线就报告成功。
+
+用法: python -m pytest tests  或  python -m unittest discover tests
+"""
+
+import os
+import sys
+import unittest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (REPO_ROOT, os.path.join(REPO_ROOT, 'benchmarks')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+import batch_login  # noqa: E402
+import portal_ops  # noqa: E402
+from login_sequence import MODE_ENSURE, MODE_FORCE, MODE_REBIND  # noqa: E402
+from resolver import Resolver  # noqa: E402
+from stub_portal import StubPortal  # noqa: E402
+
+ACCOUNTS = [batch_login.Account(f'82090000{i:02d}', 'password', '校园网') for i in range(6)]
+
+
+class BatchLoginTest(unittest.TestCase):
+
+    def setUp(self):
+        self.stub = StubPortal().start()
+        self.addCleanup(self.stub.stop)
+
+    def _run(self, accounts, mode):
+        batch = batch_login.BatchLogin(accounts, workers=2, rate=0, mode=mode, client_kwargs={
+            'eportal_base': self.stub.eportal_base,
+            'status_base': self.stub.status_base,
+            'resolver': Resolver(path=None),
+            'status_ttl': 0,
+        })
+        return batch.run()
+
+    def test_every_account_sends_its_own_login(self):
+        for mode in (MODE_ENSURE, MODE_FORCE, MODE_REBIND):
+            with self.subTest(mode=mode):
+                self.stub.set_online(False)
+                self.stub.reset_counters()
+                results = self._run(ACCOUNTS, mode)
+                self.assertEqual([result.success for result in results], [True] * len(ACCOUNTS))
+                self.assertEqual(self.stub.requests.get('login'), len(ACCOUNTS))
+
+    def test_ensure_skips_account_already_online(self):
+        client = self.stub.client(status_ttl=0, resolver=Resolver(path=None))
+        self.addCleanup(client.close)
+        self.assertTrue(portal_ops.login(client, ACCOUNTS[0].username, 'password')[0])
+        self.stub.reset_counters()
+
+        results = self._run(ACCOUNTS[:2], MODE_ENSURE)
+        self.assertTrue(all(result.success for result in results))
+        self.assertIn(ACCOUNTS[0].username, results[0].message)
+        # 只有第二个账号需要登录
+        self.assertEqual(self.stub.requests.get('login'), 1)
+
+    def test_login_failure_is_reported_per_account(self):
+        self.stub.config.login_ok = False
+        results = self._run(ACCOUNTS[:3], MODE_ENSURE)
+        self.assertEqual([result.success for result in results], [False] * 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+"""
+常驻实例命令处理测试：转交的 --auto-login 一次只执行一个登录序列，执行期间再收到的请求应答"忙"。
+
+用法: python -m pytest tests  或  python -m unittest discover tests
+"""
+
+import json
+import os
+import sys
+import threading
+import unittest
+from unittest import mock
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+import headless  # noqa: E402
+import instance  # noqa: E402
+
+
+class FakeConnection:
+    """记录应答的连接。"""
+
+    def __init__(self):
+        self.replies = []
+        self.closed = threading.Event()
+
+    def send_bytes(self, data: bytes) -> None:
+        self.replies.append(json.loads(data.decode('utf-8')))
+
+    def close(self) -> None:
+        self.closed.set()
+
+
+class HeadlessHandlerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.release = threading.Event()
+        self.started = threading.Event()
+        self.running = 0
+        self.max_running = 0
+        self.lock = threading.Lock()
+        patches = [
+            mock.patch.object(headless, 'load_login_config', return_value=('8209000000', 'password', '校园网')),
+            mock.patch.object(headless, 'run_auto_login_sequence', side_effect=self._sequence),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.handler = instance.headless_handler(client=object(), log=lambda message: None)
+
+    def _sequence(self, *args, **kwargs) -> bool:
+        with self.lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        self.started.set()
+        self.release.wait(5)
+        with self.lock:
+            self.running -= 1
+        return True
+
+    def _send(self, wait: bool):
+        conn = FakeConnection()
+        self.handler(instance.Request(instance.COMMAND_AUTO_LOGIN, {'wait': wait}, conn))
+        return conn
+
+    def test_second_request_is_busy_while_sequence_runs(self):
+        first = self._send(wait=True)
+        self.assertTrue(self.started.wait(5))
+        # handler 不在请求线程中执行登录序列
+        self.assertFalse(first.closed.is_set())
+
+        busy = [self._send(wait=wait) for wait in (True, False)]
+        for conn in busy:
+            self.assertTrue(conn.closed.is_set())
+            self.assertFalse(conn.replies[0]['ok'])
+
+        self.release.set()
+        self.assertTrue(first.closed.wait(5))
+        self.assertEqual(first.replies, [{'ok': True, 'message': '登录成功'}])
+        self.assertEqual(self.max_running, 1)
+
+    def test_sequence_can_run_again_after_previous_finished(self):
+        self.release.set()
+        for _ in range(2):
+            conn = self._send(wait=True)
+            self.assertTrue(conn.closed.wait(5))
+            self.assertTrue(conn.replies[0]['ok'])
+
+
+if __name__ == '__main__':
+    unittest.main()
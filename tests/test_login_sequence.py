@@ -0,0 +1,126 @@
+"""
+自动登录序列状态机测试：各模式下经过的步骤、账号区分、失败与取消。
+
+对本地门户模拟服务器（benchmarks/stub_portal）运行，记录每一步的状态名。
+
+用法: python -m pytest tests  或  python -m unittest discover tests
+"""
+
+import os
+import sys
+import unittest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (REPO_ROOT, os.path.join(REPO_ROOT, 'benchmarks')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from login_sequence import (MODE_ENSURE, MODE_FORCE, MODE_REBIND, SETTLE_READY,  # noqa: E402
+                            SETTLE_SKIPPED, STATE_CANCELLED, STATE_CHECK, STATE_DONE, STATE_FAILED,
+                            STATE_LOGIN, STATE_LOGOUT, STATE_UNBIND, LoginSequence, SequenceContext,
+                            is_own_account)
+from protocol import PortalStatus  # noqa: E402
+from resolver import Resolver  # noqa: E402
+from retry_policy import RetryPolicy  # noqa: E402
+from stub_portal import StubConfig, StubPortal  # noqa: E402
+
+USERNAME = '8209001234'
+OTHER_USERNAME = '8209009999'
+
+
+class LoginSequenceTest(unittest.TestCase):
+
+    def setUp(self):
+        self.stub = StubPortal(StubConfig(uid=USERNAME)).start()
+        self.addCleanup(self.stub.stop)
+        self.client = self.stub.client(status_ttl=0, resolver=Resolver(path=None),
+                                       retry_policy=RetryPolicy(attempts=1))
+        self.addCleanup(self.client.close)
+
+    def _run(self, mode, password='password'):
+        steps = []
+        sequence = LoginSequence(USERNAME, password, '校园网', client=self.client, mode=mode,
+                                 fallback_delay=0.1, on_step_start=lambda step: steps.append(step.name))
+        return sequence.run(), steps
+
+    def test_rebind_offline_logs_in_directly(self):
+        result, steps = self._run(MODE_REBIND)
+        self.assertEqual(steps, [STATE_CHECK, STATE_LOGIN])
+        self.assertTrue(result.success)
+        self.assertEqual(result.state, STATE_DONE)
+        self.assertTrue(self.stub.is_online())
+
+    def test_rebind_online_goes_through_every_step(self):
+        self.stub.set_online(True)
+        result, steps = self._run(MODE_REBIND)
+        self.assertEqual(steps, [STATE_CHECK, STATE_UNBIND, STATE_LOGOUT, STATE_LOGIN])
+        self.assertTrue(result.success)
+
+    def test_force_skips_status_check(self):
+        self.stub.set_online(True)
+        result, steps = self._run(MODE_FORCE)
+        self.assertEqual(steps, [STATE_UNBIND, STATE_LOGOUT, STATE_LOGIN])
+        self.assertTrue(result.success)
+
+    def test_ensure_stops_when_own_account_online(self):
+        self.stub.set_online(True)
+        self.stub.reset_counters()
+        result, steps = self._run(MODE_ENSURE)
+        self.assertEqual(steps, [STATE_CHECK])
+        self.assertTrue(result.success)
+        self.assertIsNone(self.stub.requests.get('login'))
+
+    def test_ensure_logs_in_when_other_account_online(self):
+        self.stub.config.uid = OTHER_USERNAME
+        self.stub.set_online(True)
+        self.stub.reset_counters()
+        result, steps = self._run(MODE_ENSURE)
+        # 不注销其他账号，直接登录本账号
+        self.assertEqual(steps, [STATE_CHECK, STATE_LOGIN])
+        self.assertTrue(result.success)
+        self.assertEqual(self.stub.requests.get('login'), 1)
+        self.assertIsNone(self.stub.requests.get('logout'))
+
+    def test_login_waits_until_portal_reports_online(self):
+        self.stub.config.settle_ms = 300
+        result, _ = self._run(MODE_REBIND)
+        self.assertTrue(result.success)
+        login = result.timings[-1]
+        self.assertEqual(login.settle_mode, SETTLE_READY)
+        self.assertGreaterEqual(login.settle_seconds, 0.2)
+
+    def test_login_failure_ends_in_failed_state_without_waiting(self):
+        self.stub.config.login_ok = False
+        result, steps = self._run(MODE_REBIND)
+        self.assertEqual(steps, [STATE_CHECK, STATE_LOGIN])
+        self.assertFalse(result.success)
+        self.assertEqual(result.state, STATE_FAILED)
+        self.assertEqual(result.timings[-1].settle_mode, SETTLE_SKIPPED)
+
+    def test_missing_password_fails_before_any_request(self):
+        self.stub.reset_counters()
+        result, steps = self._run(MODE_REBIND, password='')
+        self.assertEqual((result.success, result.state, steps), (False, STATE_FAILED, []))
+        self.assertEqual(self.stub.requests, {})
+
+    def test_cancel_before_run(self):
+        sequence = LoginSequence(USERNAME, 'password', '校园网', client=self.client)
+        sequence.cancel()
+        result = sequence.run()
+        self.assertEqual(result.state, STATE_CANCELLED)
+        self.assertFalse(result.success)
+
+
+class OwnAccountTest(unittest.TestCase):
+
+    def test_uid_is_compared_without_operator_suffix(self):
+        ctx = SequenceContext(None, USERNAME, 'password', '中国电信')
+        self.assertTrue(is_own_account(PortalStatus(online=True, uid=f'{USERNAME}@telecomn'), ctx))
+        self.assertFalse(is_own_account(PortalStatus(online=True, uid=OTHER_USERNAME), ctx))
+        self.assertFalse(is_own_account(PortalStatus(online=False, uid=USERNAME), ctx))
+        # 门户没有返回 uid 时按本账号处理
+        self.assertTrue(is_own_account(PortalStatus(online=True), ctx))
+
+
+if __name__ == '__main__':
+    unittest.main()
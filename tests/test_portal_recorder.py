@@ -0,0 +1,93 @@
+"""
+门户请求录制与回放的往返测试。
+
+对本地门户模拟服务器（benchmarks/stub_portal）录制一组请求，再经由回放传输层
+离线重放，确认凭据已替换、URL 的协议/主机/路径保持原样、回放结果与录制一致。
+
+用法: python -m pytest tests  或  python -m unittest discover tests
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (REPO_ROOT, os.path.join(REPO_ROOT, 'benchmarks')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+import portal_ops  # noqa: E402
+import portal_recorder  # noqa: E402
+from portal_client import PortalClient  # noqa: E402
+from resolver import Resolver  # noqa: E402
+from retry_policy import RetryPolicy  # noqa: E402
+from stub_portal import StubConfig, StubPortal  # noqa: E402
+
+ACCOUNT = '8209001234@telecom'
+PASSWORD = 'p@ss-w0rd'
+
+
+class RecordReplayTest(unittest.TestCase):
+
+    def setUp(self):
+        self.stub = StubPortal(StubConfig(uid='8209001234')).start()
+        self.addCleanup(self.stub.stop)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'capture.jsonl')
+
+    def _client(self, **kwargs) -> PortalClient:
+        client = self.stub.client(status_ttl=0, resolver=Resolver(path=None),
+                                  retry_policy=RetryPolicy(attempts=1), **kwargs)
+        self.addCleanup(client.close)
+        return client
+
+    def _exercise(self, client: PortalClient):
+        return (
+            portal_ops.login(client, ACCOUNT, PASSWORD),
+            portal_ops.get_devices(client, ACCOUNT, PASSWORD),
+            portal_ops.check_status(client),
+        )
+
+    def test_round_trip_with_at_sign_in_password(self):
+        client = self._client()
+        client.recorder = portal_recorder.PortalRecorder(self.path, accounts=[ACCOUNT])
+        recorded = self._exercise(client)
+        client.recorder.close()
+        self.assertTrue(recorded[0][0], recorded[0])
+
+        with open(self.path, encoding='utf-8') as f:
+            raw = f.read()
+        for secret in (ACCOUNT, PASSWORD, '8209001234'):
+            self.assertNotIn(secret, raw)
+
+        entries = list(portal_recorder.read_recording(self.path))
+        self.assertEqual([entry['endpoint'] for entry in entries], ['login', 'online_data', 'chkstatus'])
+        login_url = entries[0]['url']
+        self.assertTrue(login_url.startswith(self.stub.eportal_base + '/login?'), login_url)
+        self.assertIn(f'user_account={portal_recorder.REDACTED}', login_url)
+        self.assertIn(f'user_password={portal_recorder.REDACTED}', login_url)
+
+        replay = self._client()
+        adapter = portal_recorder.ReplayAdapter(entries, speed=0)
+        portal_recorder.install_replay(replay, adapter)
+        replayed = self._exercise(replay)
+        self.assertEqual(adapter.replayed, len(entries))
+        self.assertEqual(replayed[0], recorded[0])
+        self.assertEqual(replayed[1][0], recorded[1][0])
+        self.assertEqual(len(replayed[1][1]), len(recorded[1][1]))
+        self.assertEqual(replayed[2].online, recorded[2].online)
+
+    def test_short_secret_does_not_touch_body(self):
+        recorder = portal_recorder.PortalRecorder(self.path)
+        self.addCleanup(recorder.close)
+        url = recorder.redact_url('http://127.0.0.1:801/eportal/portal/login?user_account=a@b&user_password=p')
+        self.assertEqual(url, 'http://127.0.0.1:801/eportal/portal/login'
+                              '?user_account=REDACTED&user_password=REDACTED')
+        self.assertEqual(recorder.redact('{"result":1,"msg":"Portal协议认证成功！"}'),
+                         '{"result":1,"msg":"Portal协议认证成功！"}')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+"""
+熔断器测试：半开状态的试探请求无论以何种方式结束都要结算，不能一直占着名额。
+
+用法: python -m pytest tests  或  python -m unittest discover tests
+"""
+
+import os
+import sys
+import unittest
+
+import requests
+from requests.adapters import BaseAdapter
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from portal_client import PortalClient  # noqa: E402
+from resolver import Resolver  # noqa: E402
+from retry_policy import (STATE_CLOSED, STATE_HALF_OPEN, STATE_OPEN, CircuitBreaker,  # noqa: E402
+                          CircuitBreakers, CircuitOpenError, RetryPolicy)
+
+BASE = 'http://127.0.0.1:801/eportal/portal'
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class RaisingAdapter(BaseAdapter):
+    """按顺序抛出给定异常的传输层。"""
+
+    def __init__(self, *errors):
+        super().__init__()
+        self.errors = list(errors)
+
+    def send(self, request, **kwargs):
+        raise self.errors.pop(0)(request=request)
+
+    def close(self):
+        pass
+
+
+class CircuitBreakerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+
+    def _open_breaker(self, breaker: CircuitBreaker) -> None:
+        for _ in range(breaker.threshold):
+            breaker.check()
+            breaker.record_failure()
+        self.assertEqual(breaker.state, STATE_OPEN)
+
+    def test_release_frees_half_open_trial(self):
+        breaker = CircuitBreaker(BASE, threshold=2, cooldown=10, clock=self.clock)
+        self._open_breaker(breaker)
+        self.clock.now += 10
+        breaker.check()
+        self.assertEqual(breaker.state, STATE_HALF_OPEN)
+        with self.assertRaises(CircuitOpenError):
+            breaker.check()
+        breaker.release()
+        breaker.check()
+        breaker.record_success()
+        self.assertEqual(breaker.state, STATE_CLOSED)
+
+    def test_unexpected_error_in_trial_request_settles_breaker(self):
+        breakers = CircuitBreakers(threshold=2, cooldown=10, clock=self.clock)
+        client = PortalClient(eportal_base=BASE, status_base=BASE, resolver=Resolver(path=None),
+                              retry_policy=RetryPolicy(attempts=1), breakers=breakers)
+        self.addCleanup(client.close)
+        adapter = RaisingAdapter(requests.exceptions.ConnectionError, requests.exceptions.ConnectionError,
+                                 requests.exceptions.ChunkedEncodingError, requests.exceptions.ConnectionError)
+        client.session.mount('http://', adapter)
+
+        for _ in range(2):
+            with self.assertRaises(requests.exceptions.ConnectionError):
+                client.logout()
+        breaker = breakers.get(BASE)
+        self.assertEqual(breaker.state, STATE_OPEN)
+
+        self.clock.now += 10
+        # 试探请求以既非超时也非连接错误的异常结束
+        with self.assertRaises(requests.exceptions.ChunkedEncodingError):
+            client.logout()
+        self.assertEqual(breaker.state, STATE_HALF_OPEN)
+        self.assertTrue(breaker.available())
+
+        # 下一个请求可以作为新的试探请求发出，而不是一直收到 CircuitOpenError
+        with self.assertRaises(requests.exceptions.ConnectionError) as caught:
+            client.logout()
+        self.assertNotIsInstance(caught.exception, CircuitOpenError)
+        self.assertEqual(breaker.state, STATE_OPEN)
+        self.assertEqual(adapter.errors, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
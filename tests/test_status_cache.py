@@ -0,0 +1,131 @@
+"""
+认证状态缓存测试：TTL、stale-while-revalidate 后台刷新、失效与并发查询合并。
+
+用法: python -m pytest tests  或  python -m unittest discover tests
+"""
+
+import os
+import sys
+import threading
+import time
+import unittest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from status_cache import StatusCache  # noqa: E402
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class Fetcher:
+    """依次返回 1, 2, 3...；gate 未放行时阻塞，用于控制后台刷新的时机。"""
+
+    def __init__(self, gate: threading.Event = None):
+        self.calls = 0
+        self.gate = gate
+        self.started = threading.Event()
+        self.done = threading.Event()
+
+    def __call__(self) -> int:
+        self.calls += 1
+        value = self.calls
+        self.started.set()
+        if self.gate is not None:
+            self.gate.wait(5)
+        self.done.set()
+        return value
+
+
+class StatusCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = StatusCache(ttl=10, revalidate_after=5, clock=self.clock)
+
+    def _wait_refresh(self):
+        # 后台刷新线程在 _store 之后才清除 _refreshing
+        for _ in range(500):
+            if not self.cache._refreshing:
+                return
+            time.sleep(0.01)
+        self.fail('后台刷新没有结束')
+
+    def test_fresh_value_is_served_from_cache(self):
+        fetch = Fetcher()
+        self.assertEqual(self.cache.get(fetch), 1)
+        self.clock.now += 4
+        self.assertEqual(self.cache.get(fetch), 1)
+        self.assertEqual(fetch.calls, 1)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_expired_value_is_fetched_synchronously(self):
+        fetch = Fetcher()
+        self.cache.get(fetch)
+        self.clock.now += 10
+        self.assertEqual(self.cache.get(fetch), 2)
+        self.assertEqual(self.cache.misses, 2)
+
+    def test_stale_value_is_served_while_revalidating(self):
+        fetch = Fetcher()
+        self.cache.get(fetch)
+        self.clock.now += 6
+
+        fetch.gate = threading.Event()
+        fetch.done.clear()
+        # 旧值立即返回，后台只发起一次刷新
+        self.assertEqual(self.cache.get(fetch), 1)
+        self.assertEqual(self.cache.get(fetch), 1)
+        fetch.gate.set()
+        self.assertTrue(fetch.done.wait(5))
+        self._wait_refresh()
+        self.assertEqual(fetch.calls, 2)
+        self.assertEqual(self.cache.get(fetch), 2)
+
+    def test_invalidate_discards_refresh_in_flight(self):
+        fetch = Fetcher()
+        self.cache.get(fetch)
+        self.clock.now += 6
+
+        fetch.gate = threading.Event()
+        fetch.started.clear()
+        self.cache.get(fetch)
+        self.assertTrue(fetch.started.wait(5))
+        self.cache.invalidate()
+        fetch.gate.set()
+        self._wait_refresh()
+        # 失效前发起的刷新结果不会写入缓存
+        self.assertEqual(self.cache.get(fetch), 3)
+
+    def test_uncacheable_values_are_not_stored(self):
+        cache = StatusCache(ttl=10, cacheable=lambda value: value % 2 == 0, clock=self.clock)
+        fetch = Fetcher()
+        self.assertEqual(cache.get(fetch), 1)
+        self.assertEqual(cache.get(fetch), 2)
+        self.assertEqual(cache.get(fetch), 2)
+        self.assertEqual(fetch.calls, 2)
+
+    def test_concurrent_misses_share_one_fetch(self):
+        fetch = Fetcher(gate=threading.Event())
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.cache.get(fetch))) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        self.assertTrue(fetch.started.wait(5))
+        fetch.gate.set()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(results, [1] * 5)
+        self.assertEqual(fetch.calls, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
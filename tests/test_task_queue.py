@@ -0,0 +1,111 @@
+"""
+网络任务队列测试：优先级、查询合并与过期处理。
+
+用法: python -m pytest tests  或  python -m unittest discover tests
+"""
+
+import os
+import sys
+import unittest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from task_queue import CONTROL_TASK_TIMEOUT, QUERY_TASK_TIMEOUT, TaskQueue  # noqa: E402
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def drain(queue: TaskQueue):
+    operations = []
+    while True:
+        task = queue.pop()
+        if task is None:
+            return operations
+        operations.append(task.operation)
+
+
+class TaskQueueOrderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.queue = TaskQueue(clock=self.clock)
+
+    def test_control_tasks_run_before_queries_in_submission_order(self):
+        self.queue.push('get_devices', {'username': 'a'})
+        self.queue.push('unbind', {'username': 'a'})
+        self.queue.push('check_status')
+        self.queue.push('logout')
+        self.queue.push('login', {'user_account': 'a'})
+        self.assertEqual(drain(self.queue), ['unbind', 'logout', 'login', 'get_devices', 'check_status'])
+
+    def test_identical_queries_are_coalesced(self):
+        self.assertTrue(self.queue.push('check_status'))
+        self.assertFalse(self.queue.push('check_status'))
+        self.assertTrue(self.queue.push('get_devices', {'username': 'a'}))
+        self.assertTrue(self.queue.push('get_devices', {'username': 'b'}))
+        self.assertFalse(self.queue.push('get_devices', {'username': 'a'}))
+        self.assertEqual(len(self.queue), 3)
+        self.assertEqual(self.queue.coalesced, 2)
+        self.assertEqual(drain(self.queue), ['check_status', 'get_devices', 'get_devices'])
+
+    def test_control_tasks_are_never_coalesced(self):
+        self.queue.push('logout')
+        self.assertTrue(self.queue.push('logout'))
+        self.assertEqual(drain(self.queue), ['logout', 'logout'])
+
+    def test_coalescing_extends_deadline(self):
+        self.queue.push('check_status')
+        self.clock.now += QUERY_TASK_TIMEOUT - 1
+        self.queue.push('check_status')
+        self.clock.now += 2
+        self.assertEqual(drain(self.queue), ['check_status'])
+
+    def test_query_can_be_queued_again_after_it_was_taken(self):
+        self.queue.push('check_status')
+        self.queue.pop()
+        self.assertTrue(self.queue.push('check_status'))
+
+
+class TaskQueueExpiryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.expired = []
+        self.queue = TaskQueue(clock=self.clock, on_expired=self.expired.append)
+
+    def test_expired_control_task_is_reported(self):
+        self.queue.push('logout')
+        self.queue.push('check_status')
+        self.clock.now += CONTROL_TASK_TIMEOUT + 1
+
+        self.assertIsNone(self.queue.pop())
+        self.assertEqual([task.operation for task in self.expired], ['logout', 'check_status'])
+        self.assertEqual(self.queue.expired, 2)
+
+    def test_cleared_tasks_are_not_reported_as_expired(self):
+        self.queue.push('auto_login')
+        self.queue.clear()
+        self.clock.now += CONTROL_TASK_TIMEOUT + 1
+        self.assertIsNone(self.queue.pop())
+        self.assertEqual(self.expired, [])
+
+    def test_live_task_after_expired_one_is_returned(self):
+        self.queue.push('unbind', timeout=1)
+        self.queue.push('login')
+        self.clock.now += 2
+        task = self.queue.pop()
+        self.assertEqual(task.operation, 'login')
+        self.assertEqual([task.operation for task in self.expired], ['unbind'])
+
+
+if __name__ == '__main__':
+    unittest.main()
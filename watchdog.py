@@ -0,0 +1,183 @@
+"""
+校园网连接守护模块。
+
+长期运行，按自适应间隔用 chkstatus 探测认证状态，掉线后立即重新登录；
+登录失败或门户不可达时按带随机抖动的指数退避重试。网卡获得地址、链路或路由
+变化时（network_monitor）立即探测，不必等到下一次定时探测。
+全程不导入 Qt，常驻时的内存和 CPU 占用都很小。
+
+用法: python CSU_WIFI_Login.py --watchdog [--min-interval 5] [--max-interval 120] [--no-netmon]
+"""
+
+import argparse
+import random
+import signal
+import sys
+import threading
+import time
+from typing import Callable, Optional
+
+import history
+import instance
+import network_monitor
+import portal_ops
+import status_broadcast
+from login_sequence import MODE_ENSURE, LoginSequence
+from portal_client import PortalClient, get_client
+
+# 探测间隔（秒）：状态稳定时逐步放宽到 MAX_INTERVAL，发生变化后回到 MIN_INTERVAL
+MIN_INTERVAL = 5.0
+MAX_INTERVAL = 120.0
+INTERVAL_GROWTH = 1.5
+
+# 失败退避（秒）
+BACKOFF_BASE = 2.0
+BACKOFF_MAX = 300.0
+
+
+def backoff_delay(failures: int, base: float = BACKOFF_BASE, cap: float = BACKOFF_MAX,
+                  rng: Callable[[float, float], float] = random.uniform) -> float:
+    """带完全随机抖动的指数退避：在 [0, min(cap, base * 2^(failures-1))] 内均匀取值。"""
+    return rng(0, min(cap, base * (2 ** max(0, failures - 1))))
+
+
+class Watchdog:
+    """认证状态守护：探测 → 掉线则重新登录 → 按结果调整下一次探测时间。"""
+
+    def __init__(self, username: str, password: str, net_type: str,
+                 client: Optional[PortalClient] = None,
+                 min_interval: float = MIN_INTERVAL,
+                 max_interval: float = MAX_INTERVAL,
+                 log: Callable[[str], None] = print):
+        self.client = client or get_client()
+        self.username = username
+        self.password = password
+        self.net_type = net_type
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.log = log
+        self.interval = min_interval
+        self.failures = 0
+        self.relogins = 0
+        self._stop_event = threading.Event()
+        self._wake_event = threading.Event()
+        self._sequence: Optional[LoginSequence] = None
+
+    def stop(self) -> None:
+        """停止守护循环。"""
+        self._stop_event.set()
+        self._wake_event.set()
+        if self._sequence is not None:
+            self._sequence.cancel()
+
+    def wake(self) -> None:
+        """立即进行下一次探测（例如检测到网络变化时）。"""
+        self._wake_event.set()
+
+    def on_network_change(self, kinds) -> None:
+        """network_monitor 的回调：丢弃旧连接、清零失败计数并立即探测。"""
+        self.log(f"检测到网络变化（{', '.join(sorted(kinds))}），立即检查状态")
+        self.client.network_changed()
+        self.failures = 0
+        self.wake()
+
+    def tick(self) -> float:
+        """执行一次探测（必要时重新登录），返回距下一次探测的秒数。"""
+        status = portal_ops.check_status(self.client)
+        if status.online:
+            self.failures = 0
+            delay = self.interval
+            self.interval = min(self.interval * INTERVAL_GROWTH, self.max_interval)
+            return delay
+
+        if not status.reachable:
+            # 门户不可达（不在校园网或网络未就绪），退避后再探测
+            self.failures += 1
+            self.interval = self.min_interval
+            delay = max(self.min_interval, backoff_delay(self.failures))
+            self.log(f"门户不可达: {status.error}，{delay:.1f} 秒后重试")
+            return delay
+
+        self.log("检测到掉线，正在重新登录...")
+        self._sequence = LoginSequence(self.username, self.password, self.net_type,
+                                       client=self.client, mode=MODE_ENSURE)
+        try:
+            result = self._sequence.run()
+        finally:
+            self._sequence = None
+        self.interval = self.min_interval
+        if result.success:
+            self.failures = 0
+            self.relogins += 1
+            self.log(f"重新登录成功，用时 {result.elapsed:.2f} 秒")
+            return self.min_interval
+
+        self.failures += 1
+        delay = max(self.min_interval, backoff_delay(self.failures))
+        self.log(f"重新登录失败: {result.message}，{delay:.1f} 秒后重试")
+        return delay
+
+    def run(self) -> None:
+        """运行守护循环，直到 stop() 被调用。"""
+        self.log(f"守护已启动（探测间隔 {self.min_interval:.0f}–{self.max_interval:.0f} 秒）")
+        while not self._stop_event.is_set():
+            # 先清除唤醒标志：探测或登录期间发生的网络变化会让下一次探测立即开始
+            self._wake_event.clear()
+            delay = self.tick()
+            if self._wake_event.wait(delay):
+                # 被唤醒：下一次探测从最短间隔开始
+                self.interval = self.min_interval
+        self.log("守护已停止")
+
+
+def _timestamped(message: str) -> None:
+    print(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] {message}", flush=True)
+
+
+def main(argv=None) -> int:
+    """--watchdog 入口。"""
+    import headless
+
+    parser = argparse.ArgumentParser(prog='CSU_WIFI_Login.py --watchdog', description='校园网连接守护')
+    parser.add_argument('--min-interval', type=float, default=MIN_INTERVAL)
+    parser.add_argument('--max-interval', type=float, default=MAX_INTERVAL)
+    parser.add_argument('--no-netmon', action='store_true', help='不监测网络变化，只按间隔探测')
+    args, _ = parser.parse_known_args(argv)
+
+    username, password, net_type = headless.load_login_config()
+    if not username or not password:
+        _timestamped("错误: 请先在程序中保存学号和密码")
+        return 1
+
+    watchdog = Watchdog(username, password, net_type,
+                        min_interval=args.min_interval, max_interval=args.max_interval,
+                        log=_timestamped)
+    monitor = None
+    if not args.no_netmon:
+        monitor = network_monitor.create_monitor(watchdog.on_network_change)
+        monitor.start()
+        _timestamped(f"网络变化监测: {monitor.name}")
+    # 注册为常驻实例：之后的 --auto-login/--status/--logout 转交给守护进程处理
+    server = instance.InstanceServer(instance.headless_handler(watchdog.client, log=_timestamped))
+    if not server.start():
+        _timestamped("已有其他实例在运行，命令转交不可用")
+    # 每次探测的结果都推送给本地订阅者
+    if status_broadcast.start() is None:
+        _timestamped("已有其他实例在发布认证状态")
+    # 探测结果写入本地历史（--history 查询）
+    history.start()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: watchdog.stop())
+    try:
+        watchdog.run()
+    finally:
+        history.stop()
+        status_broadcast.stop()
+        server.stop()
+        if monitor is not None:
+            monitor.stop()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))